@@ -0,0 +1,255 @@
+# backend/accuracy_monitor.py
+
+# Suivi en continu de la précision des prévisions servies : les
+# prévisions de l'historique (prediction_history) sont comparées aux
+# taux de mortalité réels du store de features dès que ceux-ci sont
+# disponibles, et les erreurs sont cumulées par modèle, version, pays
+# et jour d'horizon (table accuracy_stats : n, somme des |e|, des e² et
+# des termes SMAPE).
+#
+# Le travail est incrémental : seules les prévisions non encore
+# entièrement évaluées sont relues (index complete, country), et parmi
+# elles uniquement les nouvelles prévisions et celles des pays dont les
+# données viennent de changer. Chaque jour évalué est marqué dans la
+# prévision (masque "evaluated") : il n'est jamais compté deux fois, et
+# les prévisions terminées ne sont plus jamais relues. Une valeur réelle
+# corrigée après coup n'est pas réévaluée.
+#
+# Déclenché après chaque import ou écriture de données (schedule), et
+# toutes les ACCURACY_MONITOR_INTERVAL secondes pour les nouvelles
+# prévisions ; le calcul a lieu dans un thread, hors des requêtes, et
+# dans un seul worker (leader de worker_sync) en déploiement multi-workers.
+import datetime
+import logging
+import math
+import os
+import threading
+import time
+
+from sqlalchemy import func
+
+import database
+import metrics
+import models
+import prediction_history
+import worker_sync
+
+logger = logging.getLogger(__name__)
+
+ACCURACY_MONITOR_ENABLED = os.getenv(
+    "ACCURACY_MONITOR_ENABLED", "1").lower() in ("1", "true", "yes")
+# Délai maximal avant l'évaluation des nouvelles prévisions (secondes).
+ACCURACY_MONITOR_INTERVAL = float(os.getenv("ACCURACY_MONITOR_INTERVAL",
+                                            "300"))
+# Regroupements acceptés par /api/accuracy.
+GROUP_COLUMNS = ("model", "model_version", "country", "horizon")
+
+
+def scores(n, abs_error, squared_error, smape):
+    """MAE, RMSE et SMAPE (%) à partir des sommes cumulées."""
+    if not n:
+        return {"n": 0, "mae": None, "rmse": None, "smape": None}
+    return {"n": int(n), "mae": abs_error / n,
+            "rmse": math.sqrt(squared_error / n), "smape": 100 * smape / n}
+
+
+def _errors(actual, predicted):
+    error = predicted - actual
+    denominator = abs(actual) + abs(predicted)
+    return (abs(error), error * error,
+            2 * abs(error) / denominator if denominator > 0 else 0.0)
+
+
+class AccuracyMonitor:
+    """Évaluation incrémentale des prévisions de l'historique."""
+
+    def __init__(self, session_factory=None, interval=300):
+        self.session_factory = session_factory or database.SessionLocal
+        self.interval = interval
+        # Dernière prévision examinée : les suivantes sont nouvelles.
+        self.last_seen_id = 0
+        self.runs = 0
+        self.evaluated = 0
+        self.completed = 0
+        self.failures = 0
+        self.last_run_seconds = None
+        # Scores par modèle après le dernier passage (métriques).
+        self.summary = []
+        self._countries = set()
+        self._all = False
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._loop, daemon=True, name="accuracy-monitor")
+                self._thread.start()
+
+    def schedule(self, countries=None):
+        """Demande l'évaluation après un changement des données de
+        `countries` (None : tous les pays, ex. import complet)."""
+        with self._lock:
+            if countries is None:
+                self._all = True
+            else:
+                self._countries.update(countries)
+        if self._thread is None:
+            self.start()
+        self._wakeup.set()
+
+    def _loop(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.update()
+            except Exception as e:
+                logger.exception("Accuracy monitor failed: %s", e)
+                self.failures += 1
+
+    def update(self, countries=()):
+        """Évalue les prévisions en attente concernées par les derniers
+        changements (schedule, ou pays `countries`) ; retourne le nombre
+        de jours évalués."""
+        with self._lock:
+            countries, self._countries = self._countries | set(
+                countries), set()
+            everything, self._all = self._all, False
+        with self._run_lock:
+            started = time.perf_counter()
+            # Prévisions encore dans le tampon d'écriture incluses.
+            prediction_history.writer.flush()
+            db = self.session_factory()
+            try:
+                evaluated, last_seen_id = self._update(db, countries,
+                                                       everything)
+                db.commit()
+                self.last_seen_id = last_seen_id
+                self.summary = self.report(db, by=("model",))
+            except Exception:
+                db.rollback()
+                # Changements à reprendre au prochain passage.
+                with self._lock:
+                    self._countries |= countries
+                    self._all |= everything
+                raise
+            finally:
+                db.close()
+            self.runs += 1
+            self.last_run_seconds = round(time.perf_counter() - started, 3)
+            return evaluated
+
+    def _update(self, db, countries, everything):
+        History = models.PredictionHistory
+        query = db.query(History).filter(History.complete.is_(False))
+        if not everything:
+            scope = History.id > self.last_seen_id
+            if countries:
+                scope = scope | History.country.in_(countries)
+            query = query.filter(scope)
+        pending = query.all()
+        last_seen_id = max([self.last_seen_id] + [row.id for row in pending])
+        if not pending:
+            return 0, last_seen_id
+
+        # Valeurs réelles des pays et dates couverts, en une requête.
+        first = min(row.reference_date for row in pending)
+        last = max(row.reference_date + datetime.timedelta(days=row.days)
+                   for row in pending)
+        rows = db.query(models.Feature.country, models.Feature.date,
+                        models.Feature.mortality_rate).filter(
+            models.Feature.country.in_(sorted({r.country for r in pending})),
+            models.Feature.date > first, models.Feature.date <= last).all()
+        actuals = {(country, day): rate for country, day, rate in rows}
+
+        sums = {}
+        evaluated = 0
+        for row in pending:
+            mask = row.evaluated or 0
+            for point in row.predictions:
+                bit = 1 << (point["day"] - 1)
+                actual = actuals.get((row.country, datetime.date.fromisoformat(
+                    point["date"])))
+                if mask & bit or actual is None:
+                    continue
+                mask |= bit
+                key = (row.model, row.model_version or "", row.country,
+                       point["day"])
+                total = sums.setdefault(key, [0, 0.0, 0.0, 0.0])
+                total[0] += 1
+                for i, value in enumerate(_errors(
+                        actual, point["predicted_value"]), 1):
+                    total[i] += value
+                evaluated += 1
+            if mask != row.evaluated:
+                row.evaluated = mask
+                if mask == (1 << len(row.predictions)) - 1:
+                    row.complete = True
+                    self.completed += 1
+        self._add(db, sums)
+        self.evaluated += evaluated
+        return evaluated, last_seen_id
+
+    def _add(self, db, sums):
+        # Mise à jour des seules lignes de statistiques concernées.
+        if not sums:
+            return
+        Stat = models.AccuracyStat
+        existing = {
+            (s.model, s.model_version, s.country, s.horizon): s
+            for s in db.query(Stat).filter(
+                Stat.model.in_(sorted({key[0] for key in sums})),
+                Stat.country.in_(sorted({key[2] for key in sums})))}
+        now = datetime.datetime.utcnow()
+        for key, (n, abs_error, squared_error, smape) in sums.items():
+            stat = existing.get(key)
+            if stat is None:
+                stat = Stat(model=key[0], model_version=key[1],
+                            country=key[2], horizon=key[3], n=0,
+                            abs_error=0.0, squared_error=0.0, smape=0.0)
+                db.add(stat)
+            stat.n += n
+            stat.abs_error += abs_error
+            stat.squared_error += squared_error
+            stat.smape += smape
+            stat.updated_at = now
+
+    def report(self, db, by=("model", "model_version"), model=None,
+               country=None):
+        """Scores regroupés selon `by` (colonnes de GROUP_COLUMNS),
+        calculés en SQL à partir des sommes cumulées."""
+        Stat = models.AccuracyStat
+        columns = [getattr(Stat, name) for name in by]
+        query = db.query(*columns, func.sum(Stat.n), func.sum(Stat.abs_error),
+                         func.sum(Stat.squared_error), func.sum(Stat.smape))
+        if model:
+            query = query.filter(Stat.model == model)
+        if country:
+            query = query.filter(Stat.country == country)
+        if columns:
+            query = query.group_by(*columns).order_by(*columns)
+        return [dict(zip(by, row[:len(by)]), **scores(*row[len(by):]))
+                for row in query.all() if row[len(by)]]
+
+    def stats(self):
+        return {"runs": self.runs, "evaluated": self.evaluated,
+                "completed": self.completed, "failures": self.failures,
+                "last_run_seconds": self.last_run_seconds,
+                "models": self.summary}
+
+
+monitor = AccuracyMonitor(interval=ACCURACY_MONITOR_INTERVAL)
+metrics.register("accuracy", monitor.stats)
+
+
+def schedule(countries=None):
+    # Plusieurs workers : seul le leader évalue les prévisions.
+    if ACCURACY_MONITOR_ENABLED and worker_sync.is_leader():
+        monitor.schedule(countries)
+
+
+worker_sync.on_leader(schedule)
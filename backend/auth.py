@@ -10,8 +10,8 @@ from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
+# La configuration des handlers est faite une seule fois
+# par logging_config.setup_logging() (voir main.py).
 logger = logging.getLogger(__name__)
 
 # Create router
@@ -91,8 +91,6 @@ async def get_current_user(token: str = Depends(
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        # Log le jeton reçu (à des fins de débogage).
-        logger.debug(f"Received token: {token}")
         # Décode le jeton JWT en utilisant
         # la clé secrète et l'algorithme spécifié.
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -102,11 +100,9 @@ async def get_current_user(token: str = Depends(
             # Log l'erreur si le nom d'utilisateur est absent.
             logger.error("Username is None in token payload")
             raise credentials_exception
-        # Log le nom d'utilisateur décodé.
-        logger.debug(f"Decoded username from token: {username}")
     except JWTError as e:
-        # Log les erreurs de décodage JWT.
-        logger.error(f"JWT decode error: {str(e)}")
+        # Log les erreurs de décodage JWT (jamais le jeton lui-même).
+        logger.error("JWT decode error: %s", e)
         raise credentials_exception
 
     # Tente de récupérer l'utilisateur de la base de données
@@ -115,10 +111,11 @@ async def get_current_user(token: str = Depends(
         models.User.username == username).first()
     if user is None:
         # Log l'erreur si l'utilisateur n'est pas trouvé.
-        logger.error(f"User not found for username: {username}")
+        logger.error("User not found for username: %s", username)
         raise credentials_exception
-    # Log l'utilisateur trouvé.
-    logger.debug(f"Found user: {user.username}")
+    # Log échantillonnable (LOG_SAMPLING) et formaté paresseusement :
+    # aucun coût de formatage si le niveau DEBUG est inactif.
+    logger.debug("Authenticated user: %s", user.username)
     return user  # Retourne l'objet utilisateur.
 
 
@@ -0,0 +1,489 @@
+# backend/backtesting.py
+
+# Évaluation des modèles de predict_dispatch par origine glissante : à
+# chaque date d'origine (toutes les BACKTEST_STEP jours), chaque modèle
+# prévoit les BACKTEST_HORIZON jours suivants de chaque pays à partir de
+# son historique jusqu'à l'origine, et la prévision est comparée au taux
+# de mortalité observé (MAE, RMSE, SMAPE). Aucune donnée postérieure à
+# l'origine n'est utilisée : Prophet est ré-entraîné à chaque origine sur
+# l'historique de chaque pays (mêmes réglages que training.fit_country),
+# les modèles légers s'ajustent déjà à l'historique fourni.
+#
+# Une tâche du pool de processus = une origine, tous pays et tous modèles.
+# Chaque origine terminée est ajoutée au fichier results.jsonl du run
+# (sommes des erreurs par modèle, par pays et par jour d'horizon) : un run
+# interrompu reprend là où il s'était arrêté et le rapport partiel est
+# consultable pendant le calcul (GET /api/backtests/{run_id}).
+#
+# Usage (depuis backend/) : python backtesting.py [--workers N]
+#     [--models prophet holt ...] [--step 7] [--horizon 7] [--resume RUN_ID]
+import argparse
+import datetime
+import json
+import logging
+import math
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+import fast_forecast
+import metrics
+import model_artifact
+import training
+from ml_model import predict_dispatch, predict_with_prophet
+
+logger = logging.getLogger(__name__)
+
+BACKTEST_DIR = os.getenv(
+    "BACKTEST_DIR",
+    os.path.join(os.path.dirname(__file__), 'models_and_results',
+                 'backtests'))
+# Nombre de processus d'évaluation (0 : dans le processus appelant).
+BACKTEST_WORKERS = int(os.getenv("BACKTEST_WORKERS",
+                                 str(os.cpu_count() or 1)))
+# Jours prévus à chaque origine et écart entre deux origines.
+BACKTEST_HORIZON = int(os.getenv("BACKTEST_HORIZON", "7"))
+BACKTEST_STEP = int(os.getenv("BACKTEST_STEP", "7"))
+# Historique minimal d'un pays à l'origine pour être évalué (au moins
+# training.MIN_TRAINING_DAYS si Prophet est évalué, voir
+# default_min_history()).
+BACKTEST_MIN_HISTORY = int(os.getenv("BACKTEST_MIN_HISTORY", "14"))
+
+MODELS = ("prophet", *fast_forecast.MODELS)
+CONFIG_NAME = "run.json"
+RESULTS_NAME = "results.jsonl"
+
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+INTERRUPTED = "interrupted"
+
+
+# --- Erreurs ----------------------------------------------------------
+def _sums(actual, predicted):
+    """Sommes [n, |e|, e², termes SMAPE] de chaque ligne de tableaux 2D
+    (une ligne par pays, ou par jour d'horizon)."""
+    error = predicted - actual
+    denominator = np.abs(actual) + np.abs(predicted)
+    smape = np.divide(2 * np.abs(error), denominator,
+                      out=np.zeros_like(error), where=denominator > 0)
+    return np.stack([np.ones_like(error), np.abs(error), error * error,
+                     smape], axis=-1).sum(axis=1)
+
+
+def scores(sums):
+    """MAE, RMSE et SMAPE (%) à partir de sommes [n, |e|, e², SMAPE]."""
+    n, absolute, squared, smape = sums
+    if not n:
+        return {"n": 0, "mae": None, "rmse": None, "smape": None}
+    return {"n": int(n), "mae": absolute / n, "rmse": math.sqrt(squared / n),
+            "smape": 100 * smape / n}
+
+
+# --- Évaluation d'une origine (processus du pool) ---------------------
+_histories = {}
+
+
+def _init_worker(data):
+    global _histories
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+    _histories = {country: frame.reset_index(drop=True)
+                  for country, frame in data.groupby('country', sort=False)}
+
+
+def _split(origin, horizon, min_history):
+    """Historiques jusqu'à l'origine et valeurs observées aux `horizon`
+    jours suivants, pour les pays évaluables à cette origine."""
+    histories, actuals = {}, {}
+    targets = origin + np.arange(1, horizon + 1).astype('timedelta64[D]')
+    for country, frame in _histories.items():
+        ds = frame['ds'].to_numpy()
+        end = np.searchsorted(ds, origin, side='right')
+        if end < min_history:
+            continue
+        positions = np.searchsorted(ds, targets)
+        if (positions >= len(ds)).any() or (ds[np.minimum(
+                positions, len(ds) - 1)] != targets).any():
+            continue
+        histories[country] = frame.iloc[:end]
+        actuals[country] = frame['taux_mortalite'].to_numpy()[positions]
+    return histories, actuals
+
+
+def _prophet_refit(histories, horizon):
+    """Prophet ré-entraîné sur l'historique de chaque pays jusqu'à
+    l'origine ; artefacts temporaires, hors du cache des modèles servis."""
+    predictions, failed = {}, {}
+    with tempfile.TemporaryDirectory(prefix="backtest-") as folder:
+        for index, (country, history) in enumerate(histories.items()):
+            if len(history) < training.MIN_TRAINING_DAYS:
+                failed[country] = (f"Less than {training.MIN_TRAINING_DAYS}"
+                                   " days of history")
+                continue
+            path = os.path.join(folder, str(index))
+            try:
+                training.fit_country(history.rename(
+                    columns={'taux_mortalite': 'y'}), path)
+                predictions[country] = predict_with_prophet(
+                    history, horizon,
+                    model=model_artifact.load_prophet(path, mmap=False))[
+                        'yhat'].to_numpy(dtype=float)[:horizon]
+            except Exception as e:
+                failed[country] = str(e)
+    return predictions, failed
+
+
+def _predictions(model_name, histories, horizon):
+    """{pays: valeurs prédites} et {pays: erreur} d'un modèle."""
+    if model_name == "prophet":
+        return _prophet_refit(histories, horizon)
+    predictions, failed = {}, {}
+    for country, history in histories.items():
+        try:
+            predictions[country] = predict_dispatch(
+                model_name, history, horizon)[
+                    'yhat'].to_numpy(dtype=float)[:horizon]
+        except Exception as e:
+            failed[country] = str(e)
+    return predictions, failed
+
+
+def evaluate_origin(origin, models, horizon, min_history):
+    """Évalue les modèles à l'origine `origin` (date ISO) ; retourne la
+    ligne du fichier de résultats."""
+    started = time.perf_counter()
+    histories, actuals = _split(np.datetime64(origin, 'ns'), horizon,
+                                min_history)
+    results = {}
+    for model_name in models:
+        try:
+            predictions, failed = _predictions(model_name, histories,
+                                               horizon)
+        except Exception as e:
+            predictions, failed = {}, {"*": str(e)}
+        countries = sorted(predictions)
+        entry = {"countries": {}, "horizon": [[0.0] * 4] * horizon,
+                 "failed": failed}
+        if countries:
+            actual = np.array([actuals[c] for c in countries])
+            predicted = np.nan_to_num(np.array(
+                [predictions[c] for c in countries], dtype=float))
+            entry["countries"] = dict(zip(countries,
+                                          _sums(actual, predicted).tolist()))
+            entry["horizon"] = _sums(actual.T, predicted.T).tolist()
+        results[model_name] = entry
+    return {"origin": origin, "countries": len(histories), "models": results,
+            "seconds": round(time.perf_counter() - started, 3)}
+
+
+# --- Runs ---------------------------------------------------------------
+def origins(data, step, horizon, min_history, start=None, end=None):
+    """Dates d'origine : toutes les `step` jours, de la première date
+    offrant `min_history` jours d'historique à la dernière permettant
+    d'observer `horizon` jours."""
+    first = data['ds'].min() + pd.Timedelta(days=min_history - 1)
+    last = data['ds'].max() - pd.Timedelta(days=horizon)
+    if start is not None:
+        first = max(first, pd.Timestamp(start))
+    if end is not None:
+        last = min(last, pd.Timestamp(end))
+    if pd.isna(first) or first > last:
+        return []
+    return [d.date().isoformat()
+            for d in pd.date_range(first, last, freq=f"{step}D")]
+
+
+def read_results(path):
+    """Lignes complètes du fichier de résultats (une ligne tronquée par
+    un arrêt brutal est ignorée)."""
+    lines = []
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    lines.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return lines
+
+
+def _drop_partial_line(path):
+    # Reprise après un arrêt brutal : la ligne inachevée est retirée
+    # avant d'ajouter de nouveaux résultats.
+    try:
+        with open(path, "rb+") as f:
+            content = f.read()
+            if content and not content.endswith(b"\n"):
+                f.truncate(content.rfind(b"\n") + 1)
+    except OSError:
+        pass
+
+
+def _common_countries(line, models):
+    # Pays prévus par tous les modèles à cette origine.
+    entries = [line["models"].get(model_name) for model_name in models]
+    if any(entry is None for entry in entries):
+        return set()
+    return set.intersection(*(set(entry["countries"]) for entry in entries))
+
+
+def report(lines, models):
+    """Scores par modèle : global, par jour d'horizon et par pays, et
+    sur les seuls couples (origine, pays) prévus par tous les modèles
+    ("common", comparable d'un modèle à l'autre)."""
+    result = {}
+    for model_name in models:
+        total, by_day, by_country, failed = np.zeros(4), None, {}, 0
+        common = np.zeros(4)
+        for line in lines:
+            entry = line["models"].get(model_name)
+            if entry is None:
+                continue
+            for country in _common_countries(line, models):
+                common += entry["countries"][country]
+            horizon = np.array(entry["horizon"])
+            by_day = horizon if by_day is None else by_day + horizon
+            total += horizon.sum(axis=0)
+            for country, sums in entry["countries"].items():
+                by_country[country] = by_country.get(
+                    country, np.zeros(4)) + sums
+            failed += len(entry["failed"])
+        result[model_name] = dict(
+            scores(total), failed=failed,
+            horizon=[scores(s) for s in (by_day if by_day is not None
+                                         else [])],
+            countries={c: scores(s) for c, s in sorted(by_country.items())},
+            common=scores(common))
+    return result
+
+
+def default_min_history(models):
+    """Historique minimal par défaut : Prophet n'est ré-entraîné que pour
+    les pays ayant au moins training.MIN_TRAINING_DAYS jours, les autres
+    modèles sont alors évalués sur les mêmes pays."""
+    if "prophet" in models:
+        return max(BACKTEST_MIN_HISTORY, training.MIN_TRAINING_DAYS)
+    return BACKTEST_MIN_HISTORY
+
+
+class Backtester:
+    """Lance les runs (un à la fois, dans un thread) et lit leurs
+    résultats sur disque."""
+
+    def __init__(self, directory=BACKTEST_DIR):
+        self.directory = directory
+        self.current = None
+        self.completed = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def _folder(self, run_id):
+        return os.path.join(self.directory, os.path.basename(run_id))
+
+    def _write_config(self, config):
+        folder = self._folder(config["run_id"])
+        tmp = os.path.join(folder, f"{CONFIG_NAME}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(config, f, indent=2)
+        os.replace(tmp, os.path.join(folder, CONFIG_NAME))
+
+    def _read_config(self, run_id):
+        with open(os.path.join(self._folder(run_id), CONFIG_NAME)) as f:
+            return json.load(f)
+
+    def prepare(self, db, models=None, horizon=None, step=None, start=None,
+                end=None, min_history=None, resume=None):
+        """Lit les données et prépare un run (nouveau, ou reprise de
+        `resume` avec la même configuration). Retourne (config,
+        données)."""
+        data = training.load_training_data(db).rename(
+            columns={'y': 'taux_mortalite'})
+        models = list(dict.fromkeys(models or MODELS))
+        config = {
+            "models": models,
+            "horizon": horizon or BACKTEST_HORIZON,
+            "step": step or BACKTEST_STEP,
+            "min_history": min_history or default_min_history(models),
+            "start": start, "end": end,
+            "data_fingerprint": training.fingerprint(data.rename(
+                columns={'taux_mortalite': 'y'})),
+        }
+        unknown = set(config["models"]) - set(MODELS)
+        if unknown:
+            raise ValueError(f"Unknown models: {', '.join(sorted(unknown))}")
+        if resume:
+            previous = self._read_config(resume)
+            keys = [key for key in config if previous.get(key) != config[key]]
+            if keys:
+                raise ValueError(f"Run {resume} has a different "
+                                 f"configuration: {', '.join(keys)}")
+            config = previous
+        else:
+            config["run_id"] = time.strftime(
+                f"bt%Y%m%d-%H%M%S-{uuid.uuid4().hex[:6]}")
+            config["created_at"] = datetime.datetime.now(
+                datetime.timezone.utc).isoformat()
+            os.makedirs(self._folder(config["run_id"]))
+        config["origins"] = origins(data, config["step"], config["horizon"],
+                                    config["min_history"], config["start"],
+                                    config["end"])
+        config.update(status=RUNNING, finished_at=None, error=None)
+        return config, data
+
+    def _claim(self, db, options):
+        with self._lock:
+            if self.current is not None:
+                raise RuntimeError(
+                    f"Backtest {self.current['run_id']} is already running")
+            config, data = self.prepare(db, **options)
+            self.current = config
+        return config, data
+
+    def start(self, db, workers=None, **options):
+        """Lance un run en arrière-plan ; RuntimeError si un run est déjà
+        en cours."""
+        config, data = self._claim(db, options)
+        threading.Thread(target=self._run,
+                         args=(config, data, workers),
+                         daemon=True, name="backtest").start()
+        return config
+
+    def run(self, db, workers=None, **options):
+        """Exécute un run dans le thread courant (CLI, tests)."""
+        return self._run(*self._claim(db, options), workers)
+
+    def _run(self, config, data, workers):
+        workers = BACKTEST_WORKERS if workers is None else workers
+        results = os.path.join(self._folder(config["run_id"]), RESULTS_NAME)
+        _drop_partial_line(results)
+        done = {line["origin"] for line in read_results(results)}
+        pending = [o for o in config["origins"] if o not in done]
+        started = time.perf_counter()
+        self._write_config(config)
+        try:
+            with open(results, "a") as out:
+                for line in self._evaluate(config, data, pending, workers):
+                    out.write(json.dumps(line) + "\n")
+                    out.flush()
+                    os.fsync(out.fileno())
+            config.update(status=DONE)
+            self.completed += 1
+        except Exception as e:
+            logger.exception("Backtest %s failed: %s", config["run_id"], e)
+            config.update(status=FAILED, error=str(e))
+            self.failed += 1
+        finally:
+            config["finished_at"] = datetime.datetime.now(
+                datetime.timezone.utc).isoformat()
+            config["seconds"] = round(config.get("seconds", 0)
+                                      + time.perf_counter() - started, 3)
+            self._write_config(config)
+            with self._lock:
+                self.current = None
+        logger.info("Backtest %s %s: %d origins in %.1fs", config["run_id"],
+                    config["status"], len(pending), config["seconds"])
+        return config
+
+    def _evaluate(self, config, data, pending, workers):
+        args = (config["models"], config["horizon"], config["min_history"])
+        if workers <= 0:
+            _init_worker(data)
+            for origin in pending:
+                yield evaluate_origin(origin, *args)
+            return
+        # "spawn" : processus propres, indépendants des threads de l'API ;
+        # les données sont transmises une fois par processus.
+        with ProcessPoolExecutor(
+                max_workers=min(workers, max(len(pending), 1)),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(data,)) as executor:
+            futures = [executor.submit(evaluate_origin, origin, *args)
+                       for origin in pending]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def runs(self):
+        """Runs connus, du plus ancien au plus récent."""
+        found = []
+        try:
+            names = sorted(os.listdir(self.directory))
+        except OSError:
+            names = []
+        for name in names:
+            try:
+                found.append(self.get(name, details=False))
+            except (OSError, ValueError):
+                continue
+        return found
+
+    def get(self, run_id, details=True):
+        """État d'un run et, si `details`, son rapport (partiel tant que
+        le run est en cours). OSError si le run n'existe pas."""
+        config = self._read_config(run_id)
+        current = self.current
+        if config["status"] == RUNNING and (
+                current is None or current["run_id"] != config["run_id"]):
+            # Processus arrêté pendant le run : à reprendre (resume).
+            config["status"] = INTERRUPTED
+        lines = read_results(os.path.join(self._folder(run_id),
+                                          RESULTS_NAME))
+        done = {line["origin"] for line in lines}
+        config = dict(config, completed_origins=len(done),
+                      origins=len(config["origins"]))
+        if details:
+            config["report"] = report(lines, config["models"])
+        return config
+
+    def stats(self):
+        current = self.current
+        return {"running": current["run_id"] if current else None,
+                "completed": self.completed, "failed": self.failed}
+
+
+backtester = Backtester()
+metrics.register("backtesting", backtester.stats)
+
+
+if __name__ == "__main__":
+    import database
+    import logging_config
+
+    parser = argparse.ArgumentParser(
+        description="Évaluation des modèles par origine glissante")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--models", nargs="*", choices=MODELS)
+    parser.add_argument("--horizon", type=int)
+    parser.add_argument("--step", type=int)
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--resume", help="identifiant du run à reprendre")
+    args = parser.parse_args()
+    logging_config.setup_logging()
+    session = database.SessionLocal()
+    try:
+        config = backtester.run(session, workers=args.workers,
+                                models=args.models, horizon=args.horizon,
+                                step=args.step, start=args.start,
+                                end=args.end, resume=args.resume)
+    finally:
+        session.close()
+        logging_config.shutdown_logging()
+    result = backtester.get(config["run_id"])
+    print(f"{config['run_id']} {result['status']} "
+          f"{result['completed_origins']}/{result['origins']} origines "
+          f"en {result['seconds']}s")
+    for name, summary in result["report"].items():
+        if summary["n"]:
+            print(f"{name:<10} MAE={summary['mae']:8.4f}  "
+                  f"RMSE={summary['rmse']:8.4f}  "
+                  f"SMAPE={summary['smape']:6.2f}%  n={summary['n']}")
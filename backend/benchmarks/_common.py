@@ -0,0 +1,88 @@
+# backend/benchmarks/_common.py
+
+# Outils partagés par les scripts de benchmark : base SQLite temporaire
+# peuplée avec le CSV fourni, utilisateur authentifié et client de test.
+# Le client mesure le service lui-même : sans limitation de débit ni
+# cache des prévisions (chaque requête est calculée).
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0,
+                os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+import auth  # noqa: E402
+import base  # noqa: E402
+import data_loader  # noqa: E402
+import database  # noqa: E402
+import forecast_cache  # noqa: E402
+import models  # noqa: E402
+import query_stats  # noqa: E402
+import rate_limit  # noqa: E402
+
+
+def make_client(countries=None):
+    """Crée une base temporaire peuplée, un utilisateur admin et
+    retourne (client, headers d'authentification, session factory)."""
+    tmp_dir = tempfile.mkdtemp(prefix="mspr-bench-")
+    engine = create_engine(
+        f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}",
+        connect_args={"check_same_thread": False})
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    base.Base.metadata.create_all(bind=engine)
+    query_stats.instrument_engine(engine)
+    # Sessions ouvertes hors requête (historique des prédictions, suivi
+    # de la précision, préchauffage) : même base temporaire, pas de
+    # sql_app.db dans le dossier courant.
+    database.SessionLocal.configure(bind=engine)
+
+    db = Session()
+    data_loader.import_data_from_csv(db)
+    if countries:
+        db.query(models.Data).filter(
+            models.Data.country.notin_(countries)).delete(
+                synchronize_session=False)
+    db.add(models.User(username="bench", is_admin=True,
+                       hashed_password=auth.get_password_hash("bench")))
+    db.commit()
+    db.close()
+
+    import main
+
+    def override_get_db():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+    main.app.dependency_overrides[database.get_db] = override_get_db
+    rate_limit.RATE_LIMIT_ENABLED = False
+    forecast_cache.cache = forecast_cache.ForecastCache(maxsize=0)
+    token = auth.create_access_token({"sub": "bench"})
+    return (TestClient(main.app),
+            {"Authorization": f"Bearer {token}"}, Session)
+
+
+def timeit(fn, repeat=50, warmup=3):
+    """Retourne (moyenne, p50, p95) en millisecondes."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return (sum(samples) / len(samples), samples[len(samples) // 2],
+            samples[int(len(samples) * 0.95) - 1])
+
+
+def report(label, stats):
+    mean, p50, p95 = stats
+    print(f"{label:<45} mean={mean:8.2f}ms  p50={p50:8.2f}ms  "
+          f"p95={p95:8.2f}ms")
@@ -0,0 +1,131 @@
+# backend/benchmarks/bench_fast_forecast.py
+
+# Modèles légers (fast_forecast) comparés à Prophet sur le CSV livré :
+#   - latence d'une prévision à 7 jours (ajustement compris pour les
+#     modèles légers ; modèle Prophet livré déjà chargé),
+#   - précision : pour chaque pays, ajustement sur l'historique jusqu'à
+#     la date d'origine puis erreur sur les 7 jours suivants (MAE et
+#     SMAPE du taux de mortalité). Prophet est ré-entraîné par pays
+#     avec les réglages de training.py (le modèle livré a vu la période
+#     évaluée) ; "naive" répète la dernière valeur observée,
+#   - prévision des trois séries cas / décès / guérisons
+#     (/api/predict/multi) : ajustées ensemble ou une par une.
+#
+# Usage (depuis backend/) : python benchmarks/bench_fast_forecast.py [pays]
+import logging
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from _common import report, timeit
+
+import data_loader
+import fast_forecast
+import feature_store
+import ml_model
+
+ORIGIN = pd.Timestamp("2020-07-13")
+HORIZON = 7
+TARGETS = ['cases', 'deaths', 'recovered']
+
+
+def load_histories():
+    features = feature_store.compute_features(
+        pd.read_csv(data_loader.CSV_PATH))
+    features = features.rename(columns={'date': 'ds',
+                                        'mortality_rate': 'taux_mortalite'})
+    features['ds'] = pd.to_datetime(features['ds'])
+    features = features.sort_values(['country', 'ds'])
+    return {country: frame.reset_index(drop=True)
+            for country, frame in features.groupby('country')}
+
+
+def prophet_forecast(train, days):
+    from prophet import Prophet
+    model = Prophet(yearly_seasonality=False, daily_seasonality=False)
+    model.add_regressor('cases_log')
+    model.fit(train.rename(columns={'taux_mortalite': 'y'})[
+        ['ds', 'y', 'cases_log']])
+    future = model.make_future_dataframe(periods=days, include_history=False)
+    future['cases_log'] = train['cases_log'].iloc[-1]
+    return model.predict(future)['yhat'].to_numpy()
+
+
+def naive_forecast(train, days):
+    return np.full(days, train['taux_mortalite'].iloc[-1])
+
+
+def smape(actual, predicted):
+    denominator = np.abs(actual) + np.abs(predicted)
+    ratio = np.divide(2 * np.abs(actual - predicted), denominator,
+                      out=np.zeros_like(actual), where=denominator > 0)
+    return 100 * ratio.mean()
+
+
+def main():
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    histories = load_histories()
+
+    france = histories["France"]
+    france = france[france['ds'] <= ORIGIN]
+    for name in sorted(fast_forecast.MODELS):
+        report(f"{name} days={HORIZON}",
+               timeit(lambda: fast_forecast.predict(name, france, HORIZON),
+                      repeat=500))
+        report(f"{name} days={HORIZON} uncertainty",
+               timeit(lambda: fast_forecast.predict(
+                   name, france, HORIZON, uncertainty=True), repeat=500))
+    counts = pd.read_csv(data_loader.CSV_PATH, parse_dates=['date']).rename(
+        columns={'date': 'ds'})
+    counts = counts[(counts['country'] == "France")
+                    & (counts['ds'] <= ORIGIN)].sort_values('ds')
+    for name in sorted(fast_forecast.MODELS):
+        report(f"{name} {len(TARGETS)} séries ensemble", timeit(
+            lambda: fast_forecast.predict_series(name, counts, TARGETS,
+                                                 HORIZON), repeat=500))
+        report(f"{name} {len(TARGETS)} séries une par une", timeit(
+            lambda: [fast_forecast.predict_series(name, counts, [target],
+                                                  HORIZON)
+                     for target in TARGETS], repeat=500))
+    report(f"prophet (modèle livré) days={HORIZON}",
+           timeit(lambda: ml_model.predict_with_prophet(france.copy(),
+                                                        HORIZON), repeat=20))
+
+    forecasters = {"naive": naive_forecast, "prophet": prophet_forecast}
+    forecasters.update({
+        name: (lambda train, days, name=name: fast_forecast.predict(
+            name, train, days)['yhat'].to_numpy())
+        for name in sorted(fast_forecast.MODELS)})
+    errors = {name: [] for name in forecasters}
+    seconds = dict.fromkeys(forecasters, 0.0)
+    evaluated = 0
+    for country, frame in histories.items():
+        train = frame[frame['ds'] <= ORIGIN]
+        actual = frame[frame['ds'] > ORIGIN]['taux_mortalite'].to_numpy()[
+            :HORIZON]
+        if len(train) < 30 or len(actual) < HORIZON:
+            continue
+        for name, forecaster in forecasters.items():
+            start = time.perf_counter()
+            predicted = forecaster(train, HORIZON)
+            seconds[name] += time.perf_counter() - start
+            errors[name].append((np.abs(actual - predicted).mean(),
+                                 smape(actual, predicted)))
+        evaluated += 1
+        if evaluated >= limit:
+            break
+
+    print(f"\nPrécision sur {evaluated} pays, origine {ORIGIN.date()}, "
+          f"horizon {HORIZON} jours (taux de mortalité, %)")
+    for name, values in errors.items():
+        mae, smape_ = np.mean(values, axis=0)
+        print(f"{name:<10} MAE={mae:7.4f}  SMAPE={smape_:6.2f}%  "
+              f"ajustement+prévision={seconds[name] / evaluated * 1000:8.2f}"
+              f"ms/pays")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# backend/benchmarks/bench_history_fetch.py
+
+# Préparation des entrées et de la sortie de /api/predict sur un long
+# historique (plusieurs années de données journalières par pays) :
+#   - "legacy" : toutes les lignes ORM du pays, liste de dicts construite
+#                en boucle, filtre de date en pandas ; sortie remplie
+#                ligne à ligne avec forecast.iloc[i],
+#   - "lean"   : filtre de date et colonnes en SQL (features lues depuis
+#                le store), DataFrame construit par colonnes ; sortie
+#                construite par colonnes.
+#
+# Usage (depuis backend/) : python benchmarks/bench_history_fetch.py
+import datetime
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from _common import report, timeit
+
+import base
+import feature_store
+import models
+import routes
+import schemas
+
+YEARS = 20
+COUNTRIES = 5
+
+
+def make_session():
+    tmp_dir = tempfile.mkdtemp(prefix="mspr-bench-")
+    engine = create_engine(f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}")
+    base.Base.metadata.create_all(bind=engine)
+    days = YEARS * 365
+    start = datetime.date(2000, 1, 1)
+    rows = [{"country": f"Country{c}",
+             "date": start + datetime.timedelta(days=i),
+             "confirmed": 100 + i * 10, "deaths": i, "recovered": i,
+             "new_cases": 10, "new_deaths": 1, "new_recovered": 1}
+            for c in range(COUNTRIES) for i in range(days)]
+    with engine.begin() as conn:
+        conn.execute(insert(models.Data), rows)
+    db = sessionmaker(bind=engine)()
+    feature_store.rebuild(db)
+    db.commit()
+    return db, start + datetime.timedelta(days=days // 2)
+
+
+def legacy_history(db, country, reference_date):
+    historical_data = db.query(models.Data).filter(
+        models.Data.country == country).order_by(models.Data.date).all()
+    df_data = []
+    for d in historical_data:
+        df_data.append({
+            'date': d.date, 'cases': d.confirmed, 'deaths': d.deaths,
+            'recovered': d.recovered, 'new_cases': d.new_cases,
+            'new_deaths': d.new_deaths, 'new_recovered': d.new_recovered,
+            'country': d.country})
+    df = pd.DataFrame(df_data)
+    df['taux_mortalite'] = ((df['deaths'] / df['cases']) * 100).fillna(0)
+    return df[df['date'] <= reference_date].copy()
+
+
+def legacy_output(forecast, reference_date, days):
+    predictions = []
+    for i in range(days):
+        pred_date = reference_date + pd.Timedelta(days=i+1)
+        predictions.append({
+            "day": i+1,
+            "predicted_value": float(forecast.iloc[i]["yhat"]),
+            "date": pred_date.isoformat(),
+            "lower": float(forecast.iloc[i]["yhat_lower"]),
+            "upper": float(forecast.iloc[i]["yhat_upper"])})
+    return predictions
+
+
+def main():
+    db, reference_date = make_session()
+    prediction_in = schemas.PredictionIn(country="Country0", days=30,
+                                         prediction_type="taux_mortalite")
+    print(f"{COUNTRIES} pays x {YEARS} ans, date de référence "
+          f"{reference_date}")
+
+    report("history legacy",
+           timeit(lambda: legacy_history(db, "Country0", reference_date),
+                  repeat=20))
+    report("history lean",
+           timeit(lambda: routes._load_history(db, prediction_in,
+                                               reference_date), repeat=20))
+
+    forecast = pd.DataFrame({name: np.random.rand(30) for name in
+                             ("yhat", "yhat_lower", "yhat_upper")})
+    report("output legacy days=30",
+           timeit(lambda: legacy_output(forecast, reference_date, 30),
+                  repeat=200))
+    report("output vectorized days=30",
+           timeit(lambda: routes._format_predictions(
+               forecast, reference_date, 30, uncertainty=True), repeat=200))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# backend/benchmarks/bench_logging.py
+
+# Compare la latence de /api/predict et d'une lecture authentifiée
+# (/api/me) selon la configuration de logs :
+#   - "legacy"  : logging.basicConfig(level=DEBUG), handler synchrone,
+#   - "queue"   : pipeline logging_config au niveau DEBUG (file + échantillonnage),
+#   - "default" : pipeline logging_config au niveau INFO (configuration par défaut).
+# Mesure aussi le coût d'un enregistrement dans le thread appelant
+# (handler synchrone vs simple dépôt dans la file). La sortie simule un
+# stdout lent (pipe plein, driver de logs Docker) : chaque écriture
+# bloque SINK_DELAY_MS.
+#
+# Usage (depuis backend/) : python benchmarks/bench_logging.py
+import logging
+import os
+import time
+
+from _common import make_client, report, timeit
+
+import logging_config
+import ml_model
+
+SINK_DELAY_MS = float(os.getenv("SINK_DELAY_MS", "0.2"))
+LOCAL_PROPHET = os.path.join(os.path.dirname(__file__), '..',
+                             'models_and_results', 'prophet_model')
+
+
+class SlowSink:
+    """Flux de sortie dont chaque écriture bloque quelques dixièmes
+    de milliseconde, comme un stdout redirigé vers un pipe saturé."""
+
+    def write(self, data):
+        time.sleep(SINK_DELAY_MS / 1000)
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+def configure(mode, sink):
+    logging_config.shutdown_logging()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    if mode == "legacy":
+        logging.basicConfig(level=logging.DEBUG, stream=sink, force=True)
+        return
+    logging_config.LOG_LEVEL = "DEBUG" if mode == "queue" else "INFO"
+    logging_config.setup_logging(stream=sink)
+
+
+def main():
+    if os.path.exists(LOCAL_PROPHET):
+        ml_model.PROPHET_PATH = LOCAL_PROPHET
+    client, headers, _ = make_client(countries=["France"])
+    payload = {"country": "France", "days": 7,
+               "prediction_type": "taux_mortalite",
+               "reference_date": "2020-07-01"}
+
+    sink = SlowSink()
+    for mode in ("legacy", "queue", "default"):
+        configure(mode, sink)
+        report(f"[{mode}] POST /api/predict",
+               timeit(lambda: client.post("/api/predict", json=payload,
+                                          headers=headers), repeat=30))
+        report(f"[{mode}] GET /api/me",
+               timeit(lambda: client.get("/api/me", headers=headers),
+                      repeat=300))
+        logger = logging.getLogger("bench.emit")
+        report(f"[{mode}] logger.warning x1000 (thread appelant)",
+               timeit(lambda: [logger.warning("payload %s", payload)
+                               for _ in range(1000)], repeat=20))
+    logging_config.shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# backend/benchmarks/bench_model_load.py
+
+# Chargement à froid des modèles, chaque mesure dans un nouveau
+# processus Python (imports compris, comme au démarrage d'un worker) :
+#   - "pickle"   : ancien prophet_model.pkl (pickle.load importe Prophet
+#                  et exécute le code du fichier),
+#   - "artifact" : artefact model_artifact (JSON + .npy projetés en
+#                  mémoire, empreintes vérifiées), évaluation numpy,
+# puis première prévision ponctuelle à 7 jours.
+#
+# Usage (depuis backend/) : python benchmarks/bench_model_load.py
+import json
+import os
+import subprocess
+import sys
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+REPEAT = 5
+
+# numpy et pandas sont déjà importés par l'API : hors mesure.
+COMMON = """
+import json, time
+import numpy, pandas
+started = time.perf_counter()
+{load}
+loaded = time.perf_counter()
+{predict}
+done = time.perf_counter()
+print(json.dumps([loaded - started, done - started]))
+"""
+
+CASES = {
+    "prophet pickle": (
+        "import pickle\n"
+        "model = pickle.load(open('models_and_results/prophet_model.pkl', "
+        "'rb'))",
+        "future = model.make_future_dataframe(periods=7, "
+        "include_history=False)\n"
+        "future['cases_log'] = 5.0\n"
+        "import ml_model\n"
+        "ml_model._predict_point(model, future)"),
+    "prophet artifact": (
+        "import model_artifact\n"
+        "model = model_artifact.load_prophet('models_and_results/"
+        "prophet_model')",
+        "future = model.make_future_dataframe(periods=7)\n"
+        "future['cases_log'] = 5.0\n"
+        "model.predict_point(future)"),
+}
+
+
+def run(load, predict):
+    env = dict(os.environ, PYTHONPATH=BACKEND)
+    output = subprocess.run(
+        [sys.executable, "-c", COMMON.format(load=load, predict=predict)],
+        cwd=BACKEND, env=env, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    for label, (load, predict) in CASES.items():
+        samples = sorted(run(load, predict) for _ in range(REPEAT))
+        load_ms, first_ms = (sorted(s[i] for s in samples)[REPEAT // 2]
+                             * 1000 for i in (0, 1))
+        print(f"{label:<20} load p50={load_ms:8.1f}ms  "
+              f"load+first forecast p50={first_ms:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
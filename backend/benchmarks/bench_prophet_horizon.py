@@ -0,0 +1,43 @@
+# backend/benchmarks/bench_prophet_horizon.py
+
+# Latence d'une prévision Prophet par requête :
+#   - "legacy"       : make_future_dataframe(historique + horizon),
+#                      predict() complet avec incertitude puis tail(days),
+#   - "horizon+unc"  : horizon seul, avec intervalles d'incertitude,
+#   - "horizon"      : horizon seul, prévision ponctuelle (défaut).
+#
+# Usage (depuis backend/) : python benchmarks/bench_prophet_horizon.py
+import numpy as np
+import pandas as pd
+
+from _common import report, timeit
+
+import ml_model
+
+
+def legacy(model, df, days):
+    future = model.make_future_dataframe(periods=days)
+    future = future.merge(df[['ds', 'cases_log']], on='ds', how='left')
+    future['cases_log'] = future['cases_log'].fillna(df['cases_log'].iloc[-1])
+    return model.predict(future).tail(days)
+
+
+def main():
+    model = ml_model.load_prophet()
+    df = pd.DataFrame({'ds': pd.date_range('2020-03-01', '2020-07-01')})
+    df['cases'] = np.linspace(100, 200000, len(df)).astype(int)
+    df['cases_log'] = np.log1p(df['cases'])
+
+    for days in (7, 30):
+        report(f"legacy       days={days}",
+               timeit(lambda: legacy(model, df, days), repeat=20))
+        report(f"horizon+unc  days={days}",
+               timeit(lambda: ml_model.predict_with_prophet(
+                   df.copy(), days, uncertainty=True), repeat=20))
+        report(f"horizon      days={days}",
+               timeit(lambda: ml_model.predict_with_prophet(
+                   df.copy(), days), repeat=100))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# backend/benchmarks/bench_timeseries_store.py
+
+# Endpoints de lecture servis depuis la base (lignes ORM puis DataOut)
+# ou depuis le store de séries en mémoire (timeseries_store), sur le
+# dataset complet du CSV ; et lecture de l'historique d'une prédiction
+# (store de features en SQL ou tranches des tableaux en mémoire).
+#
+# Usage (depuis backend/) : python benchmarks/bench_timeseries_store.py
+import datetime
+
+from _common import make_client, report, timeit
+
+import routes
+import schemas
+import timeseries_store
+
+QUERIES = ["/api/data?country=France", "/api/data?limit=10000",
+           "/api/countries"]
+
+
+def main():
+    client, _, Session = make_client()
+    db = Session()
+    print(f"{len(timeseries_store.read(db))} lignes")
+    prediction_in = schemas.PredictionIn(country="France", days=7,
+                                         prediction_type="taux_mortalite")
+    reference_date = datetime.date(2020, 7, 1)
+
+    for enabled in (False, True):
+        timeseries_store.TIMESERIES_STORE_ENABLED = enabled
+        label = "store" if enabled else "db"
+        for query in QUERIES:
+            report(f"{label:<6} GET {query}",
+                   timeit(lambda: client.get(query), repeat=20))
+        report(f"{label:<6} history France",
+               timeit(lambda: routes._load_history(db, prediction_in,
+                                                   reference_date),
+                      repeat=100))
+    report("store load (db)",
+           timeit(lambda: timeseries_store.store.load(db), repeat=5,
+                  warmup=1))
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
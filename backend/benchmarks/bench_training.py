@@ -0,0 +1,47 @@
+# backend/benchmarks/bench_training.py
+
+# Durée d'entraînement des modèles par pays selon le nombre de
+# processus (1 puis tous les cœurs), sur les pays du CSV livré, puis
+# durée d'une exécution incrémentale sans changement de données.
+#
+# Usage (depuis backend/) : python benchmarks/bench_training.py [pays]
+import os
+import sys
+import tempfile
+import time
+
+from _common import make_client
+
+import model_registry
+import training
+
+
+def main():
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    _, _, Session = make_client()
+    db = Session()
+    countries = sorted(training.load_training_data(db)['country'].unique())
+    countries = countries[:limit]
+    registry = model_registry.ModelRegistry(tempfile.mkdtemp(
+        prefix="mspr-registry-"))
+    cpus = os.cpu_count() or 1
+    print(f"{len(countries)} pays, {cpus} cœur(s)")
+
+    for workers in sorted({1, cpus}):
+        start = time.perf_counter()
+        version = training.train(db, registry, workers=workers,
+                                 countries=countries, full=True)
+        print(f"full        workers={workers:<3} "
+              f"{time.perf_counter() - start:7.2f}s "
+              f"({len(version.metadata['trained'])} entraînés)")
+
+    start = time.perf_counter()
+    version = training.train(db, registry, countries=countries)
+    print(f"incremental workers={cpus:<3} "
+          f"{time.perf_counter() - start:7.2f}s "
+          f"({version.metadata['reused']} repris)")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
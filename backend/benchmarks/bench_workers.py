@@ -0,0 +1,123 @@
+# backend/benchmarks/bench_workers.py
+
+# Débit de l'API servie par gunicorn (gunicorn.conf.py) avec 1 worker
+# puis N workers, sur une base temporaire peuplée au démarrage :
+#   - GET  /api/data?country=...  (store de séries en mémoire),
+#   - POST /api/predict           (modèle léger ; dates de référence
+#                                  variées pour limiter les hits du cache).
+# CLIENTS threads envoient des requêtes pendant DURATION secondes ; on
+# mesure requêtes/s et latence p50/p95. Limites de débit désactivées,
+# file du bulkhead predict dimensionnée pour tous les clients.
+#
+# Usage (depuis backend/) :
+#   python benchmarks/bench_workers.py [N] [modèle]
+import datetime
+import itertools
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+PORT = 8765
+CLIENTS = 16
+DURATION = 15
+COUNTRIES = ["France", "Switzerland", "US", "Germany", "Italy", "Spain"]
+
+
+def start(workers):
+    tmp_dir = tempfile.mkdtemp(prefix="mspr-bench-")
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers),
+               BIND=f"127.0.0.1:{PORT}",
+               DATABASE_URL=f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}",
+               WORKER_SYNC_DIR=os.path.join(tmp_dir, "sync"),
+               RATE_LIMIT_ENABLED="0", CACHE_WARM_ENABLED="0",
+               BULKHEAD_PREDICT_QUEUE=str(2 * CLIENTS),
+               PREDICTION_HISTORY_ENABLED="0", LOG_LEVEL="WARNING")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+         "main:app"], cwd=BACKEND, env=env, stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{PORT}/api"
+    for _ in range(600):
+        try:
+            if httpx.get(f"{url}/countries").status_code == 200:
+                break
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    client = httpx.Client(base_url=url)
+    client.post("/register", json={"username": "bench",
+                                   "email": "bench@example.com",
+                                   "password": "benchbench"})
+    token = client.post("/token", data={
+        "username": "bench", "password": "benchbench"}).json()[
+            "access_token"]
+    # Toutes les connexions des workers établies avant la mesure.
+    time.sleep(1)
+    return server, url, {"Authorization": f"Bearer {token}"}
+
+
+def load(url, request):
+    """Requêtes en boucle depuis CLIENTS threads ; retourne (req/s,
+    latences triées en ms, erreurs)."""
+    latencies, errors = [], []
+    deadline = time.perf_counter() + DURATION
+
+    def run(offset):
+        with httpx.Client(base_url=url, timeout=60) as client:
+            for i in itertools.count(offset):
+                if time.perf_counter() > deadline:
+                    return
+                started = time.perf_counter()
+                response = request(client, i)
+                latencies.append((time.perf_counter() - started) * 1000)
+                if response.status_code != 200:
+                    errors.append(response.status_code)
+
+    threads = [threading.Thread(target=run, args=(n * 10007,))
+               for n in range(CLIENTS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    return len(latencies) / DURATION, latencies, errors
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else max(2, os.cpu_count())
+    model = sys.argv[2] if len(sys.argv) > 2 else "holt"
+    start_date = datetime.date(2020, 4, 1)
+    print(f"{os.cpu_count()} CPU, {CLIENTS} clients, {DURATION}s par mesure")
+    for workers in (1, n):
+        server, url, headers = start(workers)
+        try:
+            cases = {
+                "GET /api/data": lambda client, i: client.get(
+                    "/data", params={"country": COUNTRIES[i % 6]}),
+                f"POST /api/predict ({model})": lambda client, i: client.post(
+                    "/predict", headers=headers, json={
+                        "country": COUNTRIES[i % 6], "days": 7,
+                        "prediction_type": "taux_mortalite", "model": model,
+                        "reference_date": (start_date + datetime.timedelta(
+                            days=i // 6 % 90)).isoformat()}),
+            }
+            for label, request in cases.items():
+                rate, latencies, errors = load(url, request)
+                p50 = latencies[len(latencies) // 2]
+                p95 = latencies[int(len(latencies) * 0.95) - 1]
+                print(f"workers={workers:<3} {label:<28} {rate:8.1f} req/s"
+                      f"  p50={p50:7.1f}ms  p95={p95:7.1f}ms"
+                      f"  errors={len(errors)}")
+        finally:
+            server.terminate()
+            server.wait(timeout=60)
+
+
+if __name__ == "__main__":
+    main()
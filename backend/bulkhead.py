@@ -0,0 +1,159 @@
+# backend/bulkhead.py
+
+# Cloisons (bulkheads) par groupe de routes : chaque groupe a sa propre
+# limite de requêtes simultanées et une file d'attente bornée. Quand la
+# file est pleine ou que l'attente dépasse le délai, la requête est
+# rejetée immédiatement (503 + Retry-After) au lieu d'occuper un thread :
+# une rafale de /api/predict ne peut plus affamer /api/data.
+import asyncio
+import json
+import os
+from collections import deque
+
+import metrics
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def _env_float(name, default):
+    return float(os.getenv(name, default))
+
+
+class Bulkhead:
+    """Sémaphore asynchrone avec file d'attente bornée et délai."""
+
+    def __init__(self, name, prefixes, max_concurrent, max_queue, timeout):
+        self.name = name
+        self.prefixes = tuple(prefixes)
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.active = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._waiters = deque()
+
+    def matches(self, path):
+        # Comparaison par segments : /api/predict ne couvre pas
+        # /api/predictions/history.
+        return any(path == prefix or path.startswith(prefix + "/")
+                   for prefix in self.prefixes)
+
+    async def acquire(self):
+        """Retourne True si une place est obtenue, False si la requête
+        doit être rejetée (file pleine ou délai d'attente dépassé)."""
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            self.accepted += 1
+            return True
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            return False
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # release() transmet directement sa place au premier en attente.
+            await asyncio.wait_for(waiter, self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            return False
+        except asyncio.CancelledError:
+            # Place transmise juste avant l'annulation : on la rend.
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        self.accepted += 1
+        return True
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+        self.active -= 1
+
+    def stats(self):
+        return {
+            "active": self.active,
+            "queued": len(self._waiters),
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+def _group(name, prefixes, concurrency, queue, timeout):
+    # Chaque limite est surchargeable : BULKHEAD_<NOM>_CONCURRENCY,
+    # BULKHEAD_<NOM>_QUEUE, BULKHEAD_<NOM>_TIMEOUT (secondes).
+    key = f"BULKHEAD_{name.upper()}"
+    return Bulkhead(name, prefixes,
+                    _env_int(f"{key}_CONCURRENCY", concurrency),
+                    _env_int(f"{key}_QUEUE", queue),
+                    _env_float(f"{key}_TIMEOUT", timeout))
+
+
+_cpus = os.cpu_count() or 1
+# Ordre significatif : le premier groupe dont un préfixe correspond gagne.
+BULKHEADS = [
+    # Soumission et suivi des tâches : le calcul a lieu hors requête.
+    _group("jobs", ["/api/predict/jobs"], 32, 64, 5),
+    _group("predict", ["/api/predict"], _cpus, 2 * _cpus, 10),
+    _group("ingest", ["/api/load-data", "/api/reload"], 1, 1, 30),
+    _group("read", ["/api/data", "/api/countries", "/api/predictions"],
+           32, 64, 5),
+]
+
+metrics.register(
+    "bulkheads", lambda: {b.name: b.stats() for b in BULKHEADS})
+
+
+def find(path):
+    for bulkhead in BULKHEADS:
+        if bulkhead.matches(path):
+            return bulkhead
+    return None
+
+
+class BulkheadMiddleware:
+    """Middleware ASGI appliquant le bulkhead du groupe de la route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        bulkhead = find(scope["path"]) if scope["type"] == "http" else None
+        if bulkhead is None:
+            await self.app(scope, receive, send)
+            return
+        if not await bulkhead.acquire():
+            await _reject(send, bulkhead)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            bulkhead.release()
+
+
+async def _reject(send, bulkhead):
+    body = json.dumps({
+        "detail": f"Service saturé ({bulkhead.name}), réessayez plus tard."
+    }).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", b"1"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
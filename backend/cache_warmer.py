@@ -0,0 +1,233 @@
+# backend/cache_warmer.py
+
+# Préchauffage du cache des prévisions. L'essentiel du trafic de
+# /api/predict porte sur quelques combinaisons : le frontend propose
+# France, Switzerland et US, la date de référence 2020-07-01 et un
+# horizon de 7 jours. Un thread calcule à l'avance ces combinaisons
+# (CACHE_WARM_*) puis les CACHE_WARM_TOP requêtes les plus fréquentes de
+# l'historique des prédictions sur les CACHE_WARM_WINDOW dernières heures.
+#
+# Déclenché au démarrage, après l'activation d'une version du modèle et
+# après chaque import ou écriture de données (le cache vient d'être
+# invalidé). Le préchauffage cède toujours la place au trafic réel :
+# - il attend tant qu'une prédiction (/api/predict ou tâche) est en cours,
+# - il respecte un budget CPU (CACHE_WARM_CPU_BUDGET, fraction du temps
+#   passée à calculer : après un calcul de t secondes, pause de
+#   t * (1 - budget) / budget),
+# - un nouveau déclenchement interrompt le passage en cours, qui reprend
+#   depuis le début (nouvelle génération du cache).
+import datetime
+import logging
+import os
+import threading
+import time
+
+from fastapi import HTTPException
+from sqlalchemy import func
+
+import bulkhead
+import database
+import metrics
+import model_registry
+import models
+import prediction_history
+import prediction_jobs
+import schemas
+
+logger = logging.getLogger(__name__)
+
+
+def _list(value):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+CACHE_WARM_ENABLED = os.getenv(
+    "CACHE_WARM_ENABLED", "1").lower() in ("1", "true", "yes")
+# Combinaisons préchauffées systématiquement (valeurs du frontend).
+CACHE_WARM_COUNTRIES = _list(os.getenv("CACHE_WARM_COUNTRIES",
+                                       "France,Switzerland,US"))
+CACHE_WARM_MODELS = _list(os.getenv("CACHE_WARM_MODELS", "prophet"))
+CACHE_WARM_REFERENCE_DATE = os.getenv("CACHE_WARM_REFERENCE_DATE",
+                                      "2020-07-01")
+CACHE_WARM_DAYS = int(os.getenv("CACHE_WARM_DAYS", "7"))
+# Requêtes les plus fréquentes de l'historique, sur une fenêtre (heures).
+CACHE_WARM_TOP = int(os.getenv("CACHE_WARM_TOP", "20"))
+CACHE_WARM_WINDOW = float(os.getenv("CACHE_WARM_WINDOW", "24"))
+# Fraction maximale du temps passée à calculer (0 < budget <= 1).
+CACHE_WARM_CPU_BUDGET = float(os.getenv("CACHE_WARM_CPU_BUDGET", "0.25"))
+# Intervalle de vérification du trafic et du chargement d'un modèle.
+POLL_INTERVAL = 0.1
+
+
+def live_predictions():
+    """Nombre de prédictions en cours (requêtes et tâches)."""
+    return (bulkhead.find("/api/predict").active
+            + prediction_jobs.store.active())
+
+
+class CacheWarmer:
+    """Préchauffage du cache des prévisions dans un thread."""
+
+    def __init__(self, session_factory=None, countries=(), models=(),
+                 reference_date="2020-07-01", days=7, top=20, window=24,
+                 cpu_budget=0.25):
+        self.session_factory = session_factory or database.SessionLocal
+        self.countries = list(countries)
+        self.models = list(models)
+        self.reference_date = reference_date
+        self.days = days
+        self.top = top
+        self.window = window
+        self.cpu_budget = min(max(cpu_budget, 0.01), 1.0)
+        self.runs = 0
+        self.warmed = 0
+        self.skipped = 0
+        self.failures = 0
+        self.interrupted = 0
+        self.waited_seconds = 0.0
+        self.last_reason = None
+        self.last_run_seconds = None
+        self._reasons = []
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._loop, daemon=True, name="cache-warmer")
+                self._thread.start()
+
+    def schedule(self, reason):
+        """Demande un passage (démarrage, modèle, données...)."""
+        with self._lock:
+            self._reasons.append(reason)
+        if self._thread is None:
+            self.start()
+        self._wakeup.set()
+
+    def _loop(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            try:
+                self.run()
+            except Exception as e:
+                logger.exception("Cache warming failed: %s", e)
+                self.failures += 1
+
+    def targets(self, db):
+        """Requêtes à préchauffer (paramètres de PredictionIn), sans
+        doublons : combinaisons fixes puis plus fréquentes."""
+        targets = [dict(country=country, model=model,
+                        prediction_type="taux_mortalite",
+                        days=self.days, reference_date=self.reference_date,
+                        uncertainty=False)
+                   for model in self.models for country in self.countries]
+        if self.top > 0:
+            History = models.PredictionHistory
+            columns = (History.country, History.model,
+                       History.prediction_type, History.days,
+                       History.reference_date, History.uncertainty)
+            since = datetime.datetime.utcnow() - datetime.timedelta(
+                hours=self.window)
+            # Prévisions de /api/predict (séries de comptage de
+            # /api/predict/multi exclues).
+            rows = db.query(*columns).filter(
+                History.created_at >= since,
+                History.prediction_type == "taux_mortalite").group_by(
+                    *columns).order_by(
+                        func.count().desc()).limit(self.top).all()
+            targets += [dict(country=country, model=model,
+                             prediction_type=prediction_type, days=days,
+                             reference_date=reference_date.isoformat(),
+                             uncertainty=bool(uncertainty))
+                        for country, model, prediction_type, days,
+                        reference_date, uncertainty in rows]
+        unique = {}
+        for target in targets:
+            unique.setdefault(tuple(sorted(target.items())), target)
+        return list(unique.values())
+
+    def run(self):
+        """Préchauffe les requêtes de targets() ; retourne le nombre de
+        prévisions calculées."""
+        # Import différé : routes importe ce module.
+        import routes
+
+        with self._lock:
+            reasons, self._reasons = self._reasons, []
+        with self._run_lock:
+            started = time.perf_counter()
+            self.last_reason = ", ".join(reasons) or None
+            # Version en cours de chargement : préchauffer la nouvelle.
+            self._wait(lambda: model_registry.registry.loading is not None)
+            # Les requêtes de l'historique encore en tampon comptent.
+            prediction_history.writer.flush()
+            warmed = 0
+            db = self.session_factory()
+            try:
+                for target in self.targets(db):
+                    if self._wakeup.is_set():
+                        # Nouveau déclenchement : le passage reprend.
+                        self.interrupted += 1
+                        break
+                    self._wait(lambda: live_predictions() > 0)
+                    computed_at = time.perf_counter()
+                    try:
+                        computed = routes.warm_prediction(
+                            db, schemas.PredictionIn(**target))
+                    except HTTPException as e:
+                        # Pays sans données, paramètres invalides...
+                        logger.debug("Cache warming skipped %s: %s",
+                                     target, e.detail)
+                        self.failures += 1
+                        continue
+                    if not computed:
+                        self.skipped += 1
+                        continue
+                    warmed += 1
+                    self.warmed += 1
+                    self._throttle(time.perf_counter() - computed_at)
+            finally:
+                db.close()
+            self.runs += 1
+            self.last_run_seconds = round(time.perf_counter() - started, 3)
+            logger.info("Cache warming (%s): %d forecasts in %.2fs",
+                        self.last_reason, warmed, self.last_run_seconds)
+            return warmed
+
+    def _wait(self, busy):
+        waited = time.perf_counter()
+        while busy():
+            time.sleep(POLL_INTERVAL)
+        self.waited_seconds += time.perf_counter() - waited
+
+    def _throttle(self, elapsed):
+        pause = elapsed * (1 - self.cpu_budget) / self.cpu_budget
+        if pause > 0:
+            time.sleep(pause)
+            self.waited_seconds += pause
+
+    def stats(self):
+        return {"runs": self.runs, "warmed": self.warmed,
+                "skipped": self.skipped, "failures": self.failures,
+                "interrupted": self.interrupted,
+                "waited_seconds": round(self.waited_seconds, 3),
+                "last_reason": self.last_reason,
+                "last_run_seconds": self.last_run_seconds}
+
+
+warmer = CacheWarmer(countries=CACHE_WARM_COUNTRIES, models=CACHE_WARM_MODELS,
+                     reference_date=CACHE_WARM_REFERENCE_DATE,
+                     days=CACHE_WARM_DAYS, top=CACHE_WARM_TOP,
+                     window=CACHE_WARM_WINDOW,
+                     cpu_budget=CACHE_WARM_CPU_BUDGET)
+metrics.register("cache_warmer", warmer.stats)
+
+
+def schedule(reason):
+    if CACHE_WARM_ENABLED:
+        warmer.schedule(reason)
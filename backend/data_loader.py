@@ -1,7 +1,9 @@
 import pandas as pd
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 import os
 from models import Data  # Assure-toi que Data est importé depuis tes modèles
+import feature_store
 
 CSV_PATH = os.path.join(os.path.dirname(__file__), 'data', 'covid_cleaned.csv')
 
@@ -30,26 +32,28 @@ def import_data_from_csv(db: Session):
             df.groupby('country')['recovered']
             .diff().fillna(0).astype(int))
 
-        df['new_cases'] = df['new_cases'].apply(lambda x: max(0, x))
-        df['new_deaths'] = df['new_deaths'].apply(lambda x: max(0, x))
-        df['new_recovered'] = df['new_recovered'].apply(lambda x: max(0, x))
+        df['new_cases'] = df['new_cases'].clip(lower=0)
+        df['new_deaths'] = df['new_deaths'].clip(lower=0)
+        df['new_recovered'] = df['new_recovered'].clip(lower=0)
 
         # Supprime toutes les données existantes dans la table avant d'importer
         db.query(Data).delete()
         db.commit()
 
-        for _, row in df.iterrows():
-            data_record = Data(
-                country=row['country'],
-                date=row['date'].date(),
-                confirmed=row['cases'],
-                deaths=row['deaths'],
-                recovered=row['recovered'],
-                new_cases=row['new_cases'],
-                new_deaths=row['new_deaths'],
-                new_recovered=row['new_recovered']
-            )
-            db.add(data_record)
+        # Insertion en masse à partir des colonnes, sans objet ORM par ligne.
+        records = pd.DataFrame({
+            'country': df['country'],
+            'date': df['date'].dt.date,
+            'confirmed': df['cases'],
+            'deaths': df['deaths'],
+            'recovered': df['recovered'],
+            'new_cases': df['new_cases'],
+            'new_deaths': df['new_deaths'],
+            'new_recovered': df['new_recovered'],
+        }).to_dict('records')
+        db.execute(insert(Data), records)
+        # Features du modèle calculées une fois, pour tout le dataset.
+        feature_store.rebuild(db, df)
 
         db.commit()
         return {"status": "success",
@@ -10,6 +10,7 @@ import os
 # à partir d'un fichier .env.
 from dotenv import load_dotenv
 import base
+import query_stats
 
 # Charger les variables d'environnement au démarrage de l'application.
 load_dotenv()
@@ -27,6 +28,9 @@ SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./sql_app.db")
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
+# Mesure du nombre et de la durée des requêtes SQL par requête HTTP
+# (voir query_stats.py).
+query_stats.instrument_engine(engine)
 
 # Crée la classe SessionLocal.
 # Une instance de SessionLocal sera une session de base de données.
@@ -63,3 +67,7 @@ def init_db():
     # Crée les tables en se basant sur les métadonnées
     # des modèles et le moteur de base de données.
     base.Base.metadata.create_all(bind=engine)
+    # create_all n'ajoute pas les index aux tables existantes.
+    for table in base.Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
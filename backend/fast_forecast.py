@@ -0,0 +1,149 @@
+# backend/fast_forecast.py
+
+# Modèles de prévision légers, ajustés à chaque requête en numpy sur la
+# fin de l'historique du pays (taux de mortalité, ou plusieurs séries à
+# la fois : cas, décès, guérisons) :
+#   - "holt"      : lissage exponentiel à tendance additive (Holt),
+#   - "damped"    : Holt à tendance amortie,
+#   - "loglinear" : croissance log-linéaire (moindres carrés sur log(1 + y)).
+# Les paramètres du lissage sont choisis par recherche sur une grille,
+# toutes les combinaisons (et toutes les séries) étant évaluées en même
+# temps (une opération numpy par pas de temps). Ajustement et prévision
+# prennent moins d'une milliseconde : ces modèles sont exécutés dans
+# l'API, sans passer par le pool de workers Prophet.
+import os
+
+import numpy as np
+import pandas as pd
+
+# Nombre de derniers jours d'historique utilisés pour l'ajustement.
+FAST_FORECAST_WINDOW = int(os.getenv("FAST_FORECAST_WINDOW", "60"))
+# Fenêtre plus courte pour la croissance log-linéaire, qui extrapole mal
+# une tendance ancienne.
+LOGLINEAR_WINDOW = int(os.getenv("LOGLINEAR_WINDOW", "14"))
+# Quantile de la loi normale pour les intervalles à 95 %.
+Z_95 = 1.959964
+
+_ALPHAS = np.linspace(0.1, 1.0, 10)
+_BETAS = np.linspace(0.0, 0.5, 6)
+_PHIS = np.array([0.8, 0.9, 0.95, 0.98])
+
+
+def _grid(phis):
+    alpha, beta, phi = np.meshgrid(_ALPHAS, _BETAS, phis, indexing='ij')
+    return alpha.ravel(), beta.ravel(), phi.ravel()
+
+
+_HOLT_GRID = _grid(np.array([1.0]))
+_DAMPED_GRID = _grid(_PHIS)
+
+
+def _smooth(y, alpha, beta, phi):
+    """Lissage de `y` (une série par colonne) pour toutes les
+    combinaisons de paramètres à la fois ; retourne niveau, tendance et
+    somme des carrés des erreurs à un pas, de forme (combinaisons,
+    séries)."""
+    alpha, beta, phi = alpha[:, None], beta[:, None], phi[:, None]
+    level = np.repeat(y[:1], len(alpha), axis=0)
+    trend = np.repeat(y[1:2] - y[:1] if len(y) > 1 else np.zeros_like(
+        y[:1]), len(alpha), axis=0)
+    sse = np.zeros(level.shape)
+    for value in y[1:]:
+        predicted = level + phi * trend
+        error = value - predicted
+        sse += error * error
+        level = predicted + alpha * error
+        trend = phi * trend + alpha * beta * error
+    return level, trend, sse
+
+
+def _exponential_smoothing(y, days, grid):
+    alpha, beta, phi = grid
+    level, trend, sse = _smooth(y, alpha, beta, phi)
+    # Meilleure combinaison de paramètres, choisie série par série.
+    best = np.argmin(sse, axis=0)
+    series = np.arange(y.shape[1])
+    level, trend, sse = (level[best, series], trend[best, series],
+                         sse[best, series])
+    alpha, beta, phi = alpha[best], beta[best], phi[best]
+    # Somme cumulée des puissances de phi : h pour Holt (phi = 1).
+    damping = np.cumsum(phi ** np.arange(1, days + 1)[:, None], axis=0)
+    yhat = level + damping * trend
+    # Variance de l'erreur à h pas du modèle à erreurs additives.
+    sigma2 = sse / max(len(y) - 1, 1)
+    weights = alpha * (1 + beta * damping[:-1])
+    spread = Z_95 * np.sqrt(sigma2 * (1 + np.concatenate(
+        (np.zeros((1, len(series))), np.cumsum(weights ** 2, axis=0)))))
+    return yhat, yhat - spread, yhat + spread
+
+
+def holt(y, days):
+    """Lissage exponentiel de Holt (tendance additive)."""
+    return _exponential_smoothing(y, days, _HOLT_GRID)
+
+
+def damped(y, days):
+    """Lissage exponentiel à tendance amortie."""
+    return _exponential_smoothing(y, days, _DAMPED_GRID)
+
+
+def loglinear(y, days):
+    """Croissance exponentielle : droite des moindres carrés sur
+    log(1 + y), ajustée sur les LOGLINEAR_WINDOW derniers jours."""
+    log_y = np.log1p(np.maximum(y[-LOGLINEAR_WINDOW:], 0.0))
+    n = len(log_y)
+    if n < 3:
+        yhat = np.repeat(y[-1:], days, axis=0)
+        return yhat, yhat, yhat
+    t = np.arange(n, dtype=float)
+    slope, intercept = np.polyfit(t, log_y, 1)
+    residuals = log_y - (intercept + slope * t[:, None])
+    s = np.sqrt((residuals * residuals).sum(axis=0) / (n - 2))
+    future = np.arange(n, n + days, dtype=float)[:, None]
+    centre = intercept + slope * future
+    t_mean = t.mean()
+    spread = Z_95 * s * np.sqrt(
+        1 + 1 / n + (future - t_mean) ** 2 / ((t - t_mean) ** 2).sum())
+    return (np.expm1(centre), np.expm1(centre - spread),
+            np.expm1(centre + spread))
+
+
+MODELS = {
+    "holt": holt,
+    "damped": damped,
+    "loglinear": loglinear,
+}
+
+
+def predict_series(model_name, df, columns, days, uncertainty=False):
+    """Prévisions des colonnes `columns` de `df` (trié par ds) sur les
+    `days` jours suivant sa fin : {colonne: DataFrame ds, yhat et, si
+    `uncertainty`, yhat_lower / yhat_upper}. Toutes les séries sont
+    ajustées ensemble (une colonne par série dans les calculs numpy)."""
+    if df.empty:
+        raise ValueError("Empty history")
+    y = np.nan_to_num(np.column_stack([
+        df[column].to_numpy(dtype=float)[-FAST_FORECAST_WINDOW:]
+        for column in columns]))
+    yhat, lower, upper = MODELS[model_name](y, days)
+    # Dates construites en numpy, communes à toutes les séries ; les
+    # séries prévues (taux, effectifs) ne sont jamais négatives.
+    last = df['ds'].to_numpy()[-1].astype('datetime64[D]')
+    ds = (last + np.arange(1, days + 1)).astype('datetime64[ns]')
+    forecasts = {}
+    for i, column in enumerate(columns):
+        forecast = {'ds': ds, 'yhat': np.maximum(yhat[:, i], 0.0)}
+        if uncertainty:
+            forecast['yhat_lower'] = np.maximum(lower[:, i], 0.0)
+            forecast['yhat_upper'] = np.maximum(upper[:, i], 0.0)
+        forecasts[column] = pd.DataFrame(forecast)
+    return forecasts
+
+
+def predict(model_name, df, days, uncertainty=False):
+    """Prévision du taux de mortalité sur les `days` jours suivant la fin
+    de `df` (colonnes ds, taux_mortalite), au format de
+    predict_with_prophet : ds, yhat et, si `uncertainty`, yhat_lower /
+    yhat_upper."""
+    return predict_series(model_name, df, ['taux_mortalite'], days,
+                          uncertainty=uncertainty)['taux_mortalite']
@@ -0,0 +1,115 @@
+# backend/feature_store.py
+
+# Store des features du modèle, par pays et par date (table "features").
+# Les features sont calculées une fois, de façon vectorisée, à l'import
+# du CSV (qui en fournit déjà une partie) puis tenues à jour lors des
+# écritures sur les données ; le chemin de prédiction se contente de les
+# lire, sans recalculer log1p ni taux de mortalité à chaque requête.
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert
+
+import models
+
+# Features calculées à partir des cas/décès/guérisons et de la date ;
+# celles présentes dans le CSV importé sont reprises telles quelles.
+FEATURE_COLUMNS = ['cases_log', 'mortality_rate', 'recovery_rate', 'active',
+                   'day_of_week', 'is_weekend']
+
+
+def _rate(values, cases):
+    # Pourcentage des cas confirmés (0 si aucun cas).
+    return np.divide(values * 100, cases, out=np.zeros(len(cases)),
+                     where=cases > 0)
+
+
+def compute_features(df):
+    """Calcule les features d'un DataFrame (country, date, cases, deaths,
+    recovered) ; une ligne par couple (pays, date)."""
+    df = df.drop_duplicates(['country', 'date'], keep='last')
+    dates = pd.to_datetime(df['date'])
+    # Valeurs manquantes (NULL écrit via l'API) comptées comme 0 : pas de
+    # NaN dans les taux ni de valeur aberrante dans `active`.
+    cases = df['cases'].fillna(0).to_numpy(dtype=float)
+    deaths = df['deaths'].fillna(0).to_numpy(dtype=float)
+    recovered = df['recovered'].fillna(0).to_numpy(dtype=float)
+    computed = {
+        'cases_log': lambda: np.log1p(cases),
+        'mortality_rate': lambda: _rate(deaths, cases),
+        'recovery_rate': lambda: _rate(recovered, cases),
+        'active': lambda: (cases - deaths - recovered).astype(int),
+        'day_of_week': lambda: dates.dt.dayofweek.to_numpy(),
+        'is_weekend': lambda: dates.dt.dayofweek.to_numpy() >= 5,
+    }
+    features = pd.DataFrame({'country': df['country'].to_numpy(),
+                             'date': dates.dt.date.to_numpy()})
+    for column in FEATURE_COLUMNS:
+        features[column] = (df[column].to_numpy() if column in df.columns
+                            else computed[column]())
+    features['is_weekend'] = features['is_weekend'].astype(bool)
+    return features
+
+
+def _insert(db, features):
+    if len(features):
+        db.execute(insert(models.Feature), features.to_dict('records'))
+
+
+def _read_data(db, countries=None):
+    # Les écritures en attente (session sans autoflush) sont prises en compte.
+    db.flush()
+    query = db.query(models.Data.country, models.Data.date,
+                     models.Data.confirmed, models.Data.deaths,
+                     models.Data.recovered)
+    if countries is not None:
+        query = query.filter(models.Data.country.in_(countries))
+    return pd.DataFrame(query.order_by(models.Data.id).all(),
+                        columns=['country', 'date', 'cases', 'deaths',
+                                 'recovered'])
+
+
+def rebuild(db, df=None):
+    """Recalcule tout le store, à partir de `df` (import du CSV) ou de la
+    table data. Le commit est laissé à l'appelant."""
+    if df is None:
+        df = _read_data(db)
+    db.query(models.Feature).delete()
+    _insert(db, compute_features(df))
+
+
+def refresh(db, countries):
+    """Recalcule les features des pays dont les données ont changé."""
+    countries = list(set(countries))
+    db.query(models.Feature).filter(
+        models.Feature.country.in_(countries)).delete(
+            synchronize_session=False)
+    _insert(db, compute_features(_read_data(db, countries)))
+
+
+def ensure(db):
+    """Construit le store s'il est vide alors que des données existent
+    (base antérieure à la table features)."""
+    if db.query(models.Feature.id).first() is None and \
+            db.query(models.Data.id).first() is not None:
+        rebuild(db)
+        db.commit()
+
+
+def load(db, countries, reference_date):
+    """Features des pays jusqu'à la date de référence, triées par pays et
+    par date : colonnes country, ds (datetime64), cases_log,
+    taux_mortalite. Construit directement à partir des colonnes lues."""
+    rows = db.query(
+        models.Feature.country, models.Feature.date,
+        models.Feature.cases_log, models.Feature.mortality_rate).filter(
+            models.Feature.country.in_(countries),
+            models.Feature.date <= reference_date).order_by(
+                models.Feature.country, models.Feature.date).all()
+    country, dates, cases_log, mortality = (list(zip(*rows))
+                                            or [(), (), (), ()])
+    return pd.DataFrame({
+        'country': country,
+        'ds': np.array(dates, dtype='datetime64[ns]'),
+        'cases_log': np.array(cases_log, dtype=float),
+        'taux_mortalite': np.array(mortality, dtype=float),
+    })
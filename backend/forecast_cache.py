@@ -0,0 +1,165 @@
+# backend/forecast_cache.py
+
+# Cache des prévisions servies par /api/predict. Les données historiques
+# ne changent qu'au rechargement du dataset : une même requête
+# (pays, date de référence, horizon, type, modèle) donne toujours le
+# même résultat tant que ni les données ni le modèle ne changent.
+# - LRU borné en taille, avec TTL optionnel,
+# - persistance disque optionnelle (JSON) qui survit aux redémarrages,
+# - invalidation complète sur /api/reload, /api/load-data et les
+#   écritures sur les données.
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+# Nombre maximal d'entrées en mémoire.
+FORECAST_CACHE_SIZE = int(os.getenv("FORECAST_CACHE_SIZE", "1024"))
+# Durée de vie d'une entrée en secondes (0 = pas d'expiration).
+FORECAST_CACHE_TTL = float(os.getenv("FORECAST_CACHE_TTL", "0"))
+# Dossier de persistance (désactivée si vide).
+FORECAST_CACHE_DIR = os.getenv("FORECAST_CACHE_DIR", "")
+
+
+class ForecastCache:
+    """Cache LRU thread-safe, avec TTL et persistance JSON optionnels."""
+
+    def __init__(self, maxsize=1024, ttl=0, directory=""):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.directory = directory
+        # Version du dataset : incrémentée à chaque invalidation.
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            # La génération est persistée avec les entrées : après un
+            # redémarrage, des fichiers d'une génération passée ne
+            # peuvent pas correspondre à une clé courante.
+            self.generation = self._read_generation()
+
+    def _read_generation(self):
+        try:
+            with open(os.path.join(self.directory, "GENERATION")) as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return 0
+
+    def _path(self, key):
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def _expired(self, expires):
+        return expires is not None and expires < time.time()
+
+    def get(self, key):
+        """Retourne la valeur en cache ou None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry[0]):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+        entry = self._load(key) if self.directory else None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._store(key, entry)
+            return entry[1]
+
+    def contains(self, key):
+        """Indique si `key` est en cache, sans compter de hit ni de miss
+        ni modifier l'ordre LRU (préchauffage)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry[0]):
+                return True
+        return bool(self.directory) and self._load(key) is not None
+
+    def put(self, key, value):
+        expires = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            self._store(key, (expires, value))
+        if self.directory:
+            self._save(key, expires, value)
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _load(self, key):
+        try:
+            with open(self._path(key)) as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if stored.get("key") != repr(key) or self._expired(stored["expires"]):
+            return None
+        return stored["expires"], stored["value"]
+
+    def _save(self, key, expires, value):
+        # Écriture atomique : fichier temporaire puis renommage.
+        path = self._path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump({"key": repr(key), "expires": expires,
+                           "value": value}, f)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    def invalidate(self):
+        """Vide le cache (mémoire et disque) et change de génération."""
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+            if self.directory:
+                shutil.rmtree(self.directory, ignore_errors=True)
+                os.makedirs(self.directory, exist_ok=True)
+                with open(os.path.join(self.directory, "GENERATION"),
+                          "w") as f:
+                    f.write(str(self.generation))
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "generation": self.generation,
+            }
+
+
+cache = ForecastCache(FORECAST_CACHE_SIZE, FORECAST_CACHE_TTL,
+                      FORECAST_CACHE_DIR)
+metrics.register("forecast_cache", cache.stats)
+
+
+def make_key(country, reference_date, days, prediction_type, model_name,
+             model_version, uncertainty=False):
+    """Clé de cache d'une prévision ; inclut la génération du dataset."""
+    return (country, reference_date.isoformat(), int(days), prediction_type,
+            model_name, model_version, bool(uncertainty), cache.generation)
+
+
+def invalidate():
+    cache.invalidate()
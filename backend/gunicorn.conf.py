@@ -0,0 +1,68 @@
+# backend/gunicorn.conf.py
+
+# Déploiement multi-workers : gunicorn -c gunicorn.conf.py main:app
+#
+# - Nombre de workers : WEB_CONCURRENCY, sinon un par CPU.
+# - Pré-fork : le maître importe l'application (preload_app), crée la
+#   base, importe les données, charge les séries en mémoire et les
+#   modèles (main.prepare) puis gèle ses objets (gc.freeze) avant de
+#   créer les workers. Les workers partagent ces pages mémoire en
+#   copy-on-write : colonnes numpy du store de séries, artefacts des
+#   modèles projetés en mémoire.
+# - Les ressources par processus (pool de prévision, bulkhead predict)
+#   sont divisées entre les workers au lieu d'être multipliées.
+# - Les workers partagent un dossier (WORKER_SYNC_DIR) : journal des
+#   écritures et activations de modèle (worker_sync) et état des
+#   prévisions asynchrones (PREDICTION_JOB_DIR).
+# Limites de débit partagées : RATE_LIMIT_REDIS_URL (sinon par worker).
+import gc
+import os
+import tempfile
+
+_cpus = os.cpu_count() or 1
+
+workers = int(os.getenv("WEB_CONCURRENCY", str(_cpus)))
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = os.getenv("BIND", "0.0.0.0:8000")
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+preload_app = True
+
+# Variables lues à l'import de l'application, donc définies avant le
+# préchargement ; une valeur déjà présente dans l'environnement prime.
+_per_worker = str(max(1, _cpus // workers))
+os.environ.setdefault("PREDICTION_POOL_SIZE", _per_worker)
+os.environ.setdefault("BULKHEAD_PREDICT_CONCURRENCY", _per_worker)
+os.environ.setdefault("WORKER_SYNC_DIR",
+                      tempfile.mkdtemp(prefix="mspr-workers-"))
+os.environ.setdefault("PREDICTION_JOB_DIR",
+                      os.path.join(os.environ["WORKER_SYNC_DIR"], "jobs"))
+# Modèles chargés par le maître : un thread de chargement ne survivrait
+# pas au fork.
+os.environ.setdefault("MODEL_PRELOAD", "eager")
+# Logs du maître écrits sans thread : aucun verrou de la file des logs
+# n'est copié par fork dans un état verrouillé.
+os.environ.setdefault("LOG_BACKGROUND", "0")
+
+# Pas de collecte dans le maître pendant le chargement : les objets
+# hérités ne sont pas touchés (et donc pas copiés) par les workers.
+gc.disable()
+
+
+def when_ready(server):
+    import main
+    main.prepare(preload="eager")
+    # Objets du maître exclus des collectes des workers.
+    gc.freeze()
+    server.log.info("Application prepared, %d objects frozen",
+                    gc.get_freeze_count())
+
+
+def post_fork(server, worker):
+    gc.enable()
+    # Pipeline de logs non bloquant propre au worker.
+    import logging_config
+    logging_config.setup_logging(background=True)
+    # Connexions de la base propres à chaque worker.
+    import database
+    database.engine.dispose(close=False)
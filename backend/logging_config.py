@@ -0,0 +1,193 @@
+# backend/logging_config.py
+
+# Pipeline de journalisation non bloquant :
+# - niveau piloté par les variables d'environnement,
+# - QueueHandler / QueueListener pour que l'écriture des logs
+#   (formatage JSON, I/O) ne se fasse jamais dans le thread de la requête,
+# - échantillonnage par logger pour les messages à fort volume,
+# - sortie JSON structurée (ou texte pour le développement local).
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+
+# Niveau global (DEBUG, INFO, WARNING...). INFO par défaut :
+# le niveau DEBUG n'est jamais actif en production sans le demander.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Format de sortie : "json" (par défaut) ou "text".
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+# Niveaux par logger, ex: "routes=DEBUG,sqlalchemy.engine=WARNING".
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+# Taux d'échantillonnage par logger pour les messages sous WARNING,
+# ex: "routes=0.1,auth=0.01" (1 message sur 10, 1 sur 100). Aucun par
+# défaut : tous les messages sont gardés sauf configuration explicite.
+LOG_SAMPLING = os.getenv("LOG_SAMPLING", "")
+# Écriture des logs par un thread (QueueListener). Désactivée dans le
+# maître gunicorn (gunicorn.conf.py) : aucun thread ne doit y tenir un
+# verrou au moment du fork ; chaque worker lance le sien (post_fork).
+LOG_BACKGROUND = os.getenv("LOG_BACKGROUND", "1") == "1"
+
+_listener = None
+_handler = None
+_lock = threading.Lock()
+
+# Attributs standards d'un LogRecord, exclus des champs "extra" en JSON.
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+def _parse_mapping(value):
+    """Transforme "a=1,b=2" en dictionnaire {"a": "1", "b": "2"}."""
+    mapping = {}
+    for item in value.split(","):
+        if "=" not in item:
+            continue
+        key, val = item.split("=", 1)
+        if key.strip():
+            mapping[key.strip()] = val.strip()
+    return mapping
+
+
+class JsonFormatter(logging.Formatter):
+    """Formate chaque enregistrement en une ligne JSON."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(
+                record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        # Champs structurés passés via logger.info(..., extra={...}).
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _InProcessQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler allégé : la file reste dans le processus, il est donc
+    inutile de formater puis copier le record comme le fait
+    QueueHandler.prepare (prévu pour les files multiprocessing)."""
+
+    def prepare(self, record):
+        # Fige le message pour que des arguments mutés plus tard
+        # n'altèrent pas le log ; la traceback est gardée telle quelle.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    """Ne laisse passer qu'une fraction des messages sous WARNING
+    pour les loggers configurés. Les avertissements et erreurs
+    passent toujours. L'échantillonnage est déterministe
+    (1 message sur N) pour éviter le coût d'un tirage aléatoire."""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.every = {}
+        for name, rate in rates.items():
+            try:
+                rate = float(rate)
+            except ValueError:
+                continue
+            if 0 < rate < 1:
+                self.every[name] = round(1 / rate)
+            elif rate <= 0:
+                self.every[name] = 0
+        self._counters = {name: itertools.count() for name in self.every}
+
+    def _rule(self, name):
+        # Cherche la règle la plus spécifique ("a.b.c", puis "a.b", puis "a").
+        while name:
+            if name in self.every:
+                return name
+            name = name.rpartition(".")[0]
+        return None
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not self.every:
+            return True
+        rule = self._rule(record.name)
+        if rule is None:
+            return True
+        every = self.every[rule]
+        if every == 0:
+            return False
+        # next() sur itertools.count est atomique sous le GIL.
+        return next(self._counters[rule]) % every == 0
+
+
+def setup_logging(stream=None, background=None):
+    """Installe le pipeline de journalisation sur le logger racine.
+    Idempotent : les appels suivants dans le même mode ne font rien.
+    `stream` : flux de sortie (sys.stdout par défaut) ; `background` :
+    écriture par le thread du listener (LOG_BACKGROUND par défaut) ou
+    directement dans le thread appelant."""
+    global _listener, _handler
+    if background is None:
+        background = LOG_BACKGROUND
+    with _lock:
+        if _handler is not None and background == (_listener is not None):
+            return _listener
+        _stop()
+
+        if LOG_FORMAT == "text":
+            formatter = logging.Formatter(
+                "%(asctime)s %(levelname)s %(name)s: %(message)s")
+        else:
+            formatter = JsonFormatter()
+        stream_handler = logging.StreamHandler(stream or sys.stdout)
+        stream_handler.setFormatter(formatter)
+
+        if background:
+            # Le thread de requête ne fait que déposer le record dans la
+            # file ; le formatage et l'écriture sont faits par le thread
+            # du listener.
+            log_queue = queue.SimpleQueue()
+            _handler = _InProcessQueueHandler(log_queue)
+            _listener = logging.handlers.QueueListener(
+                log_queue, stream_handler, respect_handler_level=True)
+        else:
+            _handler = stream_handler
+        _handler.addFilter(SamplingFilter(_parse_mapping(LOG_SAMPLING)))
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_handler)
+        root.setLevel(LOG_LEVEL)
+        for name, level in _parse_mapping(LOG_LEVELS).items():
+            logging.getLogger(name).setLevel(level.upper())
+
+        if _listener is not None:
+            _listener.start()
+            atexit.register(shutdown_logging)
+        return _listener
+
+
+def _stop():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def shutdown_logging():
+    """Vide la file et arrête le thread d'écriture des logs."""
+    global _handler
+    with _lock:
+        if _listener is not None:
+            _stop()
+            # Un nouvel appel à setup_logging réinstalle le pipeline.
+            _handler = None
@@ -7,6 +7,27 @@ from routes import router as api_router
 import auth
 import data_loader
 from sqlalchemy import text
+import logging
+import logging_config
+import query_stats
+import bulkhead
+import forecast_cache
+import prediction_pool
+import prediction_jobs
+import prediction_history
+import accuracy_monitor
+import cache_warmer
+import timeseries_store
+import worker_sync
+import feature_store
+import ml_model
+import model_registry
+import threading
+import time
+
+# Pipeline de logs non bloquant (niveau piloté par LOG_LEVEL).
+logging_config.setup_logging()
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="MSPR API IA Pandémies")
 
@@ -17,10 +38,28 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Compteur de requêtes SQL par requête HTTP (en-têtes X-DB-* si APP_DEBUG).
+app.add_middleware(query_stats.QueryStatsMiddleware)
+# Limites de concurrence par groupe de routes (ajouté en dernier :
+# middleware le plus externe, les rejets sont immédiats).
+app.add_middleware(bulkhead.BulkheadMiddleware)
 
 
-@app.on_event("startup")
-def on_startup():
+# Initialisation faite une fois par déploiement (prepare) : avant la
+# création des workers en mode multi-workers (gunicorn.conf.py), sinon au
+# démarrage de l'application.
+_prepared = False
+
+
+def prepare(preload=None):
+    """Base, import initial, séries en mémoire et modèles. `preload` :
+    mode de chargement des modèles (MODEL_PRELOAD par défaut)."""
+    global _prepared
+    if _prepared:
+        return
+    # Changements publiés pendant et après le chargement : rejoués par
+    # les workers.
+    worker_sync.sync.mark()
     # Initialise la base de données (création tables)
     database.init_db()
 
@@ -29,16 +68,72 @@ def on_startup():
     try:
         result = db.execute(text("SELECT COUNT(*) FROM data")).scalar()
         if result == 0:
-            print("Importation des données initiales...")
+            logger.info("Importation des données initiales...")
             data_loader.import_data_from_csv(db)
-            print("Import terminé.")
+            forecast_cache.invalidate()
+            logger.info("Import terminé.")
         else:
-            print("Données déjà présentes, import ignoré.")
+            logger.info("Données déjà présentes, import ignoré.")
+            # Base antérieure au store de features : le construire.
+            feature_store.ensure(db)
+        # Séries en mémoire pour les lectures (snapshot ou base).
+        timeseries_store.reload(db)
     except Exception as e:
-        print(f"Erreur lors de l'import initial des données : {str(e)}")
+        logger.error("Erreur lors de l'import initial des données : %s", e)
     finally:
         db.close()
 
+    # Modèles chargés avant de servir (MODEL_PRELOAD=eager), en
+    # arrière-plan (background) ou à la première prédiction (lazy).
+    preload = preload or ml_model.MODEL_PRELOAD
+    if preload == "background":
+        threading.Thread(target=_preload_models, daemon=True,
+                         name="model-preload").start()
+    elif preload != "lazy":
+        _preload_models()
+    _prepared = True
+
+
+@app.on_event("startup")
+def on_startup():
+    prepare()
+    # Threads et processus propres à chaque worker, créés après le fork.
+    # Changements reçus par les autres workers.
+    worker_sync.sync.start()
+    # Démarre les workers de prévision (modèle chargé dans chacun).
+    prediction_pool.start()
+    # Écriture différée de l'historique des prédictions.
+    prediction_history.writer.start()
+    # Évaluation des prévisions en attente (données déjà importées).
+    accuracy_monitor.schedule()
+    # Prévisions les plus demandées calculées avant les premières
+    # requêtes, en arrière-plan.
+    cache_warmer.schedule("startup")
+
+
+def _preload_models():
+    started = time.perf_counter()
+    loaders = (
+        ("Prophet", lambda: ml_model.load_prophet(
+            model_registry.active().path)),
+    )
+    for name, load in loaders:
+        try:
+            load()
+        except Exception as e:
+            logger.warning("Modèle %s indisponible : %s", name, e)
+    logger.info("Modèles chargés en %.3fs", time.perf_counter() - started)
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    prediction_jobs.store.shutdown()
+    # Entrées encore en attente écrites avant l'arrêt.
+    prediction_history.writer.shutdown()
+    prediction_pool.shutdown()
+    # Vide la file de logs avant l'arrêt du processus.
+    logging_config.shutdown_logging()
+
 
 # Inclut les routeurs sous /api
 app.include_router(api_router, prefix="/api")
@@ -0,0 +1,22 @@
+# backend/metrics.py
+
+# Registre minimal de métriques applicatives : chaque sous-système
+# enregistre une fonction qui renvoie un dictionnaire de compteurs,
+# agrégés par l'endpoint GET /api/metrics.
+import threading
+
+_providers = {}
+_lock = threading.Lock()
+
+
+def register(name, provider):
+    """Enregistre `provider()` sous la clé `name` (remplace l'existant)."""
+    with _lock:
+        _providers[name] = provider
+
+
+def snapshot():
+    """Retourne l'état courant de toutes les métriques enregistrées."""
+    with _lock:
+        providers = dict(_providers)
+    return {name: provider() for name, provider in providers.items()}
@@ -1,24 +1,84 @@
 import numpy as np
 import pandas as pd
-import pickle
-
-# Chemin du modèle Prophet
-PROPHET_PATH = '/app/models_and_results/prophet_model.pkl'
-prophet_model = None
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import fast_forecast
+import model_artifact
+
+logger = logging.getLogger(__name__)
+
+# Modèle Prophet livré, au format model_artifact (dossier manifest.json +
+# tableaux .npy) ; /app/models_and_results/... dans l'image Docker.
+PROPHET_PATH = os.path.join(os.path.dirname(__file__),
+                            'models_and_results', 'prophet_model')
+# Les artefacts pickle (.pkl) exécutent du code au chargement : refusés
+# sauf ALLOW_PICKLE_MODELS=1 (à convertir avec model_artifact.py).
+ALLOW_PICKLE_MODELS = os.getenv("ALLOW_PICKLE_MODELS", "0") == "1"
+# Chargement des modèles au démarrage : "eager" (avant de servir),
+# "background" (thread) ou "lazy" (à la première prédiction).
+MODEL_PRELOAD = os.getenv("MODEL_PRELOAD", "eager")
+# Modèles chargés, par chemin d'artefact (versions du registre, modèles
+# par pays) : assez pour garder la version active et la précédente.
+MAX_LOADED_MODELS = int(os.getenv("MAX_LOADED_MODELS", "512"))
+_loaded = OrderedDict()
+_loaded_lock = threading.Lock()
+
+
+def _read_model(path):
+    if model_artifact.is_artifact(path):
+        return model_artifact.load_prophet(path)
+    if not ALLOW_PICKLE_MODELS:
+        raise model_artifact.ArtifactError(
+            f"{path} is not a model artifact (pickle models are disabled)")
+    import pickle
+    with open(path, 'rb') as f:
+        return pickle.load(f)
 
 
 # Chargement du modèle Prophet
-def load_prophet():
-    global prophet_model
-    if prophet_model is None:
-        with open(PROPHET_PATH, 'rb') as f:
-            prophet_model = pickle.load(f)
-    return prophet_model
+def load_prophet(path=None):
+    """Retourne le modèle de l'artefact `path` (par défaut le modèle
+    livré, PROPHET_PATH), chargé une seule fois par processus."""
+    path = path or PROPHET_PATH
+    with _loaded_lock:
+        model = _loaded.get(path)
+        if model is not None:
+            _loaded.move_to_end(path)
+            return model
+    model = _read_model(path)
+    with _loaded_lock:
+        _loaded[path] = model
+        while len(_loaded) > MAX_LOADED_MODELS:
+            _loaded.popitem(last=False)
+    return model
+
+
+# Prédiction ponctuelle (yhat) sans échantillonnage d'incertitude :
+# mêmes calculs que Prophet.predict, sans predict_uncertainty qui simule
+# uncertainty_samples trajectoires et domine le temps d'inférence.
+def _predict_point(model, future):
+    df = model.setup_dataframe(future.copy())
+    df['trend'] = model.predict_trend(df)
+    seasonal = model.predict_seasonal_components(df)
+    forecast = pd.DataFrame({'ds': df['ds'], 'trend': df['trend']})
+    forecast['yhat'] = (forecast['trend']
+                        * (1 + seasonal['multiplicative_terms'])
+                        + seasonal['additive_terms'])
+    return forecast
 
 
 # Prédiction avec Prophet
-def predict_with_prophet(df, days):
-    model = load_prophet()
+def predict_with_prophet(df, days, uncertainty=False, path=None,
+                         model=None):
+    """Prédit les `days` jours suivant la fin de l'historique du modèle.
+    Seules les dates de l'horizon sont évaluées ; les intervalles
+    yhat_lower / yhat_upper ne sont calculés que si `uncertainty`.
+    `path` désigne l'artefact de la version à utiliser ; `model`, un
+    modèle déjà chargé (hors du cache des modèles servis)."""
+    model = model or load_prophet(path)
 
     # Préparer les données pour Prophet
     if 'ds' not in df.columns:
@@ -39,21 +99,27 @@ def predict_with_prophet(df, days):
                              'confirmed' column
                              """)
 
-    # S'assurer que les types de données sont corrects
-    df['ds'] = pd.to_datetime(df['ds'])
-    df['cases_log'] = pd.to_numeric(df['cases_log'], errors='coerce')
+    # S'assurer que les types de données sont corrects (les features
+    # lues depuis le store ont déjà les bons types : pas de conversion).
+    if not pd.api.types.is_datetime64_any_dtype(df['ds']):
+        df['ds'] = pd.to_datetime(df['ds'])
+    if not pd.api.types.is_float_dtype(df['cases_log']):
+        df['cases_log'] = pd.to_numeric(df['cases_log'], errors='coerce')
 
     # Vérifier qu'il n'y a pas de NaN
     # dans cases_log pour les données historiques
     if df['cases_log'].isna().any():
-        print("Warning: NaN values found in cases_log, filling with 0")
+        logger.warning("NaN values found in cases_log, filling with 0")
         df['cases_log'] = df['cases_log'].fillna(0)
 
-    print("df[['ds', 'cases_log']].head():\n", df[['ds', 'cases_log']].head())
-    print("df[['ds', 'cases_log']].tail():\n", df[['ds', 'cases_log']].tail())
+    # Les aperçus de DataFrame ne sont formatés qu'en mode DEBUG.
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("history head:\n%s", df[['ds', 'cases_log']].head())
+        logger.debug("history tail:\n%s", df[['ds', 'cases_log']].tail())
 
-    # Créer le DataFrame futur
-    future = model.make_future_dataframe(periods=days)
+    # Créer le DataFrame futur : uniquement les dates de l'horizon
+    # (l'historique d'entraînement n'est plus re-prédit puis jeté).
+    future = model.make_future_dataframe(periods=days, include_history=False)
     future['ds'] = pd.to_datetime(future['ds'])
 
     # Merger les données historiques avec le futur
@@ -68,19 +134,27 @@ def predict_with_prophet(df, days):
     # Remplir les NaN avec la dernière valeur connue
     future['cases_log'] = future['cases_log'].fillna(last_known_value)
 
-    print(f"future.head(10):\n{future.head(10)}")
-    print(f"future.tail(10):\n{future.tail(10)}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("future tail:\n%s", future.tail(10))
 
     # Vérifier qu'il n'y a pas de NaN avant la prédiction
     if future['cases_log'].isna().any():
-        print("Error: Still have NaN values in cases_log")
-        print("NaN positions:", future[future['cases_log'].isna()])
+        logger.error("Still have NaN values in cases_log at %s",
+                     future.loc[future['cases_log'].isna(), 'ds'].tolist())
         raise ValueError("Cannot have NaN values in regressor for Prophet")
 
-    forecast = model.predict(future)
-    return forecast.tail(days)
-
-
-# Dispatch unique (ne garde que Prophet)
-def predict_dispatch(model_name, df, days):
-    return predict_with_prophet(df, days)
+    if uncertainty:
+        forecast = model.predict(future)
+    elif isinstance(model, model_artifact.ProphetArtifact):
+        forecast = model.predict_point(future)
+    else:
+        forecast = _predict_point(model, future)
+    return forecast.tail(days).reset_index(drop=True)
+
+
+# Dispatch : modèles légers de fast_forecast, sinon Prophet
+def predict_dispatch(model_name, df, days, uncertainty=False, path=None):
+    if model_name in fast_forecast.MODELS:
+        return fast_forecast.predict(model_name, df, days,
+                                     uncertainty=uncertainty)
+    return predict_with_prophet(df, days, uncertainty=uncertainty, path=path)
@@ -0,0 +1,272 @@
+# backend/model_artifact.py
+
+# Format d'artefact des modèles, sans code exécutable au chargement
+# (contrairement à pickle) : un dossier contenant
+#   - manifest.json : format, type de modèle, paramètres JSON et, pour
+#     chaque fichier, son empreinte sha256,
+#   - un fichier .npy par tableau numpy (lu sans pickle, projeté en
+#     mémoire : les processus qui chargent le même artefact partagent
+#     les pages en lecture seule),
+#   - d'éventuels fichiers annexes (ex. prophet.json).
+# Les empreintes sont vérifiées au chargement ; l'empreinte du manifeste
+# identifie l'artefact complet.
+#
+# Conversion d'un ancien modèle pickle (fichier de confiance) :
+#   python model_artifact.py convert models_and_results/prophet_model.pkl \
+#       models_and_results/prophet_model
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+FORMAT = "mspr-model"
+FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+PROPHET_JSON = "prophet.json"
+
+
+class ArtifactError(ValueError):
+    """Artefact illisible, d'un format inconnu ou corrompu."""
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_artifact(path):
+    return os.path.isfile(os.path.join(path, MANIFEST_NAME))
+
+
+def checksum(directory):
+    """Empreinte de l'artefact : celle de son manifeste, qui contient les
+    empreintes de tous les fichiers."""
+    return _sha256(os.path.join(directory, MANIFEST_NAME))
+
+
+def save(directory, kind, params, arrays, files=None):
+    """Écrit un artefact : `arrays` {nom: tableau numpy}, `files`
+    {nom: contenu texte}. Le dossier est remplacé de façon atomique."""
+    tmp = f"{directory.rstrip(os.sep)}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    manifest = {"format": FORMAT, "format_version": FORMAT_VERSION,
+                "kind": kind, "params": params, "arrays": {}, "files": {}}
+    for name, value in arrays.items():
+        file_name = f"{name}.npy"
+        value = np.ascontiguousarray(value)
+        np.save(os.path.join(tmp, file_name), value, allow_pickle=False)
+        manifest["arrays"][name] = {
+            "file": file_name, "dtype": str(value.dtype),
+            "shape": list(value.shape),
+            "sha256": _sha256(os.path.join(tmp, file_name))}
+    for name, content in (files or {}).items():
+        with open(os.path.join(tmp, name), "w") as f:
+            f.write(content)
+        manifest["files"][name] = _sha256(os.path.join(tmp, name))
+    with open(os.path.join(tmp, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    if os.path.isdir(directory):
+        shutil.rmtree(directory)
+    os.replace(tmp, directory)
+    return directory
+
+
+class Artifact:
+    """Artefact chargé : paramètres JSON et tableaux (projetés en
+    mémoire, en lecture seule)."""
+
+    def __init__(self, directory, manifest, arrays):
+        self.directory = directory
+        self.kind = manifest["kind"]
+        self.params = manifest["params"]
+        self.files = manifest["files"]
+        self.arrays = arrays
+
+    def read_file(self, name):
+        path = os.path.join(self.directory, name)
+        if name not in self.files or _sha256(path) != self.files[name]:
+            raise ArtifactError(f"Checksum mismatch for {path}")
+        with open(path) as f:
+            return f.read()
+
+
+def load(directory, kind=None, mmap=True):
+    """Charge l'artefact `directory` après vérification du format et des
+    empreintes ; lève ArtifactError sinon."""
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ArtifactError(f"Cannot read model artifact {directory}: {e}")
+    if (manifest.get("format") != FORMAT
+            or manifest.get("format_version", 0) > FORMAT_VERSION):
+        raise ArtifactError(f"Unsupported model artifact format in "
+                            f"{directory}")
+    if kind is not None and manifest.get("kind") != kind:
+        raise ArtifactError(f"{directory} is a {manifest.get('kind')} "
+                            f"model, expected {kind}")
+    arrays = {}
+    for name, entry in manifest["arrays"].items():
+        path = os.path.join(directory, os.path.basename(entry["file"]))
+        if _sha256(path) != entry["sha256"]:
+            raise ArtifactError(f"Checksum mismatch for {path}")
+        arrays[name] = np.load(path, mmap_mode="r" if mmap else None,
+                               allow_pickle=False)
+    return Artifact(directory, manifest, arrays)
+
+
+# --- Prophet --------------------------------------------------------
+def save_prophet(model, directory):
+    """Exporte un modèle Prophet ajusté : paramètres moyens pour
+    l'évaluation numpy (ProphetArtifact) et sérialisation JSON de
+    Prophet, utilisée seulement pour les intervalles d'incertitude."""
+    from prophet.serialize import model_to_json
+    if model.growth not in ("linear", "flat"):
+        raise ArtifactError(f"Unsupported growth: {model.growth}")
+    if model.holidays is not None or model.country_holidays is not None:
+        raise ArtifactError("Holidays are not supported")
+    if any(props['condition_name'] for props
+           in model.seasonalities.values()):
+        raise ArtifactError("Conditional seasonalities are not supported")
+    params = {
+        "growth": model.growth,
+        "start": model.start.isoformat(),
+        "t_scale_seconds": model.t_scale.total_seconds(),
+        "y_scale": float(model.y_scale),
+        "k": float(np.nanmean(model.params['k'])),
+        "m": float(np.nanmean(model.params['m'])),
+        "history_end": model.history['ds'].max().isoformat(),
+        "seasonalities": [
+            {"name": name, "period": float(props['period']),
+             "fourier_order": int(props['fourier_order']),
+             "mode": props['mode']}
+            for name, props in model.seasonalities.items()],
+        "regressors": [
+            {"name": name, "mu": float(props['mu']),
+             "std": float(props['std']), "mode": props['mode']}
+            for name, props in model.extra_regressors.items()],
+    }
+    arrays = {
+        "delta": np.nanmean(model.params['delta'], axis=0),
+        "beta": np.nanmean(model.params['beta'], axis=0),
+        "changepoints_t": np.asarray(model.changepoints_t, dtype=float),
+    }
+    return save(directory, "prophet", params, arrays,
+                {PROPHET_JSON: model_to_json(model)})
+
+
+class ProphetArtifact:
+    """Modèle Prophet évalué en numpy (prévision ponctuelle), avec
+    l'interface utilisée par ml_model (make_future_dataframe, predict)."""
+
+    def __init__(self, artifact):
+        self.artifact = artifact
+        p = artifact.params
+        self.params = p
+        self.start = np.datetime64(pd.Timestamp(p["start"]), 'ns')
+        self.t_scale = np.timedelta64(int(p["t_scale_seconds"] * 1e9), 'ns')
+        self.history_end = pd.Timestamp(p["history_end"])
+        self.delta = artifact.arrays["delta"]
+        self.beta = artifact.arrays["beta"]
+        self.changepoints_t = artifact.arrays["changepoints_t"]
+        # Colonnes de la matrice des composantes : saisonnalités (séries
+        # de Fourier) puis régresseurs, comme dans Prophet.
+        modes = []
+        for season in p["seasonalities"]:
+            modes += [season["mode"]] * (2 * season["fourier_order"])
+        modes += [regressor["mode"] for regressor in p["regressors"]]
+        modes = np.array(modes)
+        self.beta_additive = np.where(modes == "additive", self.beta, 0.0)
+        self.beta_multiplicative = np.where(modes == "multiplicative",
+                                            self.beta, 0.0)
+        self._prophet = None
+        self._prophet_lock = threading.Lock()
+
+    def make_future_dataframe(self, periods, include_history=False):
+        if include_history:
+            raise ValueError("History is not stored in model artifacts")
+        return pd.DataFrame({'ds': pd.date_range(
+            self.history_end + pd.Timedelta(days=1), periods=periods)})
+
+    def predict_point(self, future):
+        """Tendance et yhat (sans intervalles), mêmes calculs que
+        Prophet.predict sur les paramètres moyens."""
+        ds = future['ds'].to_numpy(dtype='datetime64[ns]')
+        t = (ds - self.start) / self.t_scale
+        if self.params["growth"] == "flat":
+            trend = np.full(len(t), self.params["m"])
+        else:
+            active = (self.changepoints_t[None, :] <= t[:, None]) * self.delta
+            trend = ((active.sum(axis=1) + self.params["k"]) * t
+                     + (active * -self.changepoints_t).sum(axis=1)
+                     + self.params["m"])
+        trend = trend * self.params["y_scale"]
+
+        columns = []
+        days = (ds - np.datetime64('1970-01-01', 'ns')) / np.timedelta64(
+            1, 'D')
+        for season in self.params["seasonalities"]:
+            x = 2 * np.pi * days
+            for i in range(season["fourier_order"]):
+                c = (i + 1) / season["period"] * x
+                columns += [np.sin(c), np.cos(c)]
+        for regressor in self.params["regressors"]:
+            columns.append((future[regressor["name"]].to_numpy(dtype=float)
+                            - regressor["mu"]) / regressor["std"])
+        features = (np.column_stack(columns) if columns
+                    else np.zeros((len(ds), 0)))
+        additive = features @ self.beta_additive * self.params["y_scale"]
+        multiplicative = features @ self.beta_multiplicative
+        return pd.DataFrame({'ds': future['ds'].to_numpy(), 'trend': trend,
+                             'yhat': trend * (1 + multiplicative) + additive})
+
+    def prophet(self):
+        """Modèle Prophet complet, reconstruit depuis sa sérialisation
+        JSON à la première demande d'intervalles."""
+        with self._prophet_lock:
+            if self._prophet is None:
+                from prophet.serialize import model_from_json
+                self._prophet = model_from_json(
+                    self.artifact.read_file(PROPHET_JSON))
+            return self._prophet
+
+    def predict(self, future):
+        # Prévision complète de Prophet, intervalles d'incertitude inclus.
+        return self.prophet().predict(future)
+
+
+def load_prophet(directory, mmap=True):
+    return ProphetArtifact(load(directory, kind="prophet", mmap=mmap))
+
+
+def convert_pickle(source, directory):
+    """Convertit un modèle Prophet pickle (source de confiance) en
+    artefact. Seule étape qui lit encore un pickle."""
+    import pickle
+    with open(source, "rb") as f:
+        model = pickle.load(f)
+    return save_prophet(model, directory)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Artefacts de modèles")
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert = sub.add_parser("convert")
+    convert.add_argument("source")
+    convert.add_argument("directory")
+    verify = sub.add_parser("verify")
+    verify.add_argument("directory")
+    args = parser.parse_args()
+    if args.command == "convert":
+        convert_pickle(args.source, args.directory)
+    load(args.directory)
+    print(args.directory, checksum(args.directory))
@@ -0,0 +1,311 @@
+# backend/model_registry.py
+
+# Registre des modèles servis par /api/predict. Chaque version est un
+# dossier <MODEL_REGISTRY_DIR>/<version>/ contenant l'artefact (format
+# model_artifact) et un fichier metadata.json ; le modèle livré avec
+# l'image (PROPHET_PATH) est toujours disponible comme version de base.
+# Une nouvelle version est chargée et testée (prévision d'essai) en
+# arrière-plan, dans l'API et dans les workers de prévision, puis
+# activée par une seule affectation : les requêtes en cours, qui ont lu
+# la version active à leur début, se terminent sur l'ancien modèle.
+# La version précédente reste chargée pour un retour arrière immédiat.
+import argparse
+import datetime
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+
+import pandas as pd
+
+import metrics
+import ml_model
+import model_artifact
+import prediction_pool
+
+logger = logging.getLogger(__name__)
+
+MODEL_REGISTRY_DIR = os.getenv(
+    "MODEL_REGISTRY_DIR",
+    os.path.join(os.path.dirname(__file__), 'models_and_results',
+                 'registry'))
+# Délai maximal de la prévision d'essai dans les workers (secondes).
+MODEL_WARMUP_TIMEOUT = float(os.getenv("MODEL_WARMUP_TIMEOUT", "60"))
+ARTIFACT_NAME = "model"
+METADATA_NAME = "metadata.json"
+ACTIVE_NAME = "ACTIVE"
+
+
+class ModelVersion:
+    """Version de modèle : identifiant, chemin de l'artefact, métadonnées.
+    Une version peut aussi contenir un modèle par pays (metadata
+    "countries", voir training.py) ; `path` sert alors aux autres pays."""
+
+    def __init__(self, version, path, metadata, folder=None):
+        self.version = version
+        self.path = path
+        self.metadata = metadata
+        self.folder = folder
+
+    def artifact(self, country=None):
+        """Chemin de l'artefact à utiliser pour `country`."""
+        entry = self.metadata.get("countries", {}).get(country)
+        if entry is not None:
+            return os.path.join(self.folder, entry["artifact"])
+        return self.path
+
+    def to_dict(self):
+        metadata = dict(self.metadata, version=self.version)
+        # Le détail par pays peut être long : seul leur nombre est listé.
+        if "countries" in metadata:
+            metadata["countries"] = len(metadata["countries"])
+        return metadata
+
+
+def _builtin():
+    # Version de base : le nom dépend de l'empreinte de l'artefact pour
+    # qu'un remplacement du modèle change la version (et les clés de
+    # cache).
+    try:
+        sha256 = model_artifact.checksum(ml_model.PROPHET_PATH)
+        mtime = os.path.getmtime(os.path.join(ml_model.PROPHET_PATH,
+                                              model_artifact.MANIFEST_NAME))
+    except OSError:
+        return ModelVersion("prophet-unavailable", ml_model.PROPHET_PATH,
+                            {"kind": "prophet", "builtin": True})
+    created_at = datetime.datetime.fromtimestamp(
+        mtime, datetime.timezone.utc).isoformat()
+    return ModelVersion(
+        f"prophet-{sha256[:12]}", ml_model.PROPHET_PATH,
+        {"kind": "prophet", "builtin": True, "created_at": created_at,
+         "sha256": sha256})
+
+
+def warm(path):
+    """Charge le modèle et exécute une prévision d'essai d'un jour.
+    Exécutée dans l'API et dans chaque worker de prévision."""
+    history = pd.DataFrame({'ds': [pd.Timestamp('2020-07-01')],
+                            'cases_log': [0.0]})
+    ml_model.predict_with_prophet(history, 1, path=path)
+    return os.getpid()
+
+
+class ModelRegistry:
+    """Versions disponibles, version active et bascule atomique."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._previous = None
+        self.loading = None
+        self.last_error = None
+        self.swaps = 0
+        # Remplacée en une seule affectation : lecture sans verrou.
+        self._active = self.saved()
+
+    # --- Versions ---------------------------------------------------
+    def saved(self):
+        """Version active enregistrée dans le dossier du registre (partagé
+        par les workers), ou la version intégrée."""
+        try:
+            with open(os.path.join(self.directory, ACTIVE_NAME)) as f:
+                return self.get(f.read().strip())
+        except (OSError, KeyError):
+            return _builtin()
+
+    def versions(self):
+        """Versions disponibles, de la plus ancienne à la plus récente."""
+        found = [_builtin()]
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            names = []
+        for name in names:
+            if name.endswith(".tmp"):  # version en préparation
+                continue
+            try:
+                found.append(self._read(name))
+            except (OSError, ValueError):
+                continue
+        return sorted(found, key=lambda v: v.metadata.get("created_at", ""))
+
+    def _read(self, version):
+        folder = os.path.join(self.directory, os.path.basename(version))
+        with open(os.path.join(folder, METADATA_NAME)) as f:
+            metadata = json.load(f)
+        # Sans artefact global, le modèle livré sert de repli.
+        artifact = metadata.get("artifact")
+        path = (os.path.join(folder, artifact) if artifact
+                else ml_model.PROPHET_PATH)
+        return ModelVersion(version, path, metadata, folder)
+
+    def get(self, version):
+        """Retourne la version demandée ; lève KeyError si inconnue."""
+        builtin = _builtin()
+        if version == builtin.version:
+            return builtin
+        try:
+            return self._read(version)
+        except (OSError, ValueError):
+            raise KeyError(version)
+
+    def latest(self):
+        return self.versions()[-1]
+
+    def stage(self, version=None):
+        """Crée le dossier de préparation d'une nouvelle version.
+        Retourne (version, dossier temporaire)."""
+        version = os.path.basename(version or time.strftime(
+            f"v%Y%m%d-%H%M%S-{uuid.uuid4().hex[:6]}"))
+        if os.path.exists(os.path.join(self.directory, version)):
+            raise ValueError(f"Model version {version} already exists")
+        tmp = os.path.join(self.directory, f"{version}.tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        return version, tmp
+
+    def publish(self, version, tmp, metadata):
+        """Écrit les métadonnées puis publie le dossier complet de façon
+        atomique. Les versions publiées ne sont jamais modifiées."""
+        metadata = dict(metadata, created_at=datetime.datetime.now(
+            datetime.timezone.utc).isoformat())
+        with open(os.path.join(tmp, METADATA_NAME), "w") as f:
+            json.dump(metadata, f, indent=2)
+        os.replace(tmp, os.path.join(self.directory, version))
+        return self._read(version)
+
+    def register(self, artifact_path, version=None, metadata=None):
+        """Copie un artefact dans le registre sous une nouvelle version.
+        Un ancien modèle pickle (source de confiance) est converti."""
+        version, tmp = self.stage(version)
+        artifact = os.path.join(tmp, ARTIFACT_NAME)
+        try:
+            if model_artifact.is_artifact(artifact_path):
+                shutil.copytree(artifact_path, artifact)
+                model_artifact.load(artifact)  # empreintes vérifiées
+            else:
+                model_artifact.convert_pickle(artifact_path, artifact)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        return self.publish(version, tmp, dict(
+            {"kind": "prophet"}, **(metadata or {}), artifact=ARTIFACT_NAME,
+            source=os.path.abspath(artifact_path),
+            sha256=model_artifact.checksum(artifact)))
+
+    # --- Version active ---------------------------------------------
+    def active(self):
+        return self._active
+
+    def activate(self, version, background=True):
+        """Charge, teste puis active `version`. En arrière-plan par
+        défaut : la version active reste servie pendant le chargement."""
+        target = self.get(version)
+        with self._lock:
+            if self.loading is not None:
+                raise RuntimeError(
+                    f"Model version {self.loading} is already loading")
+            self.loading = target.version
+        if not background:
+            self._load_and_swap(target)
+            return target
+        threading.Thread(target=self._load_and_swap, args=(target,),
+                         daemon=True, name="model-loader").start()
+        return target
+
+    def _load_and_swap(self, target):
+        try:
+            started = time.perf_counter()
+            # Prévision d'essai avec le modèle par défaut de la version
+            # et, le cas échéant, avec un modèle par pays.
+            paths = [target.path]
+            countries = target.metadata.get("countries")
+            if countries:
+                paths.append(target.artifact(next(iter(countries))))
+            for path in paths:
+                warm(path)
+                self._warm_workers(path)
+            with self._lock:
+                if self._active.version != target.version:
+                    self._previous, self._active = self._active, target
+                    self.swaps += 1
+                self._persist()
+            self.last_error = None
+            logger.info("Model %s active (loaded in %.2fs)", target.version,
+                        time.perf_counter() - started)
+        except Exception as e:
+            self.last_error = f"{target.version}: {e}"
+            logger.exception("Loading model %s failed: %s", target.version,
+                             e)
+        finally:
+            with self._lock:
+                self.loading = None
+
+    def _warm_workers(self, path):
+        # Une tâche d'essai par worker : le dispatcher en confie une à
+        # chaque worker libre (au mieux ; un worker occupé chargera le
+        # modèle à sa première prévision).
+        pool = prediction_pool.get_pool()
+        if pool is None:
+            return
+        jobs = [pool.submit(warm, path) for _ in range(pool.size)]
+        for job in jobs:
+            job.future.result(timeout=MODEL_WARMUP_TIMEOUT)
+
+    def rollback(self):
+        """Revient immédiatement à la version précédente (déjà chargée)."""
+        with self._lock:
+            if self._previous is None:
+                raise ValueError("No previous model version")
+            self._previous, self._active = self._active, self._previous
+            self.swaps += 1
+            self._persist()
+            return self._active
+
+    def _persist(self):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = os.path.join(self.directory, f"{ACTIVE_NAME}.tmp")
+            with open(tmp, "w") as f:
+                f.write(self._active.version)
+            os.replace(tmp, os.path.join(self.directory, ACTIVE_NAME))
+        except OSError as e:
+            logger.warning("Cannot persist active model version: %s", e)
+
+    def status(self):
+        return {
+            "active": self._active.version,
+            "previous": self._previous.version if self._previous else None,
+            "loading": self.loading,
+            "last_error": self.last_error,
+            "swaps": self.swaps,
+        }
+
+
+registry = ModelRegistry(MODEL_REGISTRY_DIR)
+metrics.register("model_registry", registry.status)
+
+
+def active():
+    """Version active, à lire une fois au début de chaque prédiction."""
+    return registry.active()
+
+
+if __name__ == "__main__":
+    # Enregistrement d'un artefact :
+    #   python model_registry.py register chemin/artefact --version v2
+    parser = argparse.ArgumentParser(description="Registre des modèles")
+    sub = parser.add_subparsers(dest="command", required=True)
+    register = sub.add_parser("register")
+    register.add_argument("artifact")
+    register.add_argument("--version")
+    sub.add_parser("list")
+    args = parser.parse_args()
+    if args.command == "register":
+        print(registry.register(args.artifact, args.version).version)
+    else:
+        for model_version in registry.versions():
+            print(model_version.version, json.dumps(model_version.metadata))
@@ -2,8 +2,9 @@
 
 # Importe les types de colonnes de SQLAlchemy
 # pour définir le schéma de la base de données.
-from sqlalchemy import Column, Integer
-from sqlalchemy import String, DateTime, Boolean, Date, ForeignKey
+from sqlalchemy import Column, Integer, Float
+from sqlalchemy import String, DateTime, Boolean, Date, ForeignKey, Index
+from sqlalchemy import JSON
 # Importe le module datetime pour gérer les dates et heures.
 import datetime
 from sqlalchemy.orm import relationship
@@ -66,3 +67,89 @@ class Data(base.Base):
     # Chaque entrée de donnée appartient à un utilisateur
     owner_id = Column(Integer, ForeignKey('users.id'))
     owner = relationship("User", back_populates="data_entries")
+
+    # Historique d'un pays jusqu'à une date : parcours d'index
+    # (country, date) au lieu d'un tri de toutes les lignes du pays.
+    __table_args__ = (Index("ix_data_country_date", "country", "date"),)
+
+
+# --- Modèle Feature (features du modèle) ---
+# Features par pays et par date, calculées une fois à l'import
+# (voir feature_store.py) et lues telles quelles par les prédictions.
+class Feature(base.Base):
+    __tablename__ = "features"
+
+    id = Column(Integer, primary_key=True, index=True)
+    country = Column(String)
+    date = Column(Date)
+    # log1p(cas confirmés) : régresseur du modèle Prophet.
+    cases_log = Column(Float)
+    # Taux de mortalité et de guérison (%), cas actifs.
+    mortality_rate = Column(Float)
+    recovery_rate = Column(Float)
+    active = Column(Integer)
+    # Jour de la semaine (0 = lundi) et indicateur de week-end.
+    day_of_week = Column(Integer)
+    is_weekend = Column(Boolean)
+
+    __table_args__ = (Index("ix_features_country_date", "country", "date",
+                            unique=True),)
+
+
+# --- Modèle PredictionHistory (historique des prédictions) ---
+# Une ligne par prévision servie (/api/predict, tâches, lots ; une par
+# série pour /api/predict/multi), écrite par lots en arrière-plan (voir
+# prediction_history.py).
+class PredictionHistory(base.Base):
+    __tablename__ = "prediction_history"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'))
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # Paramètres de la requête.
+    country = Column(String)
+    prediction_type = Column(String)
+    model = Column(String)
+    days = Column(Integer)
+    reference_date = Column(Date)
+    uncertainty = Column(Boolean, default=False)
+    # Version du modèle et valeurs prédites (liste de la réponse).
+    model_version = Column(String, nullable=True)
+    predictions = Column(JSON)
+    # Durée de traitement (ms) et prévision servie depuis le cache.
+    latency_ms = Column(Float)
+    cached = Column(Boolean, default=False)
+    # Suivi de la précision (accuracy_monitor.py) : jours de l'horizon
+    # déjà comparés aux valeurs réelles (bit i-1 pour le jour i), et
+    # prévision entièrement évaluée.
+    evaluated = Column(Integer, default=0)
+    complete = Column(Boolean, default=False)
+
+    # Historique d'un utilisateur, du plus récent au plus ancien ;
+    # prévisions restant à évaluer, par pays.
+    __table_args__ = (Index("ix_prediction_history_user_created",
+                            "user_id", "created_at"),
+                      Index("ix_prediction_history_pending",
+                            "complete", "country"))
+
+
+# --- Modèle AccuracyStat (précision des prévisions servies) ---
+# Sommes des erreurs par modèle, version, pays et jour d'horizon, mises
+# à jour au fil des nouvelles valeurs réelles (accuracy_monitor.py).
+class AccuracyStat(base.Base):
+    __tablename__ = "accuracy_stats"
+
+    id = Column(Integer, primary_key=True)
+    model = Column(String)
+    model_version = Column(String)
+    country = Column(String)
+    horizon = Column(Integer)
+    n = Column(Integer, default=0)
+    abs_error = Column(Float, default=0.0)
+    squared_error = Column(Float, default=0.0)
+    smape = Column(Float, default=0.0)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (Index("ix_accuracy_stats_key", "model",
+                            "model_version", "country", "horizon",
+                            unique=True),)
@@ -0,0 +1,58 @@
+# backend/prediction_batch.py
+
+# Exécution des prévisions d'un lot (/api/predict/batch) : chaque pays
+# est calculé dans un thread, qui délègue le modèle au pool de
+# prévision ; les résultats sont produits au fil de leur achèvement et
+# envoyés en NDJSON (une ligne JSON par pays).
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# Nombre de pays calculés simultanément pour un même lot.
+PREDICTION_BATCH_CONCURRENCY = int(os.getenv(
+    "PREDICTION_BATCH_CONCURRENCY", str(os.cpu_count() or 1)))
+# Nombre maximal de pays par lot.
+PREDICTION_BATCH_MAX = int(os.getenv("PREDICTION_BATCH_MAX", "500"))
+
+
+def _line(country, result=None, error=None, error_status=None):
+    if error is None:
+        body = {"country": country, "status": "done", "result": result}
+    else:
+        body = {"country": country, "status": "failed", "error": error,
+                "error_status": error_status}
+    return json.dumps(body) + "\n"
+
+
+def stream(calls, concurrency=None):
+    """Exécute les appels {pays: fn(is_cancelled)} en parallèle et
+    produit une ligne NDJSON par pays, dans l'ordre d'achèvement.
+    Si le client abandonne le flux, les calculs restants sont annulés."""
+    cancelled = threading.Event()
+    executor = ThreadPoolExecutor(
+        max_workers=max(1, min(len(calls),
+                               concurrency or PREDICTION_BATCH_CONCURRENCY)),
+        thread_name_prefix="prediction-batch")
+    try:
+        futures = {executor.submit(fn, cancelled.is_set): country
+                   for country, fn in calls.items()}
+        for future in as_completed(futures):
+            country = futures[future]
+            try:
+                yield _line(country, result=future.result())
+            except HTTPException as e:
+                yield _line(country, error=str(e.detail),
+                            error_status=e.status_code)
+            except Exception as e:
+                logger.exception("Batch prediction failed for %s: %s",
+                                 country, e)
+                yield _line(country, error=str(e), error_status=500)
+    finally:
+        cancelled.set()
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,149 @@
+# backend/prediction_history.py
+
+# Historique des prédictions (table prediction_history), écrit en
+# arrière-plan : /api/predict dépose l'entrée dans un tampon mémoire et
+# répond sans attendre ; un thread vide le tampon par lots (un seul
+# INSERT multi-lignes par lot) toutes les PREDICTION_HISTORY_INTERVAL
+# secondes, ou dès que PREDICTION_HISTORY_BATCH entrées sont en attente.
+# Le tampon est borné : s'il est plein (base indisponible), les entrées
+# les plus récentes sont abandonnées et comptées plutôt que de ralentir
+# les prédictions. Le tampon est vidé à l'arrêt de l'application.
+import atexit
+import logging
+import os
+import threading
+from collections import deque
+
+from sqlalchemy import insert
+
+import database
+import metrics
+import models
+
+logger = logging.getLogger(__name__)
+
+PREDICTION_HISTORY_ENABLED = os.getenv(
+    "PREDICTION_HISTORY_ENABLED", "1").lower() in ("1", "true", "yes")
+# Taille maximale d'un lot et délai maximal avant écriture (secondes).
+PREDICTION_HISTORY_BATCH = int(os.getenv("PREDICTION_HISTORY_BATCH", "500"))
+PREDICTION_HISTORY_INTERVAL = float(os.getenv("PREDICTION_HISTORY_INTERVAL",
+                                              "1.0"))
+# Nombre maximal d'entrées en attente d'écriture.
+PREDICTION_HISTORY_MAX_PENDING = int(os.getenv(
+    "PREDICTION_HISTORY_MAX_PENDING", "10000"))
+
+
+class HistoryWriter:
+    """Tampon d'écriture différée vidé par lots par un thread."""
+
+    def __init__(self, session_factory=None, batch=500, interval=1.0,
+                 max_pending=10000):
+        self.session_factory = session_factory or database.SessionLocal
+        self.batch = batch
+        self.interval = interval
+        self.max_pending = max_pending
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.failures = 0
+        self._pending = deque()
+        self._lock = threading.Lock()
+        # Un seul lot écrit à la fois (thread d'écriture ou flush()).
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._stopping = False
+                self._thread = threading.Thread(
+                    target=self._loop, daemon=True,
+                    name="prediction-history")
+                self._thread.start()
+
+    def record(self, entry):
+        """Ajoute une entrée (colonnes de PredictionHistory) ; ne bloque
+        jamais sur la base."""
+        if self._thread is None:
+            self.start()
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending.append(entry)
+            full = len(self._pending) >= self.batch
+        if full:
+            self._wakeup.set()
+        return True
+
+    def _loop(self):
+        while not self._stopping:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """Écrit toutes les entrées en attente, par lots. Retourne le
+        nombre d'entrées écrites."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    rows = [self._pending.popleft() for _ in range(
+                        min(self.batch, len(self._pending)))]
+                if not rows:
+                    return written
+                try:
+                    self._insert(rows)
+                except Exception as e:
+                    logger.warning("Prediction history write failed: %s", e)
+                    self.failures += 1
+                    # Lot remis en tête de file, dans la limite du tampon ;
+                    # nouvel essai au prochain cycle.
+                    with self._lock:
+                        room = max(self.max_pending - len(self._pending), 0)
+                        self.dropped += max(len(rows) - room, 0)
+                        self._pending.extendleft(reversed(rows[:room]))
+                    return written
+                written += len(rows)
+                self.written += len(rows)
+                self.flushes += 1
+
+    def _insert(self, rows):
+        db = self.session_factory()
+        try:
+            db.execute(insert(models.PredictionHistory), rows)
+            db.commit()
+        finally:
+            db.close()
+
+    def shutdown(self):
+        """Arrête le thread d'écriture après avoir vidé le tampon."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+        if thread is not None:
+            self._wakeup.set()
+            thread.join(timeout=10)
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {"pending": pending, "written": self.written,
+                "dropped": self.dropped, "flushes": self.flushes,
+                "failures": self.failures}
+
+
+writer = HistoryWriter(batch=PREDICTION_HISTORY_BATCH,
+                       interval=PREDICTION_HISTORY_INTERVAL,
+                       max_pending=PREDICTION_HISTORY_MAX_PENDING)
+metrics.register("prediction_history", writer.stats)
+atexit.register(writer.shutdown)
+
+
+def record(**entry):
+    if PREDICTION_HISTORY_ENABLED:
+        writer.record(entry)
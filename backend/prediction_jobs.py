@@ -0,0 +1,232 @@
+# backend/prediction_jobs.py
+
+# Prévisions asynchrones : POST /api/predict/jobs enregistre la demande
+# et répond immédiatement avec un identifiant de tâche ; le calcul tourne
+# en arrière-plan et le client interroge GET /api/predict/jobs/{id}
+# jusqu'à obtenir le résultat, sans garder de connexion ouverte.
+# Les tâches terminées sont conservées PREDICTION_JOB_RETENTION secondes.
+# En déploiement multi-workers, l'état des tâches est aussi écrit dans
+# PREDICTION_JOB_DIR : le suivi peut être demandé à n'importe quel worker.
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Durée de conservation d'une tâche terminée, en secondes.
+PREDICTION_JOB_RETENTION = float(os.getenv("PREDICTION_JOB_RETENTION",
+                                           "3600"))
+# Threads qui attendent les prévisions (le calcul lui-même a lieu
+# dans le pool de prévision).
+PREDICTION_JOB_WORKERS = int(os.getenv("PREDICTION_JOB_WORKERS", "4"))
+# Nombre maximal de tâches gardées en mémoire (en cours et terminées).
+PREDICTION_JOB_MAX = int(os.getenv("PREDICTION_JOB_MAX", "10000"))
+# Délai maximal d'une prévision asynchrone : plus long que celui des
+# requêtes synchrones, aucun client HTTP n'attend.
+PREDICTION_JOB_TIMEOUT = float(os.getenv("PREDICTION_JOB_TIMEOUT", "300"))
+# Dossier partagé par les workers (désactivé si vide).
+PREDICTION_JOB_DIR = os.getenv("PREDICTION_JOB_DIR", "")
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def _to_datetime(timestamp):
+    if timestamp is None:
+        return None
+    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc)
+
+
+class Job:
+    """Prévision soumise par un utilisateur et son état."""
+
+    def __init__(self, owner_id):
+        self.id = uuid.uuid4().hex
+        self.owner_id = owner_id
+        self.status = PENDING
+        self.created_at = time.time()
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.error_status = None
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": _to_datetime(self.created_at),
+            "finished_at": _to_datetime(self.finished_at),
+            "result": self.result,
+            "error": self.error,
+            "error_status": self.error_status,
+        }
+
+    def state(self):
+        """État sérialisable en JSON (partage entre workers)."""
+        return {"job_id": self.id, "owner_id": self.owner_id,
+                "status": self.status, "created_at": self.created_at,
+                "finished_at": self.finished_at, "result": self.result,
+                "error": self.error, "error_status": self.error_status}
+
+    @classmethod
+    def restore(cls, state):
+        job = cls(state["owner_id"])
+        job.id = state["job_id"]
+        for name in ("status", "created_at", "finished_at", "result",
+                     "error", "error_status"):
+            setattr(job, name, state[name])
+        return job
+
+
+class JobStore:
+    """Tâches en mémoire, exécutées par un pool de threads borné."""
+
+    # Intervalle minimal entre deux purges des tâches expirées.
+    PURGE_INTERVAL = 1.0
+
+    def __init__(self, workers=4, retention=3600, max_jobs=10000,
+                 directory=""):
+        self.retention = retention
+        self.max_jobs = max_jobs
+        self.directory = directory
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="prediction-job")
+        self._last_purge = 0.0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.expired = 0
+
+    def submit(self, owner_id, fn):
+        """Enregistre une tâche exécutant `fn()` et la retourne
+        immédiatement. Lève une 503 si trop de tâches sont gardées."""
+        with self._lock:
+            self._purge(time.time())
+            if len(self._jobs) >= self.max_jobs:
+                raise HTTPException(status_code=503,
+                                    detail="Too many prediction jobs",
+                                    headers={"Retry-After": "1"})
+            job = Job(owner_id)
+            self._jobs[job.id] = job
+            self.submitted += 1
+        self._save(job)
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job, fn):
+        job.status = RUNNING
+        self._save(job)
+        try:
+            job.result = fn()
+        except HTTPException as e:
+            job.error, job.error_status = str(e.detail), e.status_code
+        except Exception as e:
+            logger.exception("Prediction job %s failed: %s", job.id, e)
+            job.error, job.error_status = str(e), 500
+        job.finished_at = time.time()
+        # Le statut est publié en dernier : une tâche "done" a son résultat.
+        with self._lock:
+            if job.error is None:
+                self.completed += 1
+                job.status = DONE
+            else:
+                self.failed += 1
+                job.status = FAILED
+        self._save(job)
+
+    def get(self, job_id):
+        """Retourne la tâche, ou None si inconnue ou expirée."""
+        with self._lock:
+            self._purge(time.time())
+            job = self._jobs.get(job_id)
+        if job is None and self.directory:
+            # Tâche soumise à un autre worker.
+            job = self._load(job_id)
+        return job
+
+    def _path(self, job_id):
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def _save(self, job):
+        if not self.directory:
+            return
+        # Écriture atomique : fichier temporaire puis renommage.
+        path = self._path(job.id)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(job.state(), f)
+            os.replace(tmp, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning("Cannot share prediction job %s: %s", job.id, e)
+
+    def _load(self, job_id):
+        # Identifiants uuid4 hexadécimaux uniquement (nom de fichier sûr).
+        if not job_id.isalnum():
+            return None
+        try:
+            with open(self._path(job_id)) as f:
+                job = Job.restore(json.load(f))
+        except (OSError, ValueError, KeyError):
+            return None
+        if job.finished_at is not None and \
+                job.finished_at + self.retention < time.time():
+            return None
+        return job
+
+    def _purge(self, now):
+        if now - self._last_purge < self.PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None
+                   and job.finished_at + self.retention < now]
+        for job_id in expired:
+            del self._jobs[job_id]
+            if self.directory:
+                try:
+                    os.remove(self._path(job_id))
+                except OSError:
+                    pass
+        self.expired += len(expired)
+
+    def active(self):
+        """Nombre de tâches en attente ou en cours."""
+        with self._lock:
+            return self.submitted - self.completed - self.failed
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+            return {
+                "pending": statuses.count(PENDING),
+                "running": statuses.count(RUNNING),
+                "stored": len(statuses),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "expired": self.expired,
+            }
+
+
+store = JobStore(PREDICTION_JOB_WORKERS, PREDICTION_JOB_RETENTION,
+                 PREDICTION_JOB_MAX, PREDICTION_JOB_DIR)
+metrics.register("prediction_jobs", store.stats)
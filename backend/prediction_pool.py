@@ -0,0 +1,294 @@
+# backend/prediction_pool.py
+
+# Pool de processus dédié aux prévisions. L'inférence (Prophet) ne tourne
+# plus dans le thread de la requête : elle est envoyée à un processus
+# worker via un pipe. Chaque tâche a un délai maximal, et une tâche dont
+# le client HTTP s'est déconnecté est annulée ; un worker bloqué sur une
+# tâche annulée ou expirée est tué puis remplacé.
+import itertools
+import logging
+import multiprocessing
+import multiprocessing.connection
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Nombre de processus workers (0 = exécution dans le thread appelant).
+PREDICTION_POOL_SIZE = int(os.getenv("PREDICTION_POOL_SIZE",
+                                     str(os.cpu_count() or 1)))
+# Délai maximal d'une prévision, en secondes.
+PREDICTION_TIMEOUT = float(os.getenv("PREDICTION_TIMEOUT", "30"))
+# "forkserver" : les workers sont créés à partir d'un processus léger
+# qui a déjà importé ml_model, sans hériter des threads de l'API.
+PREDICTION_POOL_START_METHOD = os.getenv(
+    "PREDICTION_POOL_START_METHOD",
+    "forkserver" if os.name == "posix" else "spawn")
+# Intervalle de vérification de la déconnexion du client (secondes).
+POLL_INTERVAL = 0.1
+
+
+class PredictionTimeout(Exception):
+    """La prévision a dépassé son délai."""
+
+
+class PredictionCancelled(Exception):
+    """La prévision a été annulée (client déconnecté)."""
+
+
+def _worker_main(conn):
+    """Boucle d'un processus worker : reçoit (id, fn, args, kwargs),
+    renvoie (id, ok, résultat ou exception)."""
+    try:
+        # Version active du registre chargée avant la première tâche.
+        import ml_model
+        import model_registry
+        ml_model.load_prophet(model_registry.active().path)
+    except Exception as e:  # le modèle pourra être chargé plus tard
+        logger.warning("Worker warm-up failed: %s", e)
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        if message is None:
+            break
+        job_id, fn, args, kwargs = message
+        try:
+            reply = (job_id, True, fn(*args, **kwargs))
+        except Exception as e:
+            reply = (job_id, False, e)
+        try:
+            conn.send(reply)
+        except Exception as e:  # résultat ou exception non picklable
+            conn.send((job_id, False, RuntimeError(repr(e))))
+
+
+class _Worker:
+    def __init__(self, ctx):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn,),
+                                   daemon=True, name="prediction-worker")
+        self.process.start()
+        child_conn.close()
+        self.job = None
+
+
+class _Job:
+    def __init__(self, job_id, fn, args, kwargs):
+        self.id = job_id
+        self.message = (job_id, fn, args, kwargs)
+        self.future = Future()
+        self.worker = None
+
+
+class PredictionPool:
+    """Pool borné de processus workers avec file d'attente, délais
+    et annulation."""
+
+    def __init__(self, size, start_method=PREDICTION_POOL_START_METHOD):
+        self.size = size
+        self._ctx = multiprocessing.get_context(start_method)
+        if start_method == "forkserver":
+            self._ctx.set_forkserver_preload(["ml_model"])
+        self._lock = threading.Lock()
+        self._pending = deque()
+        self._workers = []
+        self._ids = itertools.count()
+        self._running = True
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.cancelled = 0
+        self.restarts = 0
+        self._wakeup_r, self._wakeup_w = self._ctx.Pipe(duplex=False)
+        for _ in range(size):
+            self._workers.append(_Worker(self._ctx))
+        self._dispatcher = threading.Thread(
+            target=self._dispatch_loop, daemon=True,
+            name="prediction-dispatcher")
+        self._dispatcher.start()
+
+    # --- Soumission -------------------------------------------------
+    def submit(self, fn, *args, **kwargs):
+        job = _Job(next(self._ids), fn, args, kwargs)
+        with self._lock:
+            self._pending.append(job)
+        self._wakeup_w.send_bytes(b"")
+        return job
+
+    def run(self, fn, *args, timeout=None, is_cancelled=None, **kwargs):
+        """Exécute `fn(*args, **kwargs)` dans un worker et attend le
+        résultat. Lève PredictionTimeout après `timeout` secondes et
+        PredictionCancelled dès que `is_cancelled()` renvoie True."""
+        timeout = PREDICTION_TIMEOUT if timeout is None else timeout
+        job = self.submit(fn, *args, **kwargs)
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                return job.future.result(
+                    timeout=max(0, min(POLL_INTERVAL, remaining)))
+            except FutureTimeout:
+                pass
+            if remaining <= 0:
+                self.timed_out += 1
+                self._abort(job, PredictionTimeout(
+                    f"Prediction exceeded {timeout:.0f}s"))
+            elif is_cancelled is not None and is_cancelled():
+                self.cancelled += 1
+                self._abort(job, PredictionCancelled("Client disconnected"))
+            else:
+                continue
+            return job.future.result()
+
+    def _abort(self, job, error):
+        """Retire la tâche de la file ou tue le worker qui l'exécute."""
+        with self._lock:
+            if job.future.done():
+                return
+            if job in self._pending:
+                self._pending.remove(job)
+            elif job.worker is not None:
+                # Le dispatcher détectera la fin du processus et le remplacera.
+                job.worker.process.kill()
+            job.future.set_exception(error)
+
+    # --- Dispatcher -------------------------------------------------
+    def _dispatch_loop(self):
+        while self._running:
+            # Un worker tué juste après avoir répondu est inactif mais mort.
+            for worker in [w for w in list(self._workers)
+                           if w.job is None and not w.process.is_alive()]:
+                self._replace(worker)
+            with self._lock:
+                self._assign()
+                busy = {w.conn: w for w in self._workers if w.job is not None}
+            ready = multiprocessing.connection.wait(
+                list(busy) + [self._wakeup_r], timeout=1)
+            for conn in ready:
+                if conn is self._wakeup_r:
+                    while self._wakeup_r.poll():
+                        self._wakeup_r.recv_bytes()
+                    continue
+                self._collect(busy[conn])
+
+    def _assign(self):
+        for worker in self._workers:
+            if worker.job is not None:
+                continue
+            while self._pending:
+                job = self._pending.popleft()
+                if not job.future.set_running_or_notify_cancel():
+                    continue
+                job.worker = worker
+                worker.job = job
+                try:
+                    worker.conn.send(job.message)
+                except Exception as e:  # arguments non picklables
+                    worker.job = None
+                    job.future.set_exception(e)
+                    continue
+                break
+            if not self._pending:
+                break
+
+    def _collect(self, worker):
+        try:
+            job_id, ok, value = worker.conn.recv()
+        except (EOFError, OSError):
+            self._replace(worker)
+            return
+        with self._lock:
+            job, worker.job = worker.job, None
+        if job is None or job.id != job_id or job.future.done():
+            return
+        if ok:
+            self.completed += 1
+            job.future.set_result(value)
+        else:
+            self.failed += 1
+            job.future.set_exception(value)
+
+    def _replace(self, worker):
+        """Remplace un worker terminé (tué après délai ou planté)."""
+        worker.process.join(timeout=1)
+        with self._lock:
+            job = worker.job
+            if job is not None and not job.future.done():
+                self.failed += 1
+                job.future.set_exception(
+                    RuntimeError("Prediction worker died"))
+            self._workers.remove(worker)
+            if self._running:
+                self._workers.append(_Worker(self._ctx))
+                self.restarts += 1
+
+    # --- Cycle de vie -----------------------------------------------
+    def shutdown(self):
+        self._running = False
+        self._wakeup_w.send_bytes(b"")
+        self._dispatcher.join(timeout=2)
+        for worker in self._workers:
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+        for worker in self._workers:
+            worker.process.join(timeout=1)
+            if worker.process.is_alive():
+                worker.process.kill()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "busy": sum(w.job is not None for w in self._workers),
+                "queued": len(self._pending),
+                "completed": self.completed,
+                "failed": self.failed,
+                "timed_out": self.timed_out,
+                "cancelled": self.cancelled,
+                "restarts": self.restarts,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Pool global, créé au premier usage (ou au démarrage via start())."""
+    global _pool
+    with _pool_lock:
+        if _pool is None and PREDICTION_POOL_SIZE > 0:
+            _pool = PredictionPool(PREDICTION_POOL_SIZE)
+            metrics.register("prediction_pool", _pool.stats)
+        return _pool
+
+
+def start():
+    get_pool()
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def run(fn, *args, timeout=None, is_cancelled=None, **kwargs):
+    """Exécute `fn` dans le pool, ou directement si le pool est
+    désactivé (PREDICTION_POOL_SIZE=0)."""
+    pool = get_pool()
+    if pool is None:
+        return fn(*args, **kwargs)
+    return pool.run(fn, *args, timeout=timeout, is_cancelled=is_cancelled,
+                    **kwargs)
@@ -0,0 +1,158 @@
+# backend/profiling.py
+
+# Profilage à la demande d'une requête, réservé aux administrateurs.
+# Une requête portant l'en-tête "X-Profile: 1" (ou le paramètre
+# "?profile=1") est échantillonnée pendant l'exécution de la route ;
+# le profil est écrit au format "collapsed stacks" (flamegraph.pl,
+# speedscope, inferno...) et son nom renvoyé dans l'en-tête
+# X-Profile-File. Les requêtes non profilées ne paient qu'une lecture
+# de ContextVar.
+import functools
+import inspect
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from fastapi.routing import APIRoute
+
+# Dossier où sont écrits les profils.
+PROFILE_DIR = os.getenv(
+    "PROFILE_DIR", os.path.join(os.path.dirname(__file__), 'profiles'))
+# Période d'échantillonnage en millisecondes.
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "1"))
+PROFILE_SUFFIX = ".folded"
+
+_session = ContextVar("profile_session", default=None)
+
+
+class ProfileSession:
+    """Demande de profilage attachée à une requête HTTP."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file_name = None
+        self.denied = False
+
+
+class StackSampler:
+    """Échantillonne périodiquement la pile d'un thread donné et
+    agrège les piles identiques (format collapsed)."""
+
+    def __init__(self, thread_id, interval=None):
+        self.thread_id = thread_id
+        self.interval = (interval or PROFILE_INTERVAL_MS) / 1000
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name="profile-sampler")
+
+    def _run(self):
+        while not self._stop.is_set():
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} "
+                                 f"({os.path.basename(code.co_filename)}:"
+                                 f"{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+@contextmanager
+def _sampling(session, user):
+    """Échantillonne le thread courant pendant le bloc si l'utilisateur
+    est administrateur ; sinon marque la demande comme refusée."""
+    if user is None or not getattr(user, "is_admin", False):
+        session.denied = True
+        yield
+        return
+    sampler = StackSampler(threading.get_ident())
+    with sampler:
+        yield
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    session.file_name = (f"{time.strftime('%Y%m%d-%H%M%S')}-"
+                         f"{uuid.uuid4().hex[:8]}{PROFILE_SUFFIX}")
+    sampler.write(os.path.join(PROFILE_DIR, session.file_name))
+
+
+def profiled(endpoint):
+    """Enveloppe une route : profile l'appel si une ProfileSession est
+    active. La signature est conservée (__wrapped__) pour FastAPI."""
+    if inspect.iscoroutinefunction(endpoint):
+        # Route asynchrone : on échantillonne le thread de la boucle
+        # d'événements, le profil peut donc inclure d'autres requêtes.
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            session = _session.get()
+            if session is None:
+                return await endpoint(*args, **kwargs)
+            with _sampling(session, kwargs.get("current_user")):
+                return await endpoint(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        session = _session.get()
+        if session is None:
+            return endpoint(*args, **kwargs)
+        # Route synchrone : exécutée dans un thread du threadpool,
+        # seul ce thread est échantillonné.
+        with _sampling(session, kwargs.get("current_user")):
+            return endpoint(*args, **kwargs)
+    return wrapper
+
+
+def _wants_profile(request):
+    # Test sur le scope brut : pas de parsing des en-têtes ni de la
+    # query string pour les requêtes ordinaires.
+    scope = request.scope
+    return (b"profile=1" in scope["query_string"]
+            or (b"x-profile", b"1") in scope["headers"])
+
+
+class ProfiledRoute(APIRoute):
+    """Classe de route FastAPI activant le profilage à la demande.
+    À utiliser via APIRouter(route_class=ProfiledRoute)."""
+
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, profiled(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def profiled_handler(request):
+            if not _wants_profile(request):
+                return await handler(request)
+            session = ProfileSession(request.url.path)
+            token = _session.set(session)
+            try:
+                response = await handler(request)
+            finally:
+                _session.reset(token)
+            if session.file_name:
+                response.headers["X-Profile-File"] = session.file_name
+            elif session.denied:
+                response.headers["X-Profile"] = "denied"
+            return response
+        return profiled_handler
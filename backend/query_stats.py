@@ -0,0 +1,160 @@
+# backend/query_stats.py
+
+# Instrumentation des requêtes SQL :
+# - compteur de requêtes, temps DB total et requête la plus lente
+#   attachés au contexte de chaque requête HTTP,
+# - log des requêtes lentes au-delà d'un seuil,
+# - détection des motifs N+1 (même requête répétée dans une requête HTTP),
+# - helper de test qui échoue si une route dépasse son budget de requêtes.
+import logging
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Seuil (ms) au-delà duquel une requête SQL est journalisée comme lente.
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# Nombre de répétitions d'une même requête à partir duquel
+# on signale un probable N+1.
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+# En mode debug, les statistiques sont renvoyées en en-têtes de réponse.
+DEBUG = os.getenv("APP_DEBUG", "0").lower() in ("1", "true", "yes")
+
+_current = ContextVar("query_stats", default=None)
+# Listes alimentées par le middleware pendant assert_max_queries().
+_collectors = []
+
+
+class QueryStats:
+    """Statistiques SQL d'une requête HTTP (ou d'un bloc de code)."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement = None
+        self.statements = Counter()
+
+    def record(self, statement, elapsed):
+        self.count += 1
+        self.total_time += elapsed
+        self.statements[statement] += 1
+        if elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = statement
+
+    def repeated(self, threshold=None):
+        """Requêtes exécutées au moins `threshold` fois (suspicion N+1)."""
+        threshold = threshold or N_PLUS_ONE_THRESHOLD
+        return [(statement, count)
+                for statement, count in self.statements.most_common()
+                if count >= threshold]
+
+    def headers(self):
+        return [
+            (b"x-db-query-count", str(self.count).encode()),
+            (b"x-db-time-ms", f"{self.total_time * 1000:.2f}".encode()),
+            (b"x-db-slowest-ms", f"{self.slowest_time * 1000:.2f}".encode()),
+        ]
+
+
+def current():
+    """Retourne les statistiques du contexte courant (ou None)."""
+    return _current.get()
+
+
+# Début de la requête gardé sur le contexte d'exécution (propre à chaque
+# requête) : une requête en erreur ne laisse aucun état sur la connexion.
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    elapsed = time.perf_counter() - context._query_start
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, statement)
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+
+
+def instrument_engine(engine):
+    """Attache les hooks de mesure au moteur SQLAlchemy (idempotent)."""
+    if not event.contains(engine, "before_cursor_execute",
+                          _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _report(stats, path):
+    for statement, count in stats.repeated():
+        logger.warning("Possible N+1 on %s: %d x %s", path, count, statement)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("%s: %d queries, %.2f ms in DB, slowest %.2f ms",
+                     path, stats.count, stats.total_time * 1000,
+                     stats.slowest_time * 1000)
+    for collected in _collectors:
+        collected.append((path, stats))
+
+
+class QueryStatsMiddleware:
+    """Middleware ASGI : ouvre un contexte QueryStats par requête HTTP.
+    Le ContextVar est copié dans les threads du threadpool de FastAPI,
+    donc les routes synchrones alimentent le même objet."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + \
+                    stats.headers()
+            await send(message)
+
+        try:
+            await self.app(scope, receive,
+                           send_with_headers if DEBUG else send)
+        finally:
+            _current.reset(token)
+            _report(stats, scope["path"])
+
+
+@contextmanager
+def assert_max_queries(budget):
+    """Helper de test : échoue si le bloc (ou l'une des requêtes HTTP
+    servies pendant le bloc) exécute plus de `budget` requêtes SQL.
+
+        with query_stats.assert_max_queries(2):
+            client.get("/api/countries")
+    """
+    stats = QueryStats()
+    collected = [("<block>", stats)]
+    token = _current.set(stats)
+    _collectors.append(collected)
+    try:
+        yield stats
+    finally:
+        _collectors.remove(collected)
+        _current.reset(token)
+    for path, request_stats in collected:
+        if request_stats.count > budget:
+            raise AssertionError(
+                f"{path} executed {request_stats.count} queries "
+                f"(budget {budget}): "
+                f"{list(request_stats.statements.elements())}")
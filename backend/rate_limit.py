@@ -0,0 +1,170 @@
+# backend/rate_limit.py
+
+# Limitation de débit par seau à jetons (token bucket), clé par
+# utilisateur authentifié ou par adresse IP, avec des limites propres
+# à chaque groupe de routes. L'état est gardé en mémoire dans le
+# processus ; si RATE_LIMIT_REDIS_URL est défini (et le paquet redis
+# installé), il est partagé entre tous les workers via Redis.
+import math
+import os
+import threading
+import time
+
+from fastapi import Depends, HTTPException, Request, Response
+
+import auth
+import metrics
+import models
+
+try:
+    import redis
+except ImportError:  # dépendance optionnelle
+    redis = None
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1").lower() in (
+    "1", "true", "yes")
+# Limites par groupe : "<groupe>=<requêtes>/<secondes>".
+RATE_LIMITS = os.getenv("RATE_LIMITS", "predict=20/60,load=3/60,read=300/60")
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+# Derrière un reverse proxy de confiance, utiliser X-Forwarded-For.
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "0").lower() in (
+    "1", "true", "yes")
+
+
+def _parse_limits(value):
+    limits = {}
+    for item in value.split(","):
+        if "=" not in item:
+            continue
+        scope, spec = item.split("=", 1)
+        count, _, period = spec.partition("/")
+        limits[scope.strip()] = (int(count), float(period or 1))
+    return limits
+
+
+LIMITS = _parse_limits(RATE_LIMITS)
+
+
+class MemoryBackend:
+    """Seaux à jetons en mémoire, protégés par un verrou."""
+
+    # Au-delà de ce nombre de clés, les seaux pleins sont purgés.
+    MAX_KEYS = 10000
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, now):
+        """Consomme un jeton. Retourne (autorisé, jetons restants)."""
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.MAX_KEYS:
+                self._prune(capacity, rate, now)
+            return allowed, tokens
+
+    def _prune(self, capacity, rate, now):
+        # Un seau rempli depuis est équivalent à un seau absent.
+        full_after = capacity / rate
+        self._buckets = {
+            key: value for key, value in self._buckets.items()
+            if now - value[1] < full_after}
+
+
+class RedisBackend:
+    """Seaux à jetons partagés via Redis (script Lua atomique)."""
+
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    local allowed = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url):
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    def take(self, key, capacity, rate, now):
+        allowed, tokens = self._script(
+            keys=[f"ratelimit:{key}"], args=[capacity, rate, now])
+        return bool(allowed), float(tokens)
+
+
+def _make_backend():
+    if RATE_LIMIT_REDIS_URL and redis is not None:
+        return RedisBackend(RATE_LIMIT_REDIS_URL)
+    return MemoryBackend()
+
+
+backend = _make_backend()
+_stats = {}
+
+metrics.register("rate_limit", lambda: dict(_stats))
+
+
+def check(scope, key, response):
+    """Applique la limite du groupe `scope` à la clé `key`.
+    Ajoute les en-têtes X-RateLimit-* ou lève une 429."""
+    if not RATE_LIMIT_ENABLED or scope not in LIMITS:
+        return
+    capacity, period = LIMITS[scope]
+    rate = capacity / period
+    allowed, tokens = backend.take(f"{scope}:{key}", capacity, rate,
+                                   time.time())
+    # Délai avant de retrouver un jeton (ou un seau plein).
+    reset = math.ceil((1 - tokens) / rate) if tokens < 1 else \
+        math.ceil((capacity - tokens) / rate)
+    headers = {
+        "X-RateLimit-Limit": str(capacity),
+        "X-RateLimit-Remaining": str(int(tokens)),
+        "X-RateLimit-Reset": str(reset),
+    }
+    counters = _stats.setdefault(scope, {"allowed": 0, "limited": 0})
+    if not allowed:
+        counters["limited"] += 1
+        headers["Retry-After"] = str(max(1, reset))
+        raise HTTPException(status_code=429, detail="Too many requests",
+                            headers=headers)
+    counters["allowed"] += 1
+    response.headers.update(headers)
+
+
+def client_ip(request: Request):
+    if RATE_LIMIT_TRUST_PROXY:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def per_user(scope):
+    """Dépendance FastAPI : limite par utilisateur authentifié."""
+    async def dependency(
+            response: Response,
+            current_user: models.User = Depends(auth.get_current_user)):
+        check(scope, f"user:{current_user.id}", response)
+    return dependency
+
+
+def per_ip(scope):
+    """Dépendance FastAPI : limite par adresse IP (routes publiques)."""
+    async def dependency(request: Request, response: Response):
+        check(scope, f"ip:{client_ip(request)}", response)
+    return dependency
@@ -1,4 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import (APIRouter, Depends, HTTPException, status, Query,
+                     Request, Response)
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 import schemas
 import models
@@ -6,17 +8,52 @@ import database
 import auth
 from typing import List, Optional
 import logging
-import ml_model
-from datetime import date
+import model_registry
+from datetime import date, datetime
+import time
 import data_loader
 from ml_model import predict_dispatch
 import pandas as pd
-
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
+import numpy as np
+import os
+import profiling
+import metrics
+import rate_limit
+import forecast_cache
+import single_flight
+import prediction_pool
+import prediction_jobs
+import prediction_batch
+import feature_store
+import fast_forecast
+import backtesting
+import prediction_history
+import accuracy_monitor
+import cache_warmer
+import timeseries_store
+import worker_sync
+import anyio.from_thread
+import functools
+
+# La configuration des handlers est faite une seule fois
+# par logging_config.setup_logging() (voir main.py).
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+# ProfiledRoute : profilage à la demande (admin, en-tête X-Profile: 1).
+router = APIRouter(route_class=profiling.ProfiledRoute)
+
+# Modèles acceptés par /api/predict : Prophet (modèle du registre) ou
+# un modèle léger de fast_forecast. Seul Prophet passe par le pool de
+# workers ; les modèles légers sont calculés dans l'API.
+PREDICTION_MODELS = ("prophet", *fast_forecast.MODELS)
+# Série prévue par /api/predict, /predict/batch et /predict/jobs : le
+# taux de mortalité, seule série de Prophet.
+PREDICTION_TYPE = "taux_mortalite"
+# Séries de /api/predict/multi et colonnes correspondantes de la table
+# data. Prophet ne prévoit que le taux de mortalité : ces
+# séries sont prévues par les modèles légers.
+PREDICTION_TARGETS = {"cases": "confirmed", "deaths": "deaths",
+                      "recovered": "recovered"}
 
 
 # Authentification
@@ -88,13 +125,18 @@ def add_data(
     Requiert une authentification préalable."""
     db_data = models.Data(**data.dict())
     db.add(db_data)
+    feature_store.refresh(db, [db_data.country])
     db.commit()
+    data_changed(db, [db_data.country])
     db.refresh(db_data)
     return schemas.DataOut.from_orm(db_data)
 
 
-@router.get("/data", response_model=List[schemas.DataOut])
+@router.get("/data", response_model=List[schemas.DataOut],
+            dependencies=[Depends(rate_limit.per_ip("read"))])
 def read_data(
+    # Réponse, pour y ajouter la version des données.
+    response: Response,
     # Paramètre de requête facultatif pour
     # filtrer les données par pays.
     country: Optional[str] = Query(None),
@@ -110,6 +152,12 @@ def read_data(
     """Récupère les données historiques de la pandémie.
     Peut être filtré par pays et paginé.
     Accessible publiquement (pas de dépendance d'authentification)."""
+    # Servi depuis le store en mémoire, avec sa version des données.
+    snapshot = timeseries_store.current(db)
+    if snapshot is not None:
+        # Les en-têtes X-RateLimit-* posés par la dépendance sont conservés.
+        response.headers.update(timeseries_store.headers(snapshot))
+        return snapshot.rows(country, skip, limit)
     query = db.query(models.Data)
     if country:
         # Applique le filtre par pays si spécifié.
@@ -121,8 +169,10 @@ def read_data(
 
 
 # Récupérer tous les pays uniques
-@router.get("/countries", response_model=List[str])
+@router.get("/countries", response_model=List[str],
+            dependencies=[Depends(rate_limit.per_ip("read"))])
 def get_all_countries(
+    response: Response,
     # Injecte une session de base de données.
     db: Session = Depends(database.get_db)
 ):
@@ -130,6 +180,10 @@ def get_all_countries(
     présents dans les données COVID-19.
     Les pays sont triés par ordre alphabétique.
     Accessible publiquement."""
+    snapshot = timeseries_store.current(db)
+    if snapshot is not None:
+        response.headers.update(timeseries_store.headers(snapshot))
+        return snapshot.countries
     # Récupère les noms de pays distincts et les trie.
     countries = db.query(models.Data.country).distinct().order_by(
         models.Data.country).all()
@@ -138,7 +192,8 @@ def get_all_countries(
 
 
 # Endpoint pour charger/recharger les données depuis le CSV
-@router.post("/load-data")
+@router.post("/load-data",
+             dependencies=[Depends(rate_limit.per_user("load"))])
 def load_data(
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.get_current_user)
@@ -148,6 +203,7 @@ def load_data(
     Efface les données existantes avant l'import.
     """
     result = data_loader.import_data_from_csv(db)
+    data_changed(db)
 
     if result["status"] == "error":
         raise HTTPException(
@@ -160,6 +216,55 @@ def load_data(
     return result
 
 
+def data_changed(db, countries=None):
+    """Met à jour ce qui dépend des données après une écriture validée
+    sur `countries` (None : import complet), puis la publie aux autres
+    workers."""
+    _apply_data_change(db, countries)
+    worker_sync.publish("data", countries=countries)
+
+
+def _apply_data_change(db, countries):
+    # Store relu avant l'invalidation : aucune prévision de la nouvelle
+    # génération du cache ne repose sur les anciennes séries.
+    if countries is None:
+        timeseries_store.reload(db)
+    else:
+        timeseries_store.refresh(db, countries)
+    forecast_cache.invalidate()
+    # Nouvelles valeurs réelles : évaluation des prévisions en attente.
+    accuracy_monitor.schedule(countries)
+    cache_warmer.schedule("data" if countries is not None else "import")
+
+
+def _sync_data(countries=None):
+    # Écriture reçue par un autre worker.
+    db = database.SessionLocal()
+    try:
+        _apply_data_change(db, countries)
+    finally:
+        db.close()
+
+
+def _sync_model(version):
+    # Version activée par un autre worker : chargée puis activée ici aussi.
+    if model_registry.active().version != version:
+        model_registry.registry.activate(version)
+    cache_warmer.schedule("model")
+
+
+def _resync():
+    # Changements manqués (journal compacté) : données relues en entier et
+    # version active reprise du registre.
+    _sync_data()
+    _sync_model(model_registry.registry.saved().version)
+
+
+worker_sync.subscribe("data", _sync_data)
+worker_sync.subscribe("model", _sync_model)
+worker_sync.on_resync(_resync)
+
+
 # --- CRUD par ID ---
 @router.get("/data/id/{id}", response_model=schemas.DataOut)
 def get_data_by_id(id: int, db: Session = Depends(database.get_db),
@@ -176,10 +281,13 @@ def update_data(id: int, update: dict, db: Session = Depends(database.get_db),
     data = db.query(models.Data).filter(models.Data.id == id).first()
     if not data:
         raise HTTPException(status_code=404, detail="Data not found")
+    countries = [data.country]
     for key, value in update.items():
         if hasattr(data, key):
             setattr(data, key, value)
+    feature_store.refresh(db, countries + [data.country])
     db.commit()
+    data_changed(db, countries + [data.country])
     db.refresh(data)
     return schemas.DataOut.from_orm(data)
 
@@ -190,8 +298,11 @@ def delete_data(id: int, db: Session = Depends(database.get_db),
     data = db.query(models.Data).filter(models.Data.id == id).first()
     if not data:
         raise HTTPException(status_code=404, detail="Data not found")
+    country = data.country
     db.delete(data)
+    feature_store.refresh(db, [country])
     db.commit()
+    data_changed(db, [country])
     return {"detail": "Data deleted"}
 
 
@@ -208,148 +319,690 @@ def get_data_by_country(country: str, db: Session = Depends(database.get_db),
 
 
 # --- Correction du endpoint de prédiction ---
-@router.post("/predict", response_model=schemas.PredictionOut)
+@router.post("/predict", response_model=schemas.PredictionOut,
+             dependencies=[Depends(rate_limit.per_user("predict"))])
 def get_prediction(
     # Données d'entrée pour la prédiction, validées par PredictionIn.
     prediction_in: schemas.PredictionIn,
+    # Requête HTTP : permet d'annuler le calcul si le client se déconnecte.
+    request: Request,
     # Injecte une session de base de données.
     db: Session = Depends(database.get_db),
     # Assure que seul un utilisateur authentifié peut demander une prédiction.
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    logger.info(f"[PREDICT] Payload reçu: {prediction_in.dict()}")
     """
     Effectue une prédiction basée sur le modèle IA choisi
-    (Prophet ou LSTM)."""
-    if (
-        prediction_in.days is None
-        or prediction_in.days <= 0
-            or prediction_in.days > 30):
+    (Prophet ou modèle léger)."""
+    started = time.perf_counter()
+    logger.debug("[PREDICT] country=%s days=%s reference_date=%s",
+                 prediction_in.country, prediction_in.days,
+                 prediction_in.reference_date)
+    reference_date = _validate_prediction(prediction_in)
+    # Version du modèle lue une fois : une bascule pendant le calcul
+    # n'affecte pas cette requête.
+    model = model_registry.active()
+
+    # Les données historiques ne changent qu'au rechargement : une
+    # requête identique est servie depuis le cache des prévisions.
+    key = _prediction_key(prediction_in, reference_date, model)
+    output = forecast_cache.cache.get(key)
+    cached = output is not None
+    if output is None:
+        def is_cancelled():
+            return anyio.from_thread.run(request.is_disconnected)
+
+        def compute():
+            df_filtered = _load_history(db, prediction_in, reference_date)
+            return _forecast(prediction_in, reference_date, df_filtered,
+                             model, is_cancelled=is_cancelled)
+        output = _shared_prediction(key, compute, is_cancelled)
+    logger.info("[PREDICT] country=%s days=%s served",
+                prediction_in.country, prediction_in.days)
+    _record_prediction(current_user.id, prediction_in, reference_date,
+                       output, started, cached)
+    return output
+
+
+def _record_prediction(user_id, prediction_in, reference_date, output,
+                       started, cached, prediction_type=None,
+                       predictions=None, **columns):
+    """Ajoute une prévision servie à l'historique de l'utilisateur.
+    Écriture différée : la réponse n'attend pas l'insertion."""
+    prediction_history.record(
+        user_id=user_id, created_at=datetime.utcnow(),
+        country=prediction_in.country,
+        prediction_type=prediction_type or prediction_in.prediction_type,
+        model=prediction_in.model, days=prediction_in.days,
+        reference_date=reference_date,
+        uncertainty=bool(prediction_in.uncertainty),
+        model_version=output["model_version"],
+        predictions=(output["predictions"] if predictions is None
+                     else predictions),
+        latency_ms=round((time.perf_counter() - started) * 1000, 3),
+        cached=cached, **columns)
+
+
+def _recorded(compute, user_id, prediction_in, reference_date, started,
+              cached):
+    """Exécute `compute()` (tâche en arrière-plan) puis ajoute la
+    prévision obtenue à l'historique."""
+    output = compute()
+    _record_prediction(user_id, prediction_in, reference_date, output,
+                       started, cached)
+    return output
+
+
+# Prévision de plusieurs séries (cas, décès, guérisons) en un appel
+@router.post("/predict/multi", response_model=schemas.PredictionMultiOut,
+             dependencies=[Depends(rate_limit.per_user("predict"))])
+def get_multi_prediction(
+    prediction_in: schemas.PredictionMultiIn,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """
+    Prévoit les séries demandées (cas confirmés, décès, guérisons) d'un
+    pays. L'historique est lu une fois et toutes les séries sont
+    ajustées ensemble par le modèle léger choisi."""
+    started = time.perf_counter()
+    reference_date, targets = _validate_multi_prediction(prediction_in)
+    key = forecast_cache.make_key(
+        prediction_in.country, reference_date, prediction_in.days,
+        ",".join(targets), prediction_in.model, prediction_in.model,
+        prediction_in.uncertainty)
+    output = forecast_cache.cache.get(key)
+    cached = output is not None
+    if output is None:
+        def compute():
+            df_counts = _load_counts(db, prediction_in.country,
+                                     reference_date)
+            return _multi_forecast(prediction_in, targets, reference_date,
+                                   df_counts)
+        output = _shared_prediction(key, compute)
+    # Une ligne d'historique par série ; accuracy_monitor ne compare que
+    # les taux de mortalité : les séries de comptage sont marquées
+    # évaluées.
+    for target in targets:
+        _record_prediction(current_user.id, prediction_in, reference_date,
+                           output, started, cached, prediction_type=target,
+                           predictions=output["predictions"][target],
+                           complete=True)
+    return output
+
+
+# Prédictions asynchrones : soumission puis consultation du résultat
+@router.post("/predict/jobs", response_model=schemas.PredictionJobOut,
+             status_code=status.HTTP_202_ACCEPTED,
+             dependencies=[Depends(rate_limit.per_user("predict"))])
+def create_prediction_job(
+    prediction_in: schemas.PredictionIn,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """
+    Soumet une prédiction calculée en arrière-plan et retourne
+    immédiatement l'identifiant de la tâche. Les erreurs de validation
+    et l'absence de données sont signalées dès la soumission."""
+    started = time.perf_counter()
+    reference_date = _validate_prediction(prediction_in)
+    model = model_registry.active()
+    key = _prediction_key(prediction_in, reference_date, model)
+    output = forecast_cache.cache.get(key)
+    cached = output is not None
+    if cached:
+        def compute():
+            return output
+    else:
+        # L'historique est lu ici, avec la session de la requête ;
+        # seul le calcul du modèle est différé.
+        df_filtered = _load_history(db, prediction_in, reference_date)
+        compute = functools.partial(
+            _shared_prediction, key, functools.partial(
+                _forecast, prediction_in, reference_date, df_filtered, model,
+                timeout=prediction_jobs.PREDICTION_JOB_TIMEOUT))
+    # Historique écrit à la fin de la tâche, avec la prévision calculée.
+    job = prediction_jobs.store.submit(current_user.id, functools.partial(
+        _recorded, compute, current_user.id, prediction_in, reference_date,
+        started, cached))
+    return job.to_dict()
+
+
+@router.get("/predict/jobs/{job_id}", response_model=schemas.PredictionJobOut,
+            dependencies=[Depends(rate_limit.per_user("read"))])
+def get_prediction_job(
+    job_id: str,
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """
+    Retourne l'état d'une prédiction asynchrone et, une fois terminée,
+    son résultat. Accessible à son auteur et aux administrateurs."""
+    job = prediction_jobs.store.get(job_id)
+    if job is None or (job.owner_id != current_user.id
+                       and not current_user.is_admin):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+# Prédictions multi-pays, renvoyées au fil de l'eau (NDJSON)
+@router.post("/predict/batch",
+             dependencies=[Depends(rate_limit.per_user("predict"))])
+def get_batch_prediction(
+    batch_in: schemas.PredictionBatchIn,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """
+    Effectue la même prédiction (horizon, date de référence) pour une
+    liste de pays ou pour tous ("all"). Les historiques sont lus en une
+    seule requête, les prévisions calculées en parallèle ; chaque pays
+    est renvoyé dès qu'il est prêt, une ligne JSON par pays."""
+    started = time.perf_counter()
+    reference_date = _validate_prediction(batch_in)
+    countries = batch_in.countries
+    if countries == "all" or countries == ["all"]:
+        countries = [country for (country,) in db.query(
+            models.Data.country).distinct().order_by(models.Data.country)]
+    elif isinstance(countries, str):
+        countries = [countries]
+    countries = list(dict.fromkeys(countries))
+    if not countries or len(countries) > prediction_batch.PREDICTION_BATCH_MAX:
+        raise HTTPException(status_code=422,
+                            detail=f"""Le lot doit contenir entre 1 et
+                            {prediction_batch.PREDICTION_BATCH_MAX} pays.""")
+
+    histories = _load_histories(db, countries, reference_date)
+    model = model_registry.active()
+    params = batch_in.dict(exclude={"countries"})
+    calls = {}
+    for country in countries:
+        prediction_in = schemas.PredictionIn(country=country, **params)
+        key = _prediction_key(prediction_in, reference_date, model)
+        calls[country] = functools.partial(
+            _batch_prediction, key, prediction_in, reference_date,
+            histories.get(country), model, current_user.id, started)
+    return StreamingResponse(prediction_batch.stream(calls),
+                             media_type="application/x-ndjson")
+
+
+def _batch_prediction(key, prediction_in, reference_date, df_filtered, model,
+                      user_id, started, is_cancelled):
+    output = forecast_cache.cache.get(key)
+    if output is not None:
+        _record_prediction(user_id, prediction_in, reference_date, output,
+                           started, True)
+        return output
+    if df_filtered is None:
+        raise HTTPException(status_code=404,
+                            detail=f"""Aucune donnée disponible pour
+                                {prediction_in.country}
+                                jusqu'à la date {reference_date}.""")
+    compute = functools.partial(_forecast, prediction_in, reference_date,
+                                df_filtered, model, is_cancelled=is_cancelled)
+    output = _shared_prediction(key, compute, is_cancelled)
+    # Latence : délai jusqu'à la ligne du pays dans le flux.
+    _record_prediction(user_id, prediction_in, reference_date, output,
+                       started, False)
+    return output
+
+
+def _load_histories(db, countries, reference_date):
+    """Historiques de plusieurs pays jusqu'à la date de référence, lus
+    en une requête : {pays: DataFrame}."""
+    df = _query_history(db, countries, reference_date)
+    return {country: group.reset_index(drop=True)
+            for country, group in df.groupby('country', sort=False)}
+
+
+def _query_history(db, countries, reference_date):
+    """Lit l'historique des pays jusqu'à la date de référence depuis le
+    store de features : le filtre de date est fait en SQL et les
+    features du modèle (cases_log, taux de mortalité) sont déjà
+    calculées. Lu dans le store en mémoire s'il est disponible."""
+    snapshot = timeseries_store.current(db)
+    if snapshot is not None:
+        return snapshot.history(countries, reference_date)
+    return feature_store.load(db, countries, reference_date)
+
+
+def _validate_prediction(prediction_in):
+    """Valide les paramètres et retourne la date de référence."""
+    _validate_days(prediction_in.days)
+    # Les séries de comptage ne sont pas prévues ici (réponse étiquetée
+    # taux de mortalité) : /api/predict/multi, modèles légers.
+    if prediction_in.prediction_type != PREDICTION_TYPE:
+        raise HTTPException(status_code=422,
+                            detail=f"""Invalid prediction_type. Must be
+                            '{PREDICTION_TYPE}' ('cases', 'deaths' and
+                            'recovered': /api/predict/multi)""")
+    if prediction_in.model is None:
+        prediction_in.model = "prophet"
+    if prediction_in.model not in PREDICTION_MODELS:
+        raise HTTPException(status_code=422,
+                            detail=f"""Invalid model. Must be one of
+                            {', '.join(PREDICTION_MODELS)}""")
+    return _reference_date(prediction_in.reference_date)
+
+
+def _validate_multi_prediction(prediction_in):
+    """Valide une prévision multi-séries ; retourne la date de référence
+    et les séries demandées (sans doublons)."""
+    _validate_days(prediction_in.days)
+    targets = list(dict.fromkeys(prediction_in.targets))
+    if not targets or any(t not in PREDICTION_TARGETS for t in targets):
+        raise HTTPException(status_code=422,
+                            detail=f"""Invalid targets. Must be among
+                            {', '.join(PREDICTION_TARGETS)}""")
+    if prediction_in.model is None:
+        prediction_in.model = "holt"
+    if prediction_in.model not in fast_forecast.MODELS:
+        raise HTTPException(status_code=422,
+                            detail=f"""Invalid model. Must be one of
+                            {', '.join(fast_forecast.MODELS)}""")
+    return _reference_date(prediction_in.reference_date), targets
+
+
+def _validate_days(days):
+    if days is None or days <= 0 or days > 30:
         raise HTTPException(status_code=422,
                             detail="""Le nombre de jours
                             doit être entre 1 et 30.""")
-    if prediction_in.prediction_type not in ["cases", "deaths", "recovered"]:
-        raise HTTPException(status_code=422,
-                            detail="""Invalid prediction_type.
-                            Must be 'cases', 'deaths', or 'recovered'""")
 
+
+def _reference_date(reference_date):
     # Gérer la date de référence historique
-    reference_date = None
-    if prediction_in.reference_date:
+    if reference_date:
         try:
-            reference_date = pd.to_datetime(
-                prediction_in.reference_date).date()
+            return pd.to_datetime(reference_date).date()
         except ValueError:
             raise HTTPException(status_code=422,
                                 detail="""Format de date de référence invalide.
                                     Utilisez le format YYYY-MM-DD.""")
-    else:
-        # Date par défaut en 2020 si aucune date n'est fournie
-        reference_date = date(2020, 7, 1)
-
-    # Récupérer les données historiques du pays
-    historical_data = db.query(models.Data).filter(
-        models.Data.country == prediction_in.country).order_by(
-            models.Data.date).all()
-    if not historical_data:
+    # Date par défaut en 2020 si aucune date n'est fournie
+    return date(2020, 7, 1)
+
+
+def warm_prediction(db, prediction_in):
+    """Calcule et met en cache la prévision `prediction_in` si elle n'y
+    est pas déjà (préchauffage, hors requête). Retourne True si elle a
+    été calculée ; lève HTTPException comme /api/predict."""
+    reference_date = _validate_prediction(prediction_in)
+    model = model_registry.active()
+    key = _prediction_key(prediction_in, reference_date, model)
+    if forecast_cache.cache.contains(key):
+        return False
+
+    def compute():
+        df_filtered = _load_history(db, prediction_in, reference_date)
+        return _forecast(prediction_in, reference_date, df_filtered, model)
+    _shared_prediction(key, compute)
+    return True
+
+
+def _prediction_key(prediction_in, reference_date, model):
+    # Version du modèle qui sert la requête : l'activation d'une version
+    # de Prophet n'invalide pas les prévisions des modèles légers.
+    return forecast_cache.make_key(
+        prediction_in.country, reference_date, prediction_in.days,
+        prediction_in.prediction_type, prediction_in.model,
+        _model_version(prediction_in, model), prediction_in.uncertainty)
+
+
+def _shared_prediction(key, compute, is_cancelled=None):
+    """Exécute `compute()` une seule fois parmi les requêtes identiques
+    simultanées et met le résultat en cache."""
+    def compute_and_cache():
+        output = compute()
+        forecast_cache.cache.put(key, output)
+        return output
+
+    # Si le client du calcul partagé se déconnecte, ce calcul est
+    # annulé : les autres demandeurs relancent alors le leur.
+    for _ in range(2):
+        try:
+            return single_flight.predictions.do(key, compute_and_cache)
+        except prediction_pool.PredictionCancelled:
+            if is_cancelled is not None and is_cancelled():
+                raise HTTPException(status_code=499,
+                                    detail="Client disconnected")
+    raise HTTPException(status_code=503,
+                        detail="Prediction cancelled, retry later")
+
+
+def _load_history(db, prediction_in, reference_date):
+    """Historique du pays jusqu'à la date de référence (DataFrame)."""
+    df_filtered = _query_history(db, [prediction_in.country], reference_date)
+    if len(df_filtered) == 0:
+        _raise_no_history(db, prediction_in.country, reference_date)
+    return df_filtered
+
+
+def _load_counts(db, country, reference_date):
+    """Cas confirmés, décès et guérisons du pays jusqu'à la date de
+    référence, lus en une requête (index country, date) : colonnes ds,
+    confirmed, deaths, recovered, une ligne par date."""
+    rows = db.query(models.Data.date, models.Data.confirmed,
+                    models.Data.deaths, models.Data.recovered).filter(
+        models.Data.country == country,
+        models.Data.date <= reference_date).order_by(
+            models.Data.date, models.Data.id).all()
+    if not rows:
+        _raise_no_history(db, country, reference_date)
+    df = pd.DataFrame(rows, columns=['ds', *PREDICTION_TARGETS.values()])
+    # Comme dans le store de features : la dernière ligne saisie pour
+    # une date l'emporte.
+    df = df.drop_duplicates('ds', keep='last')
+    df['ds'] = df['ds'].astype('datetime64[ns]')
+    return df
+
+
+def _raise_no_history(db, country, reference_date):
+    # Distingue un pays inconnu d'un pays sans données avant la date.
+    if db.query(models.Data.id).filter(
+            models.Data.country == country).first() is None:
         raise HTTPException(status_code=404,
                             detail=f"""No data found for
-                                {prediction_in.country}
+                                {country}
                                 to make a prediction.""")
+    raise HTTPException(status_code=422,
+                        detail=f"""Aucune donnée disponible pour
+                            {country}
+                            jusqu'à la date {reference_date}.""")
+
+
+def _forecast(prediction_in, reference_date, df_filtered, model,
+              is_cancelled=None, timeout=None):
+    """Calcule la prévision d'une requête validée à partir de son
+    historique, avec la version de modèle `model` du registre."""
+    # Log de debug uniquement : le formatage du DataFrame n'est fait
+    # que si le niveau DEBUG est actif pour ce logger.
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("df_filtered shape=%s tail=%s", df_filtered.shape,
+                     df_filtered['taux_mortalite'].tail().tolist())
+
+    if prediction_in.model in fast_forecast.MODELS:
+        # Modèle léger : ajusté dans la requête, en moins d'une
+        # milliseconde (le pool de workers coûterait davantage).
+        try:
+            forecast = predict_dispatch(prediction_in.model, df_filtered,
+                                        prediction_in.days,
+                                        uncertainty=prediction_in.uncertainty)
+        except Exception as e:
+            logger.exception("Erreur lors de la prédiction %s : %s",
+                             prediction_in.model, e)
+            raise HTTPException(status_code=500,
+                                detail=f"Erreur lors de la prédiction : {e}")
+    else:
+        forecast = _prophet_forecast(prediction_in, df_filtered, model,
+                                     is_cancelled, timeout)
+    return _prediction_output(prediction_in, reference_date, forecast,
+                              _model_version(prediction_in, model))
 
-    # Convertir en DataFrame
-    df_data = []
-    for d in historical_data:
-        df_data.append({
-            'date': d.date,
-            'cases': d.confirmed,
-            'deaths': d.deaths,
-            'recovered': d.recovered,
-            'new_cases': d.new_cases,
-            'new_deaths': d.new_deaths,
-            'new_recovered': d.new_recovered,
-            'country': d.country
-        })
-    df = pd.DataFrame(df_data)
-
-    # Calculer le taux de mortalité (%)
-    if 'taux_mortalite' not in df.columns:
-        df['taux_mortalite'] = (df['deaths'] / df['cases']) * 100
-        df['taux_mortalite'] = df['taux_mortalite'].fillna(0)
-
-    # Filtrer les données jusqu'à la date de référence
-    df_filtered = df[df['date'] <= reference_date].copy()
-    if len(df_filtered) == 0:
-        raise HTTPException(status_code=422,
-                            detail=f"""Aucune donnée disponible pour
-                                {prediction_in.country}
-                                jusqu'à la date {reference_date}.""")
 
-    # Log avancé pour debug pro
-    logger.info(f"df_filtered shape: {df_filtered.shape}")
-    logger.info(f"df_filtered columns: {df_filtered.columns}")
-    if 'taux_mortalite' in df_filtered.columns:
-        logger.info(f"""
-                    df_filtered['taux_mortalite']
-                    tail: {df_filtered['taux_mortalite'].tail()}""")
-    else:
-        logger.warning("Colonne 'taux_mortalite' absente du DataFrame !")
+def _model_version(prediction_in, model):
+    """Version du modèle servant la requête : version du registre pour
+    Prophet, nom du modèle léger sinon."""
+    if prediction_in.model in fast_forecast.MODELS:
+        return prediction_in.model
+    return model.version
 
-    # Appeler le modèle Prophet (LSTM supprimé)
-    try:
-        forecast = predict_dispatch('prophet', df_filtered, prediction_in.days)
-    except Exception as e:
-        logger.error(f"""
-                     Erreur lors de la prédiction Prophet : {e}""")
-        raise HTTPException(status_code=500,
-                            detail=f"""
-                                Erreur lors de la prédiction Prophet : {e}""")
 
+def _prediction_output(prediction_in, reference_date, forecast,
+                       model_version):
     # Retourner directement la valeur prédite comme taux de mortalité (%)
-    predictions = []
-    for i in range(prediction_in.days):
-        pred_date = reference_date + pd.Timedelta(days=i+1)
-        taux = (
-            float(forecast.iloc[i]["yhat"])
-            if hasattr(forecast, 'iloc')
-            else float(forecast[i])
-        )
+    return {
+        "country": prediction_in.country,
+        "prediction_type": PREDICTION_TYPE,
+        "days": prediction_in.days,
+        "predictions": _format_predictions(
+            forecast, reference_date, prediction_in.days,
+            prediction_in.uncertainty),
+        # Version du modèle ayant servi la prédiction.
+        "model_version": model_version
+    }
 
-        predictions.append({
-            "day": i+1,
-            "predicted_value": taux,
-            "date": pred_date.isoformat()
-        })
 
-    output = {
+def _multi_forecast(prediction_in, targets, reference_date, df_counts):
+    """Prévisions des séries `targets`, ajustées ensemble par le modèle
+    léger de la requête à partir de l'historique commun `df_counts`."""
+    try:
+        forecasts = fast_forecast.predict_series(
+            prediction_in.model, df_counts,
+            [PREDICTION_TARGETS[target] for target in targets],
+            prediction_in.days, uncertainty=prediction_in.uncertainty)
+    except Exception as e:
+        logger.exception("Erreur lors de la prédiction %s : %s",
+                         prediction_in.model, e)
+        raise HTTPException(status_code=500,
+                            detail=f"Erreur lors de la prédiction : {e}")
+    return {
         "country": prediction_in.country,
-        "prediction_type": "taux_mortalite",
         "days": prediction_in.days,
-        "predictions": predictions
+        "predictions": {
+            target: _format_predictions(
+                forecasts[PREDICTION_TARGETS[target]], reference_date,
+                prediction_in.days, prediction_in.uncertainty)
+            for target in targets},
+        "model_version": prediction_in.model
     }
-    logger.info(f"[PREDICT] Output: {output}")
-    return output
+
+
+def _prophet_forecast(prediction_in, df_filtered, model, is_cancelled,
+                      timeout):
+    # Modèle Prophet (LSTM supprimé), dans le pool de workers
+    try:
+        return prediction_pool.run(
+            predict_dispatch, 'prophet', df_filtered, prediction_in.days,
+            uncertainty=prediction_in.uncertainty,
+            path=model.artifact(prediction_in.country),
+            timeout=timeout, is_cancelled=is_cancelled)
+    except prediction_pool.PredictionCancelled:
+        raise
+    except prediction_pool.PredictionTimeout as e:
+        logger.error("Prédiction Prophet expirée : %s", e)
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        logger.exception("Erreur lors de la prédiction Prophet : %s", e)
+        raise HTTPException(status_code=500,
+                            detail=f"""
+                                Erreur lors de la prédiction Prophet : {e}""")
+
+
+def _format_predictions(forecast, reference_date, days, uncertainty=False):
+    """Construit la liste des prédictions en une passe : valeurs et
+    dates sont converties par colonnes, sans accès ligne à ligne."""
+    if hasattr(forecast, 'iloc'):
+        values = forecast["yhat"].to_numpy(dtype=float)[:days]
+    else:
+        values = np.asarray(forecast, dtype=float)[:days]
+    dates = pd.date_range(reference_date + pd.Timedelta(days=1),
+                          periods=days).strftime("%Y-%m-%d")
+    columns = {"day": range(1, days + 1), "predicted_value": values.tolist(),
+               "date": dates.tolist()}
+    # Intervalles renvoyés uniquement si demandés (uncertainty=True) et
+    # calculés par le modèle.
+    if uncertainty and "yhat_lower" in getattr(forecast, 'columns', ()):
+        columns["lower"] = forecast["yhat_lower"].to_numpy(
+            dtype=float)[:days].tolist()
+        columns["upper"] = forecast["yhat_upper"].to_numpy(
+            dtype=float)[:days].tolist()
+    return [dict(zip(columns, row)) for row in zip(*columns.values())]
 
 
 # Endpoint pour l'historique des prédictions
-@router.get("/predictions/history", response_model=List[dict])
+@router.get("/predictions/history",
+            response_model=List[schemas.PredictionHistoryOut],
+            dependencies=[Depends(rate_limit.per_user("read"))])
 def get_prediction_history(
+    # Filtre facultatif par pays.
+    country: Optional[str] = Query(None),
+    # Pagination : éléments ignorés et nombre maximal retourné.
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
     current_user: models.User = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
-    """Récupère l'historique des prédictions de l'utilisateur."""
-    # Pour l'instant, retourner une liste vide
-    # (à implémenter avec un modèle PredictionHistory)
-    return []
+    """Récupère l'historique des prédictions de l'utilisateur, de la
+    plus récente à la plus ancienne (index user_id, created_at)."""
+    # Les prédictions encore dans le tampon d'écriture sont incluses.
+    prediction_history.writer.flush()
+    query = db.query(models.PredictionHistory).filter(
+        models.PredictionHistory.user_id == current_user.id)
+    if country:
+        query = query.filter(models.PredictionHistory.country == country)
+    rows = query.order_by(models.PredictionHistory.created_at.desc(),
+                          models.PredictionHistory.id.desc()).offset(
+                              skip).limit(limit).all()
+    return [schemas.PredictionHistoryOut.from_orm(row) for row in rows]
+
+
+# Précision des prévisions servies, mesurée sur les valeurs réelles
+@router.get("/accuracy")
+def get_accuracy(
+    # Regroupement : model, model_version, country et/ou horizon.
+    by: List[str] = Query(["model", "model_version"]),
+    model: Optional[str] = Query(None),
+    country: Optional[str] = Query(None),
+    current_user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """Erreurs (MAE, RMSE, SMAPE) des prévisions de l'historique
+    comparées aux valeurs réelles disponibles, mises à jour après chaque
+    import de données (accuracy_monitor.py)."""
+    if any(column not in accuracy_monitor.GROUP_COLUMNS for column in by):
+        raise HTTPException(status_code=422,
+                            detail=f"""Invalid grouping. Must be among
+                            {', '.join(accuracy_monitor.GROUP_COLUMNS)}""")
+    return accuracy_monitor.monitor.report(db, by=list(dict.fromkeys(by)),
+                                           model=model, country=country)
 
 
 # Endpoint pour recharger dynamiquement le modèle IA
-@router.post("/reload")
+@router.post("/reload", status_code=status.HTTP_202_ACCEPTED,
+             dependencies=[Depends(rate_limit.per_user("load"))])
 def reload_model(
+    # Version à activer (par défaut la plus récente du registre).
+    version: Optional[str] = Query(None),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Charge une version du modèle en arrière-plan, la teste puis
+    l'active ; les prédictions en cours se terminent sur l'ancienne.
+    Requiert des droits administrateur."""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin rights required")
+    try:
+        target = model_registry.registry.activate(
+            version or model_registry.registry.latest().version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Model version not found")
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    # Les clés du cache incluent la version : pas d'invalidation, mais
+    # préchauffage des prévisions de la nouvelle version une fois
+    # celle-ci chargée.
+    cache_warmer.schedule("model")
+    worker_sync.publish("model", version=target.version)
+    return {"status": "loading", "version": target.version}
+
+
+# Registre des modèles : versions disponibles et version active
+@router.get("/models")
+def list_models(
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Liste les versions du modèle et l'état du registre."""
+    return dict(model_registry.registry.status(), versions=[
+        v.to_dict() for v in model_registry.registry.versions()])
+
+
+@router.post("/models/rollback")
+def rollback_model(
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Revient immédiatement à la version précédente du modèle.
+    Requiert des droits administrateur."""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin rights required")
+    try:
+        model = model_registry.registry.rollback()
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    cache_warmer.schedule("model")
+    worker_sync.publish("model", version=model.version)
+    return {"status": "active", "version": model.version}
+
+
+# Évaluation des modèles par origine glissante (backtesting.py)
+@router.post("/backtests", status_code=status.HTTP_202_ACCEPTED,
+             dependencies=[Depends(rate_limit.per_user("load"))])
+def start_backtest(
+    backtest_in: schemas.BacktestIn,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Lance en arrière-plan l'évaluation des modèles sur tous les pays
+    (MAE, RMSE, SMAPE), ou reprend un run interrompu.
+    Requiert des droits administrateur."""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin rights required")
+    if (backtest_in.horizon is not None and not 1 <= backtest_in.horizon <= 30
+            or backtest_in.step is not None and backtest_in.step <= 0):
+        raise HTTPException(status_code=422,
+                            detail="""L'horizon doit être entre 1 et 30 jours
+                            et le pas positif.""")
+    try:
+        config = backtesting.backtester.start(db, **backtest_in.dict())
+    except OSError:
+        raise HTTPException(status_code=404, detail="Backtest not found")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"status": config["status"], "run_id": config["run_id"],
+            "origins": len(config["origins"])}
+
+
+@router.get("/backtests")
+def list_backtests(
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Liste les runs d'évaluation et leur état."""
+    return backtesting.backtester.runs()
+
+
+@router.get("/backtests/{run_id}")
+def get_backtest(
+    run_id: str,
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """État d'un run et scores par modèle (global, par jour d'horizon,
+    par pays) ; rapport partiel tant que le run est en cours."""
+    try:
+        return backtesting.backtester.get(run_id)
+    except (OSError, ValueError):
+        raise HTTPException(status_code=404, detail="Backtest not found")
+
+
+# Métriques internes (bulkheads, caches...)
+@router.get("/metrics")
+def get_metrics():
+    """Retourne les métriques des sous-systèmes (files d'attente,
+    rejets, etc.). Accessible publiquement, sans données personnelles."""
+    return metrics.snapshot()
+
+
+# Téléchargement d'un profil produit par une requête "X-Profile: 1"
+@router.get("/profiles/{name}")
+def download_profile(
+    name: str,
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    """Recharge le modèle IA. Requiert des droits administrateur."""
+    """Renvoie un profil (format collapsed stacks, compatible flamegraph).
+    Requiert des droits administrateur."""
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Admin rights required")
-    ml_model.load_model()
-    return {"status": "Model reloaded"}
+    name = os.path.basename(name)
+    path = os.path.join(profiling.PROFILE_DIR, name)
+    if not name.endswith(profiling.PROFILE_SUFFIX) or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=name)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import Dict, List, Optional, Union
 import datetime
 
 # --- Schémas pour les Utilisateurs ---
@@ -71,11 +71,15 @@ class DataOut(DataIn):
 class PredictionIn(BaseModel):
     country: str  # Pays pour lequel la prédiction est demandée.
     days: int  # Nombre de jours à prédire (1-30).
-    # Type de prédiction: "cases", "deaths", ou "recovered".
+    # Type de prédiction : "taux_mortalite" (séries de comptage :
+    # PredictionMultiIn).
     prediction_type: str
-    model: Optional[str] = 'prophet'  # 'prophet' ou 'lstm'
+    # 'prophet' ou modèle léger : 'holt', 'damped', 'loglinear'.
+    model: Optional[str] = 'prophet'
     # Date de référence historique (format ISO)
     reference_date: Optional[str] = None
+    # Calcule aussi les intervalles d'incertitude (plus lent).
+    uncertainty: Optional[bool] = False
 
 
 # PredictionOut: Schéma pour la sortie (réponse) de la prédiction IA.
@@ -84,6 +88,90 @@ class PredictionOut(BaseModel):
     prediction_type: str
     days: int
     predictions: list
+    # Version du modèle ayant servi la prédiction.
+    model_version: Optional[str] = None
+
+
+# PredictionHistoryOut: Prédiction de l'historique de l'utilisateur
+# (/api/predictions/history).
+class PredictionHistoryOut(BaseModel):
+    id: int
+    created_at: datetime.datetime
+    country: str
+    prediction_type: str
+    model: str
+    days: int
+    reference_date: datetime.date
+    uncertainty: bool
+    model_version: Optional[str] = None
+    predictions: list
+    latency_ms: float
+    cached: bool
+
+    class Config:
+        orm_mode = True
+
+
+# PredictionBatchIn: Paramètres d'une prédiction multi-pays
+# (/api/predict/batch), horizon et date de référence communs.
+class PredictionBatchIn(BaseModel):
+    # Liste de pays, ou "all" pour tous les pays disponibles.
+    countries: Union[List[str], str]
+    days: int
+    prediction_type: str
+    model: Optional[str] = 'prophet'
+    reference_date: Optional[str] = None
+    uncertainty: Optional[bool] = False
+
+
+# PredictionMultiIn: Prévision de plusieurs séries d'un pays en un seul
+# appel (/api/predict/multi), avec un modèle léger de fast_forecast.
+class PredictionMultiIn(BaseModel):
+    country: str
+    days: int
+    # Séries à prévoir parmi "cases", "deaths" et "recovered".
+    targets: List[str] = ["cases", "deaths", "recovered"]
+    # 'holt', 'damped' ou 'loglinear'.
+    model: Optional[str] = 'holt'
+    reference_date: Optional[str] = None
+    uncertainty: Optional[bool] = False
+
+
+# PredictionMultiOut: Prévisions par série ({"cases": [...], ...}).
+class PredictionMultiOut(BaseModel):
+    country: str
+    days: int
+    predictions: Dict[str, list]
+    model_version: Optional[str] = None
+
+
+# PredictionJobOut: État d'une prédiction asynchrone (/api/predict/jobs).
+class PredictionJobOut(BaseModel):
+    job_id: str
+    # "pending", "running", "done" ou "failed".
+    status: str
+    created_at: datetime.datetime
+    finished_at: Optional[datetime.datetime] = None
+    # Résultat, identique à la réponse de /api/predict (si "done").
+    result: Optional[PredictionOut] = None
+    # Message et code HTTP de l'erreur (si "failed").
+    error: Optional[str] = None
+    error_status: Optional[int] = None
+
+
+# BacktestIn: Paramètres d'une évaluation par origine glissante
+# (/api/backtests) ; valeurs par défaut de backtesting.py si absents.
+class BacktestIn(BaseModel):
+    # Modèles évalués (par défaut tous ceux de /api/predict).
+    models: Optional[List[str]] = None
+    horizon: Optional[int] = None
+    # Nombre de jours entre deux dates d'origine.
+    step: Optional[int] = None
+    # Première et dernière date d'origine (format ISO).
+    start: Optional[str] = None
+    end: Optional[str] = None
+    # Identifiant d'un run interrompu à reprendre.
+    resume: Optional[str] = None
 
 
 # Ancien schéma pour compatibilité (à supprimer plus tard)
@@ -0,0 +1,72 @@
+# backend/single_flight.py
+
+# Coalescence des requêtes identiques en cours (single-flight) : quand
+# plusieurs requêtes demandent la même prévision en même temps, seule la
+# première ("leader") la calcule ; les autres attendent et reçoivent son
+# résultat, ou son exception.
+import threading
+
+import metrics
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Partage le résultat d'un calcul entre appels concurrents de même clé."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.shared = 0
+        self.errors = 0
+
+    def do(self, key, fn):
+        """Exécute `fn()` une seule fois par clé parmi les appels
+        simultanés ; tous reçoivent le même résultat ou la même erreur."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            total = self.leaders + self.shared
+            return {
+                "in_flight": len(self._calls),
+                "computations": self.leaders,
+                "coalesced": self.shared,
+                "coalescing_rate": self.shared / total if total else 0.0,
+                "errors": self.errors,
+            }
+
+
+predictions = SingleFlight()
+metrics.register("single_flight", predictions.stats)
@@ -3,17 +3,34 @@ import os
 import pytest
 import main
 import database
+import query_stats
+import prediction_pool
+import prediction_history
+import accuracy_monitor
+import cache_warmer
+import timeseries_store
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 sys.path.insert(0,
                 os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+# Prévisions exécutées dans le thread de test (les mocks restent visibles).
+prediction_pool.PREDICTION_POOL_SIZE = 0
+# Historique des prédictions et suivi de la précision activés par les
+# seuls tests qui les vérifient.
+prediction_history.PREDICTION_HISTORY_ENABLED = False
+accuracy_monitor.ACCURACY_MONITOR_ENABLED = False
+cache_warmer.CACHE_WARM_ENABLED = False
+# Lectures en base, sauf dans les tests du store en mémoire.
+timeseries_store.TIMESERIES_STORE_ENABLED = False
+
 
 @pytest.fixture(scope="function")
 def test_app():
     # Utilise une base SQLite temporaire sur disque
     test_db_path = "./test.db"
     engine = create_engine(f"sqlite:///{test_db_path}")
+    query_stats.instrument_engine(engine)
     TestingSessionLocal = sessionmaker(autocommit=False,
                                        autoflush=False, bind=engine)
     database.base.Base.metadata.create_all(bind=engine)
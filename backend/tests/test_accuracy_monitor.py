@@ -0,0 +1,81 @@
+import accuracy_monitor
+import auth
+import feature_store
+import models
+import pytest
+from datetime import date, datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+
+def _add_day(db, i):
+    # Taux de mortalité réel : 1 + 0,1 * i (%).
+    db.add(models.Data(country="TestLand",
+                       date=date(2020, 6, 1) + timedelta(days=i),
+                       confirmed=1000, deaths=10 + i))
+
+
+def _prediction(reference_date, values, model="holt"):
+    return models.PredictionHistory(
+        user_id=1, created_at=datetime(2024, 1, 1), country="TestLand",
+        prediction_type="taux_mortalite", model=model, days=len(values),
+        reference_date=reference_date, uncertainty=False,
+        model_version=model, latency_ms=1.0, cached=False,
+        predictions=[{"day": i + 1, "predicted_value": value,
+                      "date": (reference_date + timedelta(days=i + 1))
+                      .isoformat()}
+                     for i, value in enumerate(values)])
+
+
+def test_incremental_accuracy(test_app, monkeypatch):
+    override = list(test_app.dependency_overrides.values())[0]
+    db = next(override())
+    db.add(models.User(username="u", hashed_password="x"))
+    for i in range(20):
+        _add_day(db, i)
+    feature_store.rebuild(db)
+    complete = _prediction(date(2020, 6, 15), [2.5, 2.7, 3.0])
+    partial = _prediction(date(2020, 6, 19), [3.0, 3.0, 3.0])
+    db.add_all([complete, partial])
+    db.commit()
+    monitor = accuracy_monitor.AccuracyMonitor(
+        sessionmaker(bind=db.get_bind()))
+
+    # Actuals available up to 2020-06-20: 3 + 1 days evaluated.
+    assert monitor.update() == 4
+    db.expire_all()
+    assert complete.complete and complete.evaluated == 0b111
+    assert not partial.complete and partial.evaluated == 0b001
+    assert monitor.update() == 0
+
+    # New day imported: only the missing day of the pending forecast.
+    _add_day(db, 20)
+    feature_store.refresh(db, ["TestLand"])
+    db.commit()
+    assert monitor.update(["TestLand"]) == 1
+    assert monitor.update(["TestLand"]) == 0
+
+    by_horizon = monitor.report(db, by=["horizon"])
+    assert [(r["horizon"], r["n"]) for r in by_horizon] == [
+        (1, 2), (2, 2), (3, 1)]
+    # |2.5 - 2.5| et |3.0 - 2.9| ; |2.7 - 2.6| et |3.0 - 3.0|.
+    assert by_horizon[0]["mae"] == pytest.approx(0.05)
+    assert by_horizon[1]["rmse"] == pytest.approx((0.01 / 2) ** 0.5)
+    [summary] = monitor.stats()["models"]
+    assert summary == dict(model="holt", **{
+        name: pytest.approx(value) for name, value in accuracy_monitor.scores(
+            5, 0.5, 0.11, 0.2 / 5.9 + 0.2 / 5.3 + 0.6 / 5.7).items()})
+
+    monkeypatch.setattr(accuracy_monitor, "monitor", monitor)
+    client = TestClient(test_app)
+    headers = {"Authorization":
+               f"Bearer {auth.create_access_token({'sub': 'u'})}"}
+    rows = client.get("/api/accuracy?by=model&by=country",
+                      headers=headers).json()
+    assert [(r["model"], r["country"], r["n"]) for r in rows] == [
+        ("holt", "TestLand", 5)]
+    assert client.get("/api/accuracy?model=prophet",
+                      headers=headers).json() == []
+    assert client.get("/api/accuracy?by=user",
+                      headers=headers).status_code == 422
+    db.close()
@@ -0,0 +1,154 @@
+import auth
+import backtesting
+import feature_store
+import json
+import models
+import numpy as np
+import os
+import pytest
+import rate_limit
+import time
+import training
+from datetime import date, timedelta
+from fastapi.testclient import TestClient
+
+
+def _add_data(db):
+    for country, slope in (("A-Land", 1), ("B-Land", 2)):
+        for i in range(40):
+            db.add(models.Data(country=country,
+                               date=date(2020, 3, 1) + timedelta(days=i),
+                               confirmed=1000, deaths=slope * i))
+    feature_store.rebuild(db)
+    db.commit()
+
+
+def test_rolling_origin_scores_and_resume(test_app, tmp_path):
+    override = list(test_app.dependency_overrides.values())[0]
+    db = next(override())
+    _add_data(db)
+    backtester = backtesting.Backtester(str(tmp_path))
+    options = dict(models=["holt", "damped"], horizon=5, step=7)
+
+    config = backtester.run(db, workers=0, **options)
+    result = backtester.get(config["run_id"])
+    assert result["status"] == backtesting.DONE
+    assert config["origins"] == ["2020-03-14", "2020-03-21", "2020-03-28",
+                                 "2020-04-04"]
+    holt = result["report"]["holt"]
+    # Taux linéaires (0,1 et 0,2 point par jour) : Holt est exact.
+    assert holt["n"] == 4 * 2 * 5
+    assert holt["mae"] == pytest.approx(0, abs=1e-9)
+    assert [day["n"] for day in holt["horizon"]] == [8] * 5
+    assert set(holt["countries"]) == {"A-Land", "B-Land"}
+    assert result["report"]["damped"]["n"] == 40
+    # Modèle inconnu : refusé.
+    with pytest.raises(ValueError, match="lstm"):
+        backtester.prepare(db, models=["lstm"])
+
+    # Reprise après un arrêt brutal : seules les origines manquantes
+    # sont recalculées, le rapport est identique.
+    results = os.path.join(str(tmp_path), config["run_id"],
+                           backtesting.RESULTS_NAME)
+    with open(results) as f:
+        first = f.readline()
+    with open(results, "w") as f:
+        f.write(first + '{"origin": "2020-03-2')
+    resumed = backtester.run(db, workers=0, resume=config["run_id"],
+                             **options)
+    assert resumed["run_id"] == config["run_id"]
+    assert len(backtesting.read_results(results)) == 4
+    assert backtester.get(config["run_id"])["report"] == result["report"]
+    with pytest.raises(ValueError):
+        backtester.run(db, workers=0, resume=config["run_id"],
+                       models=["holt"], horizon=5, step=7)
+    db.close()
+
+
+def test_prophet_refit_at_each_origin(test_app, tmp_path, monkeypatch):
+    pytest.importorskip("prophet")
+    override = list(test_app.dependency_overrides.values())[0]
+    db = next(override())
+    _add_data(db)
+    monkeypatch.setattr(training, "MIN_TRAINING_DAYS", 21)
+    backtester = backtesting.Backtester(str(tmp_path))
+    config = backtester.run(db, workers=0, models=["prophet"], horizon=5,
+                            step=7, start="2020-04-04")
+    prophet = backtester.get(config["run_id"])["report"]["prophet"]
+    db.close()
+    # Modèle ajusté jusqu'à l'origine : prévision des jours suivants,
+    # taux linéaires quasi exacts (le modèle servi prévoit après juillet).
+    assert prophet["n"] == 2 * 5
+    assert prophet["failed"] == 0
+    assert prophet["mae"] < 0.05
+
+
+def test_common_samples_reported(monkeypatch):
+    line = {"origin": "2020-03-14", "models": {
+        "prophet": {"countries": {"A-Land": [5, 5, 5, 0.5]},
+                    "horizon": [[5, 5, 5, 0.5]], "failed": {"B-Land": "x"}},
+        "holt": {"countries": {"A-Land": [5, 1, 1, 0.1],
+                               "B-Land": [5, 9, 9, 0.9]},
+                 "horizon": [[10, 10, 10, 1]], "failed": {}}}}
+    result = backtesting.report([line], ["prophet", "holt"])
+    assert result["holt"]["n"] == 10
+    # Seul A-Land est prévu par les deux modèles.
+    assert result["holt"]["common"] == backtesting.scores([5, 1, 1, 0.1])
+    assert result["prophet"]["common"] == backtesting.scores([5, 5, 5, 0.5])
+
+    monkeypatch.setattr(training, "MIN_TRAINING_DAYS", 30)
+    assert backtesting.default_min_history(["holt", "prophet"]) == 30
+    assert backtesting.default_min_history(["holt"]) == \
+        backtesting.BACKTEST_MIN_HISTORY
+
+
+def test_scores():
+    actual = np.array([[1.0, 2.0], [0.0, 4.0]])
+    predicted = np.array([[2.0, 2.0], [0.0, 2.0]])
+    sums = backtesting._sums(actual, predicted)
+    assert sums.tolist() == [[2, 1, 1, 2 / 3], [2, 2, 4, 2 / 3]]
+    summary = backtesting.scores(sums.sum(axis=0))
+    assert summary == {"n": 4, "mae": 0.75, "rmse": pytest.approx(
+        np.sqrt(5 / 4)), "smape": pytest.approx(100 / 3)}
+
+
+def test_backtest_endpoints(test_app, tmp_path, monkeypatch):
+    override = list(test_app.dependency_overrides.values())[0]
+    db = next(override())
+    db.add(models.User(username="admin", hashed_password="x", is_admin=True))
+    db.add(models.User(username="u", hashed_password="x"))
+    _add_data(db)
+    db.close()
+    monkeypatch.setattr(backtesting, "backtester",
+                        backtesting.Backtester(str(tmp_path)))
+    monkeypatch.setattr(backtesting, "BACKTEST_WORKERS", 0)
+    monkeypatch.setattr(rate_limit, "backend", rate_limit.MemoryBackend())
+    client = TestClient(test_app)
+
+    def headers(user):
+        return {"Authorization":
+                f"Bearer {auth.create_access_token({'sub': user})}"}
+
+    payload = {"models": ["damped"], "horizon": 3}
+    assert client.post("/api/backtests", json=payload,
+                       headers=headers("u")).status_code == 403
+    assert client.post("/api/backtests", json={"models": ["arima"]},
+                       headers=headers("admin")).status_code == 422
+    started = client.post("/api/backtests", json=payload,
+                          headers=headers("admin"))
+    assert started.status_code == 202
+    run_id = started.json()["run_id"]
+    for _ in range(100):
+        result = client.get(f"/api/backtests/{run_id}",
+                            headers=headers("u")).json()
+        if result["status"] != backtesting.RUNNING:
+            break
+        time.sleep(0.05)
+    assert result["status"] == backtesting.DONE
+    assert result["completed_origins"] == result["origins"] == 4
+    assert result["report"]["damped"]["n"] == 4 * 2 * 3
+    json.dumps(result)
+    listed = client.get("/api/backtests", headers=headers("u")).json()
+    assert [run["run_id"] for run in listed] == [run_id]
+    assert client.get("/api/backtests/nope",
+                      headers=headers("u")).status_code == 404
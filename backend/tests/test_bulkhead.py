@@ -0,0 +1,55 @@
+import asyncio
+import bulkhead
+from fastapi.testclient import TestClient
+
+
+def test_bulkhead_queues_then_rejects():
+    async def scenario():
+        group = bulkhead.Bulkhead("test", ["/x"], max_concurrent=1,
+                                  max_queue=1, timeout=1)
+        assert await group.acquire()
+        waiting = asyncio.ensure_future(group.acquire())
+        await asyncio.sleep(0)
+        assert group.stats()["queued"] == 1
+        assert not await group.acquire()
+        group.release()
+        assert await waiting
+        group.release()
+        return group.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["active"] == 0
+    assert stats["accepted"] == 2
+    assert stats["rejected"] == 1
+
+
+def test_bulkhead_wait_timeout():
+    async def scenario():
+        group = bulkhead.Bulkhead("test", ["/x"], 1, 1, timeout=0.01)
+        await group.acquire()
+        return await group.acquire(), group.stats()
+
+    acquired, stats = asyncio.run(scenario())
+    assert not acquired
+    assert stats["timed_out"] == 1 and stats["queued"] == 0
+
+
+def test_full_group_returns_503(test_app, monkeypatch):
+    group = bulkhead.find("/api/countries")
+    monkeypatch.setattr(group, "max_concurrent", 0)
+    monkeypatch.setattr(group, "max_queue", 0)
+    client = TestClient(test_app)
+    response = client.get("/api/countries")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    metrics = client.get("/api/metrics").json()
+    assert metrics["bulkheads"]["read"]["rejected"] >= 1
+
+
+def test_groups_match_path_segments():
+    assert bulkhead.find("/api/predict").name == "predict"
+    assert bulkhead.find("/api/predict/multi").name == "predict"
+    assert bulkhead.find("/api/predict/jobs/abc").name == "jobs"
+    assert bulkhead.find("/api/predictions/history").name == "read"
+    assert bulkhead.find("/api/data/id/3").name == "read"
+    assert bulkhead.find("/api/predictor") is None
@@ -0,0 +1,79 @@
+import auth
+import bulkhead
+import cache_warmer
+import feature_store
+import forecast_cache
+import models
+import rate_limit
+from datetime import date, datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+
+def _history(model, days, count):
+    return [models.PredictionHistory(
+        user_id=1, created_at=datetime.utcnow(), country="TestLand",
+        prediction_type="taux_mortalite", model=model, days=days,
+        reference_date=date(2020, 6, 20), uncertainty=False,
+        model_version=model, latency_ms=1.0, cached=False, predictions=[])
+        for _ in range(count)]
+
+
+def test_warm_hot_and_frequent_keys(test_app, monkeypatch):
+    override = list(test_app.dependency_overrides.values())[0]
+    db = next(override())
+    db.add(models.User(username="u", hashed_password="x"))
+    for i in range(30):
+        db.add(models.Data(country="TestLand",
+                           date=date(2020, 6, 1) + timedelta(days=i),
+                           confirmed=1000, deaths=10 + i))
+    feature_store.rebuild(db)
+    # Requêtes les plus fréquentes : damped (3 fois) puis loglinear.
+    db.add_all(_history("damped", 5, 3) + _history("loglinear", 5, 1)
+               + _history("holt", 7, 2))
+    db.commit()
+    cache = forecast_cache.ForecastCache()
+    monkeypatch.setattr(forecast_cache, "cache", cache)
+    warmer = cache_warmer.CacheWarmer(
+        sessionmaker(bind=db.get_bind()), countries=["TestLand", "Nowhere"],
+        models=["holt"], reference_date="2020-06-20", days=7, top=2,
+        cpu_budget=1.0)
+
+    # holt pour les deux pays fixes (Nowhere : pas de données), puis
+    # damped ; holt à 7 jours est déjà couvert par les combinaisons fixes.
+    assert warmer.run() == 2
+    assert (warmer.warmed, warmer.failures) == (2, 1)
+    assert warmer.run() == 0
+    assert warmer.skipped == 2
+    # Le préchauffage ne fausse pas les statistiques du cache.
+    assert (cache.hits, cache.misses) == (0, 0)
+
+    monkeypatch.setattr(rate_limit, "backend", rate_limit.MemoryBackend())
+    token = auth.create_access_token({"sub": "u"})
+    response = TestClient(test_app).post(
+        "/api/predict", headers={"Authorization": f"Bearer {token}"},
+        json={"country": "TestLand", "days": 5,
+              "prediction_type": "taux_mortalite",
+              "model": "damped", "reference_date": "2020-06-20"})
+    assert response.status_code == 200
+    assert cache.hits == 1
+    db.close()
+
+
+def test_warming_yields_to_live_traffic(monkeypatch):
+    predict = bulkhead.find("/api/predict")
+    monkeypatch.setattr(predict, "active", 1)
+    sleeps = []
+
+    def sleep(seconds):
+        # La requête en cours se termine pendant la première pause.
+        sleeps.append(seconds)
+        predict.active = 0
+    monkeypatch.setattr(cache_warmer.time, "sleep", sleep)
+    warmer = cache_warmer.CacheWarmer(cpu_budget=0.25)
+    warmer._wait(lambda: cache_warmer.live_predictions() > 0)
+    assert sleeps == [cache_warmer.POLL_INTERVAL]
+
+    # Budget de 25 % : 3 secondes de pause par seconde de calcul.
+    warmer._throttle(0.5)
+    assert sleeps[-1] == 1.5
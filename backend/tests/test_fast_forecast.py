@@ -0,0 +1,112 @@
+import auth
+import fast_forecast
+import feature_store
+import forecast_cache
+import models
+import numpy as np
+import pandas as pd
+import pytest
+import rate_limit
+from datetime import date, timedelta
+from fastapi.testclient import TestClient
+
+
+def history(values):
+    return pd.DataFrame({
+        'ds': pd.date_range('2020-06-01', periods=len(values)),
+        'taux_mortalite': values})
+
+
+@pytest.mark.parametrize("name", sorted(fast_forecast.MODELS))
+def test_models_follow_the_trend(name):
+    linear = history(2.0 + 0.1 * np.arange(40))
+    forecast = fast_forecast.predict(name, linear, 5, uncertainty=True)
+    assert forecast['ds'].tolist() == list(pd.date_range('2020-07-11',
+                                                         periods=5))
+    assert forecast['yhat'].is_monotonic_increasing
+    assert (forecast['yhat_lower'] <= forecast['yhat']).all()
+    assert (forecast['yhat'] <= forecast['yhat_upper']).all()
+    if name == "holt":
+        assert np.allclose(forecast['yhat'], 6.0 + 0.1 * np.arange(5))
+
+
+def test_fast_model_served_by_predict(test_app):
+    override = list(test_app.dependency_overrides.values())[0]
+    db = next(override())
+    db.add(models.User(username="u", hashed_password="x"))
+    for i in range(20):
+        db.add(models.Data(country="TestLand",
+                           date=date(2020, 6, 1) + timedelta(days=i),
+                           confirmed=1000, deaths=10 + i))
+    feature_store.rebuild(db)
+    db.commit()
+    db.close()
+    client = TestClient(test_app)
+    headers = {"Authorization":
+               f"Bearer {auth.create_access_token({'sub': 'u'})}"}
+    payload = {"country": "TestLand", "days": 3,
+               "prediction_type": "taux_mortalite",
+               "model": "holt", "reference_date": "2020-06-20"}
+
+    body = client.post("/api/predict", json=payload, headers=headers).json()
+    assert body["model_version"] == "holt"
+    assert [p["date"] for p in body["predictions"]] == [
+        "2020-06-21", "2020-06-22", "2020-06-23"]
+    assert body["predictions"][0]["predicted_value"] == pytest.approx(3.0)
+
+    unknown = dict(payload, model="arima")
+    assert client.post("/api/predict", json=unknown,
+                       headers=headers).status_code == 422
+
+
+@pytest.mark.parametrize("name", sorted(fast_forecast.MODELS))
+def test_series_fitted_together_match_separate_fits(name):
+    df = history(2.0 + 0.1 * np.arange(40)).assign(
+        cases=1000.0 * 1.05 ** np.arange(40))
+    both = fast_forecast.predict_series(name, df, ['taux_mortalite', 'cases'],
+                                        5, uncertainty=True)
+    for column in ('taux_mortalite', 'cases'):
+        alone = fast_forecast.predict_series(name, df, [column], 5,
+                                             uncertainty=True)[column]
+        pd.testing.assert_frame_equal(both[column], alone)
+
+
+def test_multi_target_prediction(test_app, monkeypatch):
+    override = list(test_app.dependency_overrides.values())[0]
+    db = next(override())
+    db.add(models.User(username="u", hashed_password="x"))
+    for i in range(20):
+        db.add(models.Data(country="TestLand",
+                           date=date(2020, 6, 1) + timedelta(days=i),
+                           confirmed=1000 + 100 * i, deaths=10 + i,
+                           recovered=500 + 50 * i))
+    db.commit()
+    db.close()
+    monkeypatch.setattr(forecast_cache, "cache",
+                        forecast_cache.ForecastCache())
+    monkeypatch.setattr(rate_limit, "backend", rate_limit.MemoryBackend())
+    client = TestClient(test_app)
+    headers = {"Authorization":
+               f"Bearer {auth.create_access_token({'sub': 'u'})}"}
+    payload = {"country": "TestLand", "days": 2,
+               "reference_date": "2020-06-20"}
+
+    body = client.post("/api/predict/multi", json=payload,
+                       headers=headers).json()
+    assert body["model_version"] == "holt"
+    assert list(body["predictions"]) == ["cases", "deaths", "recovered"]
+    assert [p["predicted_value"] for p in body["predictions"]["cases"]] == \
+        pytest.approx([3000, 3100])
+    assert body["predictions"]["deaths"][1] == {
+        "day": 2, "predicted_value": pytest.approx(31), "date": "2020-06-22"}
+
+    deaths = client.post("/api/predict/multi", headers=headers, json=dict(
+        payload, targets=["deaths"], uncertainty=True)).json()
+    assert list(deaths["predictions"]) == ["deaths"]
+    assert "lower" in deaths["predictions"]["deaths"][0]
+    for invalid in ({"targets": ["hospitalized"]}, {"targets": []},
+                    {"model": "prophet"}):
+        assert client.post("/api/predict/multi", json=dict(
+            payload, **invalid), headers=headers).status_code == 422
+    assert client.post("/api/predict/multi", json=dict(
+        payload, country="Nowhere"), headers=headers).status_code == 404
@@ -0,0 +1,52 @@
+import auth
+import data_loader
+import feature_store
+import models
+import numpy as np
+import pandas as pd
+import pytest
+from datetime import date
+from fastapi.testclient import TestClient
+
+
+def test_computed_features_match_csv_columns():
+    df = pd.read_csv(data_loader.CSV_PATH, nrows=500)
+    computed = feature_store.compute_features(
+        df[['country', 'date', 'cases', 'deaths', 'recovered']])
+    shipped = feature_store.compute_features(df)
+    for column in feature_store.FEATURE_COLUMNS:
+        assert np.allclose(computed[column].astype(float),
+                           shipped[column].astype(float)), column
+
+
+def test_features_follow_data_writes(test_app):
+    override = list(test_app.dependency_overrides.values())[0]
+    db = next(override())
+    db.add(models.User(username="u", hashed_password="x"))
+    db.commit()
+    db.close()
+    client = TestClient(test_app)
+    headers = {"Authorization":
+               f"Bearer {auth.create_access_token({'sub': 'u'})}"}
+
+    created = client.post("/api/data", headers=headers, json={
+        "date": "2020-06-06", "country": "TestLand", "confirmed": 99,
+        "deaths": 9}).json()
+    db = next(override())
+    features = feature_store.load(db, ["TestLand"], date(2020, 7, 1))
+    assert features['cases_log'].tolist() == [np.log1p(99)]
+    assert features['taux_mortalite'].tolist() == [pytest.approx(900 / 99)]
+    db.close()
+
+    client.delete(f"/api/data/id/{created['id']}", headers=headers)
+    db = next(override())
+    assert len(feature_store.load(db, ["TestLand"], date(2020, 7, 1))) == 0
+    db.close()
+
+
+def test_missing_recovered_counts_as_zero():
+    df = pd.DataFrame({'country': ['TestLand'], 'date': ['2020-06-06'],
+                       'cases': [99], 'deaths': [9], 'recovered': [None]})
+    features = feature_store.compute_features(df)
+    assert features['active'].tolist() == [90]
+    assert features['recovery_rate'].tolist() == [0]
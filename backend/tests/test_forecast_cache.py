@@ -0,0 +1,93 @@
+import auth
+import feature_store
+import forecast_cache
+import models
+import pandas as pd
+import routes
+import schemas
+from datetime import date, timedelta
+from fastapi.testclient import TestClient
+
+
+def test_lru_eviction_and_ttl(monkeypatch):
+    cache = forecast_cache.ForecastCache(maxsize=2, ttl=10)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+
+    now = forecast_cache.time.time()
+    monkeypatch.setattr(forecast_cache.time, "time", lambda: now + 11)
+    assert cache.get("a") is None
+
+
+def test_disk_persistence_and_invalidation(tmp_path):
+    cache = forecast_cache.ForecastCache(directory=str(tmp_path))
+    cache.put(("France", 7), {"days": 7})
+    restarted = forecast_cache.ForecastCache(directory=str(tmp_path))
+    assert restarted.get(("France", 7)) == {"days": 7}
+
+    restarted.invalidate()
+    assert restarted.get(("France", 7)) is None
+    assert forecast_cache.ForecastCache(
+        directory=str(tmp_path)).generation == 1
+
+
+def test_predict_served_from_cache_until_data_changes(test_app, monkeypatch):
+    override = list(test_app.dependency_overrides.values())[0]
+    db = next(override())
+    db.add(models.User(username="u", hashed_password="x"))
+    for i in range(10):
+        db.add(models.Data(country="TestLand",
+                           date=date(2020, 6, 1) + timedelta(days=i),
+                           confirmed=100 + i, deaths=i))
+    feature_store.rebuild(db)
+    db.commit()
+    db.close()
+
+    calls = []
+
+    def fake_dispatch(model_name, df, days, uncertainty=False, path=None):
+        calls.append(days)
+        return pd.DataFrame({"yhat": [1.0] * days})
+    monkeypatch.setattr(routes, "predict_dispatch", fake_dispatch)
+    monkeypatch.setattr(forecast_cache, "cache",
+                        forecast_cache.ForecastCache())
+    client = TestClient(test_app)
+    headers = {"Authorization":
+               f"Bearer {auth.create_access_token({'sub': 'u'})}"}
+    payload = {"country": "TestLand", "days": 3,
+               "prediction_type": "taux_mortalite",
+               "reference_date": "2020-06-10"}
+
+    first = client.post("/api/predict", json=payload, headers=headers)
+    second = client.post("/api/predict", json=payload, headers=headers)
+    assert first.status_code == 200
+    assert first.json() == second.json()
+    assert len(calls) == 1
+
+    # Toute écriture sur les données invalide le cache.
+    client.delete("/api/data/id/1", headers=headers)
+    client.post("/api/predict", json=payload, headers=headers)
+    assert len(calls) == 2
+
+
+def test_fast_model_keys_ignore_prophet_version():
+    reference_date = date(2020, 7, 1)
+
+    class Version:
+        def __init__(self, version):
+            self.version = version
+
+    holt = schemas.PredictionIn(country="France", days=7, model="holt",
+                                prediction_type="taux_mortalite")
+    prophet = schemas.PredictionIn(country="France", days=7, model="prophet",
+                                   prediction_type="taux_mortalite")
+    # Nouvelle version de Prophet : seules ses propres prévisions changent
+    # de clé.
+    assert routes._prediction_key(holt, reference_date, Version("v1")) == \
+        routes._prediction_key(holt, reference_date, Version("v2"))
+    assert routes._prediction_key(prophet, reference_date, Version("v1")) != \
+        routes._prediction_key(prophet, reference_date, Version("v2"))
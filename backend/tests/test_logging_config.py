@@ -0,0 +1,47 @@
+import io
+import json
+import logging
+import logging_config
+import threading
+
+
+def _record(name, level=logging.INFO, msg="hello %s", args=("world",)):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+def test_sampling_filter_keeps_one_in_n_and_all_warnings():
+    sampler = logging_config.SamplingFilter({"routes": "0.25"})
+    kept = [sampler.filter(_record("routes")) for _ in range(8)]
+    assert kept.count(True) == 2
+    assert sampler.filter(_record("routes", level=logging.WARNING))
+    assert sampler.filter(_record("auth"))
+
+
+def test_json_formatter_includes_extra_fields():
+    record = _record("routes")
+    record.country = "France"
+    entry = json.loads(logging_config.JsonFormatter().format(record))
+    assert entry["message"] == "hello world"
+    assert entry["logger"] == "routes"
+    assert entry["country"] == "France"
+
+
+def test_setup_logging_switches_between_modes():
+    stream = io.StringIO()
+    try:
+        # Maître gunicorn : écriture directe, aucun thread avant le fork.
+        threads = threading.active_count()
+        assert logging_config.setup_logging(stream, background=False) is None
+        assert threading.active_count() <= threads
+        logging.getLogger("worker").warning("direct")
+        assert "direct" in stream.getvalue()
+        # Worker : listener démarré après le fork.
+        listener = logging_config.setup_logging(stream, background=True)
+        assert listener is not None and listener._thread.is_alive()
+        assert logging_config.setup_logging(stream) is listener
+        logging.getLogger("worker").warning("queued")
+        logging_config.shutdown_logging()
+        assert "queued" in stream.getvalue()
+    finally:
+        logging_config.shutdown_logging()
+        logging_config.setup_logging()
@@ -1,5 +1,7 @@
 import ml_model
+import numpy as np
 import pandas as pd
+import pytest
 from unittest.mock import patch, MagicMock
 
 
@@ -20,6 +22,24 @@ def test_predict_with_prophet_basic():
     fake_model.predict.return_value = fake_forecast
 
     with patch('ml_model.load_prophet', return_value=fake_model):
-        result = ml_model.predict_with_prophet(df, days=3)
+        result = ml_model.predict_with_prophet(df, days=3, uncertainty=True)
         assert len(result) == 3
         assert 'yhat' in result.columns
+
+
+def test_horizon_point_forecast_matches_full_prediction():
+    pytest.importorskip("prophet")
+    model = ml_model.load_prophet()
+    df = pd.DataFrame({
+        'ds': pd.date_range('2020-06-01', periods=30),
+        'cases': np.arange(1000, 31000, 1000),
+    })
+
+    fast = ml_model.predict_with_prophet(df.copy(), days=7)
+
+    # Ancienne méthode : historique complet + horizon, puis tail().
+    future = model.make_future_dataframe(periods=7)
+    future['cases_log'] = np.log1p(df['cases'].iloc[-1])
+    full = model.predict(future).tail(7)
+    np.testing.assert_allclose(fast['yhat'], full['yhat'])
+    assert list(fast['ds']) == list(full['ds'])
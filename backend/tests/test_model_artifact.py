@@ -0,0 +1,46 @@
+import ml_model
+import model_artifact
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def test_round_trip_is_memory_mapped_and_verified(tmp_path):
+    directory = str(tmp_path / "model")
+    model_artifact.save(directory, "test", {"alpha": 0.5},
+                        {"weights": np.arange(6.0).reshape(2, 3)})
+    loaded = model_artifact.load(directory, kind="test")
+    assert loaded.params == {"alpha": 0.5}
+    assert isinstance(loaded.arrays["weights"], np.memmap)
+    assert not loaded.arrays["weights"].flags.writeable
+    assert loaded.arrays["weights"][1, 2] == 5.0
+
+    with pytest.raises(model_artifact.ArtifactError):
+        model_artifact.load(directory, kind="prophet")
+    with open(tmp_path / "model" / "weights.npy", "r+b") as f:
+        f.seek(-1, 2)
+        f.write(b"\x01")
+    with pytest.raises(model_artifact.ArtifactError):
+        model_artifact.load(directory)
+
+
+def test_pickle_models_are_refused(tmp_path, monkeypatch):
+    legacy = tmp_path / "model.pkl"
+    legacy.write_bytes(b"not loaded")
+    monkeypatch.setattr(ml_model, "ALLOW_PICKLE_MODELS", False)
+    with pytest.raises(model_artifact.ArtifactError):
+        ml_model.load_prophet(str(legacy))
+
+
+def test_numpy_evaluator_matches_prophet():
+    pytest.importorskip("prophet")
+    model = ml_model.load_prophet()
+    assert isinstance(model, model_artifact.ProphetArtifact)
+    future = model.make_future_dataframe(periods=10)
+    future['cases_log'] = np.linspace(2.0, 5.0, 10)
+    prophet = model.prophet()
+    expected = ml_model._predict_point(prophet, future)
+    assert list(future['ds']) == list(pd.date_range(
+        prophet.history['ds'].max() + pd.Timedelta(days=1), periods=10))
+    np.testing.assert_allclose(model.predict_point(future)['yhat'],
+                               expected['yhat'])
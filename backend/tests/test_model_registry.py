@@ -0,0 +1,55 @@
+import auth
+import os
+import ml_model
+import model_registry
+import models
+import pytest
+from fastapi.testclient import TestClient
+
+
+def test_register_activate_and_rollback(tmp_path):
+    pytest.importorskip("prophet")
+    registry = model_registry.ModelRegistry(str(tmp_path))
+    builtin = registry.active()
+    v2 = registry.register(ml_model.PROPHET_PATH, "v2", {"note": "test"})
+    assert v2.metadata["sha256"] and v2.metadata["note"] == "test"
+    assert registry.latest().version == "v2"
+
+    registry.activate("v2", background=False)
+    assert registry.active().version == "v2"
+    # La version active survit à un redémarrage.
+    assert model_registry.ModelRegistry(
+        str(tmp_path)).active().version == "v2"
+
+    assert registry.rollback().version == builtin.version
+    assert registry.status()["previous"] == "v2"
+
+
+def test_corrupted_artifact_keeps_active_version(tmp_path):
+    registry = model_registry.ModelRegistry(str(tmp_path))
+    corrupted = registry.register(ml_model.PROPHET_PATH, "corrupted")
+    with open(os.path.join(corrupted.path, "delta.npy"), "ab") as f:
+        f.write(b"tampered")
+    active = registry.active().version
+
+    registry.activate("corrupted", background=False)
+    assert registry.active().version == active
+    assert registry.status()["last_error"].startswith("corrupted")
+    with pytest.raises(KeyError):
+        registry.activate("missing")
+
+
+def test_reload_requires_admin(test_app):
+    override = list(test_app.dependency_overrides.values())[0]
+    db = next(override())
+    db.add(models.User(username="u", hashed_password="x"))
+    db.commit()
+    db.close()
+    client = TestClient(test_app)
+    headers = {"Authorization":
+               f"Bearer {auth.create_access_token({'sub': 'u'})}"}
+    assert client.post("/api/reload", headers=headers).status_code == 403
+    assert client.post("/api/models/rollback",
+                       headers=headers).status_code == 403
+    listing = client.get("/api/models", headers=headers).json()
+    assert listing["active"] in [v["version"] for v in listing["versions"]]
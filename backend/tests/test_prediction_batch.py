@@ -0,0 +1,62 @@
+import json
+import auth
+import feature_store
+import forecast_cache
+import models
+import numpy as np
+import pandas as pd
+import query_stats
+import routes
+from datetime import date, timedelta
+from fastapi.testclient import TestClient
+
+
+def test_batch_prediction_streams_one_line_per_country(test_app, monkeypatch):
+    override = list(test_app.dependency_overrides.values())[0]
+    db = next(override())
+    db.add(models.User(username="u", hashed_password="x"))
+    for country in ("A-Land", "B-Land"):
+        for i in range(10):
+            db.add(models.Data(country=country,
+                               date=date(2020, 6, 1) + timedelta(days=i),
+                               confirmed=100 + i, deaths=i))
+    feature_store.rebuild(db)
+    db.commit()
+    db.close()
+
+    calls = []
+
+    def fake_dispatch(model_name, df, days, uncertainty=False, path=None):
+        calls.append(round(np.expm1(df['cases_log'].iloc[-1])))
+        return pd.DataFrame({"yhat": [1.0] * days})
+    monkeypatch.setattr(routes, "predict_dispatch", fake_dispatch)
+    monkeypatch.setattr(forecast_cache, "cache",
+                        forecast_cache.ForecastCache())
+    client = TestClient(test_app)
+    headers = {"Authorization":
+               f"Bearer {auth.create_access_token({'sub': 'u'})}"}
+    payload = {"countries": ["A-Land", "B-Land", "Nowhere"], "days": 3,
+               "prediction_type": "taux_mortalite",
+               "reference_date": "2020-06-05"}
+
+    # Une requête pour l'utilisateur, une pour tous les historiques.
+    with query_stats.assert_max_queries(2):
+        response = client.post("/api/predict/batch", json=payload,
+                               headers=headers)
+    assert response.status_code == 200
+    lines = {line["country"]: line for line in map(
+        json.loads, response.text.splitlines())}
+    assert lines["Nowhere"]["status"] == "failed"
+    assert lines["Nowhere"]["error_status"] == 404
+    # Historique coupé à la date de référence (5e jour : 104 cas).
+    assert calls == [104, 104]
+
+    single = client.post("/api/predict", json=dict(
+        payload, countries=None, country="A-Land"), headers=headers)
+    assert lines["A-Land"]["result"] == single.json()
+    assert len(calls) == 2  # servi depuis le cache rempli par le lot
+
+    response = client.post("/api/predict/batch", headers=headers,
+                           json=dict(payload, countries="all"))
+    assert {json.loads(line)["country"]
+            for line in response.text.splitlines()} == {"A-Land", "B-Land"}
@@ -0,0 +1,147 @@
+import auth
+import feature_store
+import forecast_cache
+import models
+import prediction_history
+import pytest
+import rate_limit
+import time
+from datetime import date, datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+
+def _entry(i, user_id=1):
+    return dict(user_id=user_id, created_at=datetime(2024, 1, 1, 0, 0, i),
+                country="A", prediction_type="taux_mortalite", model="holt",
+                days=1, reference_date=date(2020, 7, 1), uncertainty=False,
+                model_version="holt", predictions=[{"day": 1}],
+                latency_ms=1.0, cached=False)
+
+
+def test_writer_flushes_in_batches(test_app):
+    override = list(test_app.dependency_overrides.values())[0]
+    db = next(override())
+    factory = sessionmaker(bind=db.get_bind())
+    writer = prediction_history.HistoryWriter(factory, batch=10, interval=60,
+                                              max_pending=4)
+    for i in range(5):
+        writer.record(_entry(i))
+    assert writer.stats()["pending"] == 4 and writer.dropped == 1
+    assert db.query(models.PredictionHistory).count() == 0
+
+    writer.batch = 2
+    assert writer.flush() == 4
+    assert writer.flushes == 2
+    assert db.query(models.PredictionHistory).count() == 4
+
+    # Base indisponible : le lot reste en attente pour le cycle suivant.
+    def broken():
+        raise RuntimeError("database down")
+    writer.session_factory = broken
+    writer.record(_entry(10))
+    assert writer.flush() == 0 and writer.failures == 1
+    writer.session_factory = factory
+    writer.shutdown()
+    assert writer.stats()["pending"] == 0
+    assert db.query(models.PredictionHistory).count() == 5
+    db.close()
+
+
+def _setup(test_app, monkeypatch):
+    override = list(test_app.dependency_overrides.values())[0]
+    db = next(override())
+    db.add(models.User(username="u", hashed_password="x"))
+    db.add(models.User(username="other", hashed_password="x"))
+    for i in range(20):
+        db.add(models.Data(country="TestLand",
+                           date=date(2020, 6, 1) + timedelta(days=i),
+                           confirmed=1000, deaths=10 + i, recovered=i))
+    feature_store.rebuild(db)
+    db.commit()
+    writer = prediction_history.HistoryWriter(
+        sessionmaker(bind=db.get_bind()), interval=60)
+    db.close()
+    monkeypatch.setattr(prediction_history, "writer", writer)
+    monkeypatch.setattr(prediction_history, "PREDICTION_HISTORY_ENABLED",
+                        True)
+    monkeypatch.setattr(forecast_cache, "cache",
+                        forecast_cache.ForecastCache())
+    monkeypatch.setattr(rate_limit, "backend", rate_limit.MemoryBackend())
+    return TestClient(test_app), writer
+
+
+def _headers(user):
+    return {"Authorization":
+            f"Bearer {auth.create_access_token({'sub': user})}"}
+
+
+def test_predictions_recorded_and_paginated(test_app, monkeypatch):
+    client, writer = _setup(test_app, monkeypatch)
+    payload = {"country": "TestLand", "days": 2,
+               "prediction_type": "taux_mortalite",
+               "model": "holt", "reference_date": "2020-06-20"}
+    for days in (2, 2, 3):
+        assert client.post("/api/predict", json=dict(payload, days=days),
+                           headers=_headers("u")).status_code == 200
+
+    history = client.get("/api/predictions/history",
+                         headers=_headers("u")).json()
+    assert [h["days"] for h in history] == [3, 2, 2]
+    assert [h["cached"] for h in history] == [False, True, False]
+    assert history[0]["model_version"] == "holt"
+    assert history[0]["reference_date"] == "2020-06-20"
+    assert history[0]["predictions"][2]["predicted_value"] == \
+        pytest.approx(3.2)
+    assert history[0]["latency_ms"] >= 0
+    page = client.get("/api/predictions/history?skip=1&limit=1",
+                      headers=_headers("u")).json()
+    assert [h["id"] for h in page] == [history[1]["id"]]
+    assert client.get("/api/predictions/history?country=Nowhere",
+                      headers=_headers("u")).json() == []
+    assert client.get("/api/predictions/history",
+                      headers=_headers("other")).json() == []
+    writer.shutdown()
+
+
+def test_jobs_batch_and_multi_recorded(test_app, monkeypatch):
+    client, writer = _setup(test_app, monkeypatch)
+    payload = {"country": "TestLand", "days": 2,
+               "prediction_type": "taux_mortalite",
+               "model": "holt", "reference_date": "2020-06-20"}
+
+    job = client.post("/api/predict/jobs", json=payload,
+                      headers=_headers("u")).json()
+    for _ in range(100):
+        job = client.get(f"/api/predict/jobs/{job['job_id']}",
+                         headers=_headers("u")).json()
+        if job["status"] in ("done", "failed"):
+            break
+        time.sleep(0.02)
+    assert job["status"] == "done"
+    history = client.get("/api/predictions/history",
+                         headers=_headers("u")).json()
+    assert len(history) == 1
+    assert history[0]["predictions"] == job["result"]["predictions"]
+    assert history[0]["model_version"] == "holt"
+    assert not history[0]["cached"] and history[0]["latency_ms"] >= 0
+
+    batch = dict(payload, countries=["TestLand", "Nowhere"], days=3)
+    del batch["country"]
+    assert client.post("/api/predict/batch", json=batch,
+                       headers=_headers("u")).status_code == 200
+    multi = {"country": "TestLand", "days": 2, "model": "holt",
+             "targets": ["deaths", "recovered"],
+             "reference_date": "2020-06-20"}
+    body = client.post("/api/predict/multi", json=multi,
+                       headers=_headers("u")).json()
+    history = client.get("/api/predictions/history",
+                         headers=_headers("u")).json()
+    # Lot : seuls les pays prévus ; multi : une ligne par série.
+    assert sorted((h["prediction_type"], h["days"]) for h in history) == [
+        ("deaths", 2), ("recovered", 2), ("taux_mortalite", 2),
+        ("taux_mortalite", 3)]
+    assert [h["predictions"] for h in history
+            if h["prediction_type"] == "recovered"] == [
+                body["predictions"]["recovered"]]
+    writer.shutdown()
@@ -0,0 +1,105 @@
+import threading
+import time
+import auth
+import feature_store
+import forecast_cache
+import models
+import pandas as pd
+import prediction_jobs
+import routes
+from datetime import date, timedelta
+from fastapi.testclient import TestClient
+
+
+def _wait(client, url, headers):
+    for _ in range(100):
+        body = client.get(url, headers=headers).json()
+        if body["status"] in ("done", "failed"):
+            return body
+        time.sleep(0.02)
+    raise AssertionError(f"job not finished: {body}")
+
+
+def test_job_store_runs_and_expires(monkeypatch):
+    store = prediction_jobs.JobStore(workers=1, retention=60)
+    release = threading.Event()
+    job = store.submit(1, lambda: release.wait() and {"days": 1})
+    assert store.get(job.id).status in ("pending", "running")
+    release.set()
+    for _ in range(100):
+        if job.status == "done":
+            break
+        time.sleep(0.01)
+    assert job.to_dict()["result"] == {"days": 1}
+
+    now = time.time() + 61
+    monkeypatch.setattr(prediction_jobs.time, "time", lambda: now)
+    assert store.get(job.id) is None
+    assert store.stats()["expired"] == 1
+    store.shutdown()
+
+
+def test_job_shared_between_workers(tmp_path):
+    # Deux workers partageant PREDICTION_JOB_DIR.
+    submitter = prediction_jobs.JobStore(workers=1, directory=str(tmp_path))
+    other = prediction_jobs.JobStore(workers=1, directory=str(tmp_path))
+    release = threading.Event()
+    job = submitter.submit(7, lambda: release.wait() and {"days": 1})
+    assert other.get(job.id).status in ("pending", "running")
+    release.set()
+    for _ in range(100):
+        shared = other.get(job.id)
+        if shared.status == "done":
+            break
+        time.sleep(0.01)
+    assert shared.owner_id == 7
+    assert shared.to_dict() == job.to_dict()
+    assert other.get("../" + job.id) is None
+    assert other.get("unknown") is None
+    submitter.shutdown()
+    other.shutdown()
+
+
+def test_prediction_job_api(test_app, monkeypatch):
+    override = list(test_app.dependency_overrides.values())[0]
+    db = next(override())
+    db.add(models.User(username="u", hashed_password="x"))
+    db.add(models.User(username="other", hashed_password="x"))
+    for i in range(10):
+        db.add(models.Data(country="TestLand",
+                           date=date(2020, 6, 1) + timedelta(days=i),
+                           confirmed=100 + i, deaths=i))
+    feature_store.rebuild(db)
+    db.commit()
+    db.close()
+
+    def fake_dispatch(model_name, df, days, uncertainty=False, path=None):
+        return pd.DataFrame({"yhat": [1.0] * days})
+    monkeypatch.setattr(routes, "predict_dispatch", fake_dispatch)
+    monkeypatch.setattr(forecast_cache, "cache",
+                        forecast_cache.ForecastCache())
+    client = TestClient(test_app)
+    headers = {"Authorization":
+               f"Bearer {auth.create_access_token({'sub': 'u'})}"}
+    payload = {"country": "TestLand", "days": 3,
+               "prediction_type": "taux_mortalite",
+               "reference_date": "2020-06-10"}
+
+    response = client.post("/api/predict/jobs", json=payload,
+                           headers=headers)
+    assert response.status_code == 202
+    url = f"/api/predict/jobs/{response.json()['job_id']}"
+    body = _wait(client, url, headers)
+    assert body["status"] == "done"
+    assert body["result"] == client.post("/api/predict", json=payload,
+                                         headers=headers).json()
+
+    # Une tâche n'est visible que de son auteur.
+    other = {"Authorization":
+             f"Bearer {auth.create_access_token({'sub': 'other'})}"}
+    assert client.get(url, headers=other).status_code == 404
+
+    # Les erreurs de validation sont signalées dès la soumission.
+    missing = dict(payload, country="Nowhere")
+    assert client.post("/api/predict/jobs", json=missing,
+                       headers=headers).status_code == 404
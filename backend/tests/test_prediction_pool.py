@@ -0,0 +1,34 @@
+import operator
+import time
+import pytest
+import prediction_pool
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = prediction_pool.PredictionPool(1, start_method="spawn")
+    yield pool
+    pool.shutdown()
+
+
+def test_runs_job_in_worker(pool):
+    assert pool.run(operator.add, 2, 3, timeout=30) == 5
+
+
+def test_timeout_kills_and_replaces_worker(pool):
+    with pytest.raises(prediction_pool.PredictionTimeout):
+        pool.run(time.sleep, 30, timeout=0.5)
+    # Le worker bloqué a été remplacé : le pool reste utilisable.
+    assert pool.run(operator.mul, 4, 5, timeout=30) == 20
+    assert pool.stats()["restarts"] == 1
+
+
+def test_cancellation(pool):
+    with pytest.raises(prediction_pool.PredictionCancelled):
+        pool.run(time.sleep, 30, timeout=30, is_cancelled=lambda: True)
+    assert pool.stats()["cancelled"] == 1
+
+
+def test_worker_errors_propagate(pool):
+    with pytest.raises(ZeroDivisionError):
+        pool.run(operator.truediv, 1, 0, timeout=30)
@@ -0,0 +1,40 @@
+import os
+import auth
+import models
+import profiling
+from fastapi.testclient import TestClient
+
+
+def _client_for(test_app, username, is_admin):
+    override = list(test_app.dependency_overrides.values())[0]
+    db = next(override())
+    db.add(models.User(username=username, hashed_password="x",
+                       is_admin=is_admin))
+    db.commit()
+    db.close()
+    token = auth.create_access_token({"sub": username})
+    return TestClient(test_app), {"Authorization": f"Bearer {token}"}
+
+
+def test_admin_profile_is_written(test_app, tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    client, headers = _client_for(test_app, "admin", True)
+
+    response = client.get("/api/me", headers={**headers, "X-Profile": "1"})
+    assert response.status_code == 200
+    name = response.headers["x-profile-file"]
+    assert os.path.exists(os.path.join(tmp_path, name))
+
+    download = client.get(f"/api/profiles/{name}", headers=headers)
+    assert download.status_code == 200
+
+
+def test_profile_denied_for_non_admin(test_app, tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    client, headers = _client_for(test_app, "user", False)
+
+    response = client.get("/api/me?profile=1", headers=headers)
+    assert response.headers["x-profile"] == "denied"
+    assert "x-profile-file" not in client.get(
+        "/api/me", headers=headers).headers
+    assert os.listdir(tmp_path) == []
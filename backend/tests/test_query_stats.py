@@ -0,0 +1,59 @@
+import models
+import pytest
+import query_stats
+import time
+from fastapi.testclient import TestClient
+from datetime import date
+from sqlalchemy import text
+
+
+def _seed(test_app):
+    override = list(test_app.dependency_overrides.values())[0]
+    db = next(override())
+    db.add(models.Data(country="TestLand", date=date(2020, 1, 1), confirmed=1))
+    db.commit()
+    db.close()
+
+
+def test_countries_stays_within_query_budget(test_app):
+    _seed(test_app)
+    client = TestClient(test_app)
+    with query_stats.assert_max_queries(1):
+        response = client.get("/api/countries")
+    assert response.status_code == 200
+
+
+def test_query_budget_exceeded_fails(test_app):
+    _seed(test_app)
+    client = TestClient(test_app)
+    with pytest.raises(AssertionError, match="/api/countries"):
+        with query_stats.assert_max_queries(0):
+            client.get("/api/countries")
+
+
+def test_debug_headers(test_app, monkeypatch):
+    monkeypatch.setattr(query_stats, "DEBUG", True)
+    response = TestClient(test_app).get("/api/countries")
+    assert response.headers["x-db-query-count"] == "1"
+    assert float(response.headers["x-db-time-ms"]) >= 0
+
+
+def test_failed_statement_does_not_skew_timings(test_app):
+    override = list(test_app.dependency_overrides.values())[0]
+    db = next(override())
+    with pytest.raises(Exception):
+        db.execute(text("SELECT * FROM missing_table"))
+    db.rollback()
+    # Aucun état laissé sur la connexion du pool par la requête en erreur.
+    assert not db.connection().info.get("query_start")
+    stats = query_stats.QueryStats()
+    token = query_stats._current.set(stats)
+    try:
+        started = time.perf_counter()
+        db.execute(text("SELECT 1"))
+        elapsed = time.perf_counter() - started
+    finally:
+        query_stats._current.reset(token)
+        db.close()
+    # Mesurée depuis son propre début, pas depuis la requête en erreur.
+    assert stats.count == 1 and stats.total_time <= elapsed
@@ -0,0 +1,26 @@
+import rate_limit
+from fastapi.testclient import TestClient
+
+
+def test_memory_bucket_refills():
+    backend = rate_limit.MemoryBackend()
+    assert backend.take("k", 2, 1.0, now=0)[0]
+    assert backend.take("k", 2, 1.0, now=0)[0]
+    assert not backend.take("k", 2, 1.0, now=0)[0]
+    allowed, remaining = backend.take("k", 2, 1.0, now=1.5)
+    assert allowed and remaining == 0.5
+
+
+def test_read_limit_per_ip(test_app, monkeypatch):
+    monkeypatch.setattr(rate_limit, "backend", rate_limit.MemoryBackend())
+    monkeypatch.setitem(rate_limit.LIMITS, "read", (2, 60))
+    client = TestClient(test_app)
+
+    first = client.get("/api/countries")
+    assert first.status_code == 200
+    assert first.headers["x-ratelimit-limit"] == "2"
+    assert first.headers["x-ratelimit-remaining"] == "1"
+    client.get("/api/countries")
+    limited = client.get("/api/countries")
+    assert limited.status_code == 429
+    assert int(limited.headers["retry-after"]) >= 1
@@ -1,6 +1,11 @@
+import auth
+import feature_store
+import forecast_cache
 import models
+import pandas as pd
+import routes
 from fastapi.testclient import TestClient
-from datetime import date
+from datetime import date, timedelta
 
 
 def test_get_countries(test_app):
@@ -15,3 +20,56 @@ def test_get_countries(test_app):
     response = client.get("/api/countries")
     assert response.status_code == 200
     assert "TestLand" in response.json()
+
+
+def test_predict_history_filtered_in_sql(test_app, monkeypatch):
+    override = list(test_app.dependency_overrides.values())[0]
+    db = next(override())
+    db.add(models.User(username="u", hashed_password="x"))
+    for i in range(20):
+        db.add(models.Data(country="TestLand",
+                           date=date(2020, 6, 1) + timedelta(days=i),
+                           confirmed=100 + i, deaths=i))
+    feature_store.rebuild(db)
+    db.commit()
+    db.close()
+
+    seen = []
+
+    def fake_dispatch(model_name, df, days, uncertainty=False, path=None):
+        seen.append(df)
+        return pd.DataFrame({"yhat": [0.5, 1.5], "yhat_lower": [0, 1],
+                             "yhat_upper": [1, 2]})
+    monkeypatch.setattr(routes, "predict_dispatch", fake_dispatch)
+    monkeypatch.setattr(forecast_cache, "cache",
+                        forecast_cache.ForecastCache())
+    client = TestClient(test_app)
+    headers = {"Authorization":
+               f"Bearer {auth.create_access_token({'sub': 'u'})}"}
+    payload = {"country": "TestLand", "days": 2,
+               "prediction_type": "taux_mortalite",
+               "reference_date": "2020-06-10", "uncertainty": True}
+
+    response = client.post("/api/predict", json=payload, headers=headers)
+    assert response.status_code == 200
+    assert seen[0]['ds'].max() == pd.Timestamp(2020, 6, 10)
+    assert len(seen[0]) == 10
+    assert response.json()["predictions"] == [
+        {"day": 1, "predicted_value": 0.5, "date": "2020-06-11",
+         "lower": 0.0, "upper": 1.0},
+        {"day": 2, "predicted_value": 1.5, "date": "2020-06-12",
+         "lower": 1.0, "upper": 2.0}]
+
+    assert response.json()["prediction_type"] == "taux_mortalite"
+    # Séries de comptage : prévues par /api/predict/multi uniquement.
+    for prediction_type in ("cases", "deaths", "recovered"):
+        counts = dict(payload, prediction_type=prediction_type)
+        assert client.post("/api/predict", json=counts,
+                           headers=headers).status_code == 422
+
+    before = dict(payload, reference_date="2020-05-01")
+    assert client.post("/api/predict", json=before,
+                       headers=headers).status_code == 422
+    unknown = dict(payload, country="Nowhere")
+    assert client.post("/api/predict", json=unknown,
+                       headers=headers).status_code == 404
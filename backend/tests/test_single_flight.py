@@ -0,0 +1,53 @@
+import threading
+import time
+import pytest
+import single_flight
+
+
+def test_concurrent_calls_share_one_computation():
+    flight = single_flight.SingleFlight()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return "forecast"
+
+    results = []
+    threads = [threading.Thread(
+        target=lambda: results.append(flight.do("France", compute)))
+        for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["forecast"] * 5
+    assert len(calls) == 1
+    assert flight.stats()["coalesced"] == 4
+
+
+def test_errors_propagate_to_waiters():
+    flight = single_flight.SingleFlight()
+    started = threading.Event()
+    errors = []
+
+    def failing():
+        started.set()
+        time.sleep(0.05)
+        raise ValueError("boom")
+
+    def waiter():
+        started.wait()
+        try:
+            flight.do("k", lambda: "unused")
+        except ValueError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    with pytest.raises(ValueError):
+        flight.do("k", failing)
+    thread.join()
+    assert len(errors) == 1
+    assert flight.stats()["in_flight"] == 0
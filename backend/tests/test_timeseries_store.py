@@ -0,0 +1,128 @@
+import auth
+import feature_store
+import models
+import pandas as pd
+import rate_limit
+import timeseries_store
+from datetime import date, timedelta
+from fastapi.testclient import TestClient
+
+
+def _add_data(db):
+    db.add(models.User(username="u", hashed_password="x"))
+    for i in range(10):
+        for country in ("B-Land", "A-Land"):
+            db.add(models.Data(country=country,
+                               date=date(2020, 3, 1) + timedelta(days=i),
+                               confirmed=100 * (i + 1), deaths=i,
+                               recovered=2 * i, new_cases=100,
+                               new_deaths=1, new_recovered=2))
+    feature_store.rebuild(db)
+    db.commit()
+
+
+def _setup(test_app, monkeypatch, store):
+    override = list(test_app.dependency_overrides.values())[0]
+    db = next(override())
+    _add_data(db)
+    monkeypatch.setattr(timeseries_store, "store", store)
+    monkeypatch.setattr(timeseries_store, "TIMESERIES_STORE_ENABLED", True)
+    monkeypatch.setattr(rate_limit, "backend", rate_limit.MemoryBackend())
+    return db
+
+
+def test_reads_match_database(test_app, monkeypatch):
+    store = timeseries_store.TimeSeriesStore()
+    db = _setup(test_app, monkeypatch, store)
+    client = TestClient(test_app)
+    queries = ["/api/data", "/api/data?country=A-Land",
+               "/api/data?country=B-Land&skip=3&limit=4",
+               "/api/data?skip=15&limit=3", "/api/data?country=Nowhere",
+               "/api/countries"]
+    served = [client.get(query) for query in queries]
+    version = store.snapshot.version
+    assert all(r.headers[timeseries_store.VERSION_HEADER] == version
+               for r in served)
+    monkeypatch.setattr(timeseries_store, "TIMESERIES_STORE_ENABLED", False)
+    for query, response in zip(queries, served):
+        assert response.json() == client.get(query).json()
+
+    # Historique des prédictions : identique au store de features.
+    for countries, reference_date in ((["B-Land", "A-Land"], date(2020, 3, 5)),
+                                      (["A-Land", "Nowhere"], date(2021, 1, 1))):
+        pd.testing.assert_frame_equal(
+            store.snapshot.history(countries, reference_date),
+            feature_store.load(db, countries, reference_date),
+            check_index_type=False)
+    assert len(store.snapshot.history(["Nowhere"], date(2020, 3, 5))) == 0
+    db.close()
+
+
+def test_incremental_refresh_on_writes(test_app, monkeypatch):
+    store = timeseries_store.TimeSeriesStore()
+    db = _setup(test_app, monkeypatch, store)
+    client = TestClient(test_app)
+    headers = {"Authorization":
+               f"Bearer {auth.create_access_token({'sub': 'u'})}"}
+    first = client.get("/api/data?country=C-Land")
+    assert first.json() == []
+
+    added = client.post("/api/data", headers=headers, json={
+        "country": "C-Land", "date": "2020-03-01", "confirmed": 5})
+    assert added.status_code == 200
+    served = client.get("/api/data?country=C-Land")
+    assert served.json() == [added.json()]
+    assert served.headers[timeseries_store.VERSION_HEADER] != \
+        first.headers[timeseries_store.VERSION_HEADER]
+    assert client.get("/api/countries").json() == ["A-Land", "B-Land",
+                                                   "C-Land"]
+    assert store.snapshot.history(["C-Land"], date(2020, 3, 1))[
+        "taux_mortalite"].tolist() == [0.0]
+
+    row_id = added.json()["id"]
+    client.put(f"/api/data/id/{row_id}", headers=headers,
+               json={"deaths": 1})
+    assert client.get("/api/data?country=C-Land").json()[0]["deaths"] == 1
+    client.delete(f"/api/data/id/{row_id}", headers=headers)
+    assert client.get("/api/countries").json() == ["A-Land", "B-Land"]
+    assert (store.loads, store.refreshes) == (1, 3)
+    # Même contenu que la base : même version qu'un rechargement complet.
+    assert store.snapshot.version == \
+        first.headers[timeseries_store.VERSION_HEADER]
+    assert store.snapshot.version == timeseries_store.read(db).version
+    db.close()
+
+
+def test_snapshot_file(test_app, monkeypatch, tmp_path):
+    path = str(tmp_path / "timeseries.npz")
+    db = _setup(test_app, monkeypatch, timeseries_store.TimeSeriesStore())
+    loaded = timeseries_store.TimeSeriesStore(path)
+    assert loaded.load(db).version and loaded.source == "db"
+
+    restarted = timeseries_store.TimeSeriesStore(path)
+    assert restarted.load(db).version == loaded.snapshot.version
+    assert restarted.source == "snapshot"
+    assert restarted.snapshot.rows("A-Land") == loaded.snapshot.rows("A-Land")
+
+    # Base modifiée hors de l'API : snapshot ignoré.
+    db.add(models.Data(country="A-Land", date=date(2020, 4, 1),
+                       confirmed=1))
+    db.commit()
+    stale = timeseries_store.TimeSeriesStore(path)
+    stale.load(db)
+    assert stale.source == "db"
+    assert len(stale.snapshot) == len(loaded.snapshot) + 1
+    db.close()
+
+
+def test_store_reads_keep_rate_limit_headers(test_app, monkeypatch):
+    db = _setup(test_app, monkeypatch, timeseries_store.TimeSeriesStore())
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_ENABLED", True)
+    client = TestClient(test_app)
+    for query in ("/api/data?country=A-Land", "/api/countries"):
+        response = client.get(query)
+        assert response.status_code == 200
+        assert timeseries_store.VERSION_HEADER in response.headers
+        assert "X-RateLimit-Remaining" in response.headers
+    assert client.get("/api/countries").json() == ["A-Land", "B-Land"]
+    db.close()
@@ -0,0 +1,46 @@
+import feature_store
+import model_registry
+import models
+import pytest
+import training
+from datetime import date, timedelta
+
+
+def _add_country(db, country, days, deaths_factor=1):
+    for i in range(days):
+        db.add(models.Data(country=country,
+                           date=date(2020, 3, 1) + timedelta(days=i),
+                           confirmed=100 + 10 * i, deaths=deaths_factor * i,
+                           recovered=0))
+
+
+def test_incremental_per_country_training(test_app, tmp_path, monkeypatch):
+    pytest.importorskip("prophet")
+    override = list(test_app.dependency_overrides.values())[0]
+    db = next(override())
+    _add_country(db, "A-Land", 40)
+    _add_country(db, "B-Land", 40)
+    _add_country(db, "Tiny", 5)
+    feature_store.rebuild(db)
+    db.commit()
+    registry = model_registry.ModelRegistry(str(tmp_path))
+
+    first = training.train(db, registry, workers=2)
+    assert first.metadata["trained"] == ["A-Land", "B-Land"]
+    assert first.metadata["skipped"] == ["Tiny"]
+    assert first.artifact("A-Land") != first.path
+    assert first.artifact("Tiny") == first.path  # modèle global
+
+    # Seul le pays dont les données ont changé est ré-entraîné.
+    db.query(models.Data).filter(models.Data.country == "B-Land").delete()
+    _add_country(db, "B-Land", 40, deaths_factor=2)
+    feature_store.refresh(db, ["B-Land"])
+    db.commit()
+    second = training.train(db, registry, workers=2)
+    assert second.metadata["trained"] == ["B-Land"]
+    assert second.metadata["reused"] == 1
+    assert second.metadata["base_version"] == first.version
+
+    registry.activate(second.version, background=False)
+    assert registry.active().version == second.version
+    db.close()
@@ -0,0 +1,90 @@
+import worker_sync
+
+
+def test_changes_applied_by_other_workers(tmp_path, monkeypatch):
+    directory = str(tmp_path)
+    publisher = worker_sync.WorkerSync(directory)
+    follower = worker_sync.WorkerSync(directory)
+    received = []
+    follower.subscribe("data", lambda countries: received.append(countries))
+    follower.mark()
+
+    # Changement publié par un autre processus (pid différent).
+    monkeypatch.setattr(worker_sync.os, "getpid", lambda: 1)
+    publisher.publish("data", countries=["France"])
+    publisher.publish("model", version="v2")
+    monkeypatch.undo()
+    assert follower.poll() == 1
+    assert received == [["France"]]
+    assert follower.poll() == 0
+
+    # Ligne en cours d'écriture : appliquée une fois complète.
+    path = tmp_path / worker_sync.LOG_NAME
+    with open(path, "a") as f:
+        f.write('{"pid": 1, "kind": "data", "countries": null}')
+    assert follower.poll() == 0
+    with open(path, "a") as f:
+        f.write("\n")
+    assert follower.poll() == 1
+    assert received[-1] is None
+
+    # Ses propres changements sont ignorés.
+    follower.publish("data", countries=["US"])
+    assert follower.poll() == 0
+    assert follower.stats()["published"] == 1
+
+
+def test_single_leader(tmp_path):
+    first = worker_sync.WorkerSync(str(tmp_path))
+    second = worker_sync.WorkerSync(str(tmp_path))
+    elected = []
+    second.on_leader(lambda: elected.append("second"))
+    first._elect()
+    second._elect()
+    assert first.is_leader() and not second.is_leader()
+
+    # Le leader s'arrête (verrou libéré) : un autre worker le remplace.
+    first._leader_file.close()
+    second.poll()
+    assert second.is_leader() and elected == ["second"]
+    # Sans dossier partagé : processus unique, toujours leader.
+    assert worker_sync.WorkerSync().is_leader()
+
+
+def test_journal_compacted_and_replay_capped(tmp_path, monkeypatch):
+    directory = str(tmp_path)
+    leader = worker_sync.WorkerSync(directory, max_bytes=200)
+    follower = worker_sync.WorkerSync(directory, max_bytes=200,
+                                      max_replay=300)
+    received, resyncs = [], []
+    for sync in (leader, follower):
+        sync.subscribe("data", lambda countries: received.append(countries))
+        sync.on_resync(lambda: resyncs.append(True))
+        sync.mark()
+    leader._elect()
+    assert leader.is_leader()
+
+    def publish_from_other_worker(count):
+        monkeypatch.setattr(worker_sync.os, "getpid", lambda: 1)
+        for i in range(count):
+            leader.publish("data", countries=[f"C{i}"])
+        monkeypatch.undo()
+
+    # Journal au-delà de max_bytes : remplacé par le leader après lecture.
+    publish_from_other_worker(6)
+    assert leader.poll() == 6
+    assert leader.stats()["compactions"] == 1
+    assert (tmp_path / worker_sync.LOG_NAME).stat().st_size == 0
+    # Le follower constate le remplacement : rechargement, pas de rejeu.
+    assert follower.poll() == 0
+    assert follower.stats()["resyncs"] == 1
+    assert leader.poll() == 0 and len(resyncs) == 2
+    publish_from_other_worker(1)
+    assert follower.poll() == 1 and received[-1] == ["C0"]
+
+    # Retard au-delà de max_replay (worker redémarré) : rechargement.
+    publish_from_other_worker(12)
+    assert follower.poll() == 0
+    assert follower.stats()["resyncs"] == 2
+    assert follower.poll() == 0
+    assert len(received) == 7
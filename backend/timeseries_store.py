@@ -0,0 +1,378 @@
+# backend/timeseries_store.py
+
+# Séries temporelles en mémoire pour les lectures : le dataset est petit,
+# lu bien plus souvent qu'écrit, et ne change qu'à l'import ou via le
+# CRUD. Chaque colonne (date, confirmed, deaths, recovered, new_*, id et
+# features du modèle) est un tableau numpy contigu trié par pays ; la
+# série d'un pays est une tranche (vue) de ces tableaux. /api/data,
+# /api/countries et la lecture de l'historique des prédictions sont
+# servis depuis ces tableaux, sans requête SQL ni objet ORM par ligne.
+#
+# - Chargé au démarrage depuis la base, ou depuis un fichier de snapshot
+#   (TIMESERIES_SNAPSHOT, .npz) s'il correspond encore à la base.
+# - Mis à jour par pays après chaque écriture, rechargé après un import.
+# - Une vue (Snapshot) n'est jamais modifiée : une mise à jour en
+#   construit une nouvelle et la publie d'un coup ; une lecture voit donc
+#   toujours un état cohérent, identifié par sa version (empreinte du
+#   contenu, en-tête X-Data-Version des réponses).
+# - Store désactivé ou indisponible : les endpoints lisent la base.
+import hashlib
+import itertools
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func
+
+import metrics
+import models
+
+logger = logging.getLogger(__name__)
+
+TIMESERIES_STORE_ENABLED = os.getenv(
+    "TIMESERIES_STORE_ENABLED", "1").lower() in ("1", "true", "yes")
+# Fichier de snapshot (désactivé si vide).
+TIMESERIES_SNAPSHOT = os.getenv("TIMESERIES_SNAPSHOT", "")
+# En-tête des réponses servies depuis le store.
+VERSION_HEADER = "X-Data-Version"
+
+DATA_COLUMNS = {"id": np.int64, "date": "datetime64[D]",
+                "confirmed": np.int64, "deaths": np.int64,
+                "recovered": np.int64, "new_cases": np.int64,
+                "new_deaths": np.int64, "new_recovered": np.int64}
+FEATURE_COLUMNS = {"date": "datetime64[D]", "cases_log": float,
+                   "mortality_rate": float}
+# Champs d'une ligne de /api/data, dans l'ordre de schemas.DataOut.
+OUTPUT_FIELDS = ("date", "country", "confirmed", "deaths", "recovered",
+                 "new_cases", "new_deaths", "new_recovered", "id")
+
+
+def _array(values, dtype):
+    try:
+        return np.array(values, dtype=dtype)
+    except (TypeError, ValueError):
+        # Valeurs manquantes (NULL) : colonne d'objets Python.
+        return np.array(values, dtype=object)
+
+
+def _table(rows, columns):
+    """Colonnes et nombre de lignes par pays de `rows` (country puis
+    `columns`, triées par pays)."""
+    counts = {country: sum(1 for _ in group)
+              for country, group in itertools.groupby(
+                  rows, key=lambda row: row[0])}
+    values = list(zip(*rows))[1:] or [()] * len(columns)
+    return counts, {name: _array(column, dtype) for (name, dtype), column
+                    in zip(columns.items(), values)}
+
+
+def _slices(counts):
+    bounds = np.cumsum([0, *counts.values()]).tolist()
+    return {country: slice(start, stop) for country, start, stop
+            in zip(counts, bounds, bounds[1:])}
+
+
+class Snapshot:
+    """Vue immuable des séries de tous les pays."""
+
+    def __init__(self, data_counts, data, feature_counts, features):
+        self.data_counts = data_counts
+        self.data = data
+        self.feature_counts = feature_counts
+        self.features = features
+        self.countries = list(data_counts)
+        self._data_slices = _slices(data_counts)
+        self._feature_slices = _slices(feature_counts)
+        # Ordre global par id et pays de chaque ligne (/api/data sans
+        # pays), calculés à la demande.
+        self._order = None
+        self._country_column = None
+        self.version = self._digest()
+
+    def __len__(self):
+        return len(self.data["id"])
+
+    def _digest(self):
+        digest = hashlib.sha1()
+        for counts in (self.data_counts, self.feature_counts):
+            digest.update(repr(list(counts.items())).encode())
+        for column in (*self.data.values(), *self.features.values()):
+            digest.update(repr(column.tolist()).encode()
+                          if column.dtype == object else column.tobytes())
+        return digest.hexdigest()[:16]
+
+    def rows(self, country=None, skip=0, limit=10000):
+        """Lignes de /api/data (dictionnaires au format de DataOut), par
+        id croissant, comme la lecture en base."""
+        skip = max(skip, 0)
+        stop = None if limit < 0 else skip + limit
+        if country is not None:
+            index = self._data_slices.get(country, slice(0, 0))
+            index = np.arange(index.start, index.stop)[skip:stop]
+        else:
+            if self._order is None:
+                self._order = np.argsort(self.data["id"], kind="stable")
+            index = self._order[skip:stop]
+        if self._country_column is None:
+            self._country_column = np.repeat(
+                np.array(self.countries, dtype=object),
+                list(self.data_counts.values()))
+        columns = {name: self.data[name][index].tolist()
+                   for name in DATA_COLUMNS if name != "date"}
+        columns["date"] = np.datetime_as_string(
+            self.data["date"][index]).tolist()
+        columns["country"] = self._country_column[index].tolist()
+        return [dict(zip(OUTPUT_FIELDS, values)) for values
+                in zip(*(columns[name] for name in OUTPUT_FIELDS))]
+
+    def history(self, countries, reference_date):
+        """Features des pays jusqu'à la date de référence, comme
+        feature_store.load : colonnes country, ds, cases_log,
+        taux_mortalite, triées par pays et par date."""
+        limit = np.datetime64(reference_date, "D")
+        parts = []
+        for country in sorted(set(countries)):
+            index = self._feature_slices.get(country)
+            if index is None:
+                continue
+            stop = index.start + int(np.searchsorted(
+                self.features["date"][index], limit, side="right"))
+            parts.append((country, slice(index.start, stop)))
+        lengths = [index.stop - index.start for _, index in parts]
+        indexes = np.concatenate(
+            [np.arange(index.start, index.stop) for _, index in parts]
+            or [np.arange(0)])
+        return pd.DataFrame({
+            "country": np.repeat(np.array([c for c, _ in parts],
+                                          dtype=object), lengths),
+            "ds": self.features["date"][indexes].astype("datetime64[ns]"),
+            "cases_log": self.features["cases_log"][indexes].astype(float),
+            "taux_mortalite": self.features["mortality_rate"][
+                indexes].astype(float),
+        })
+
+    def merge(self, other, countries):
+        """Nouvelle vue où les séries des pays `countries` sont celles de
+        `other` (pays absents de `other` : supprimés)."""
+        countries = set(countries)
+
+        def combine(attribute, counts_attribute, slices_attribute):
+            sources = {country: self for country
+                       in getattr(self, counts_attribute)
+                       if country not in countries}
+            sources.update((country, other) for country
+                           in getattr(other, counts_attribute))
+            order = sorted(sources)
+            counts = {country: getattr(sources[country], counts_attribute)[
+                country] for country in order}
+            columns = {}
+            for name, column in getattr(self, attribute).items():
+                chunks = [getattr(sources[country], attribute)[name][
+                    getattr(sources[country], slices_attribute)[country]]
+                    for country in order]
+                columns[name] = np.concatenate(chunks) if chunks \
+                    else column[:0]
+            return counts, columns
+
+        return Snapshot(*combine("data", "data_counts", "_data_slices"),
+                        *combine("features", "feature_counts",
+                                 "_feature_slices"))
+
+
+def read(db, countries=None):
+    """Lit les séries (toutes, ou celles de `countries`) depuis la base."""
+    Data, Feature = models.Data, models.Feature
+    data = db.query(Data.country, *(getattr(Data, name)
+                                    for name in DATA_COLUMNS)).filter(
+        Data.country.isnot(None))
+    features = db.query(Feature.country, Feature.date, Feature.cases_log,
+                        Feature.mortality_rate)
+    if countries is not None:
+        data = data.filter(Data.country.in_(countries))
+        features = features.filter(Feature.country.in_(countries))
+    return Snapshot(
+        *_table(data.order_by(Data.country, Data.id).all(), DATA_COLUMNS),
+        *_table(features.order_by(Feature.country, Feature.date).all(),
+                FEATURE_COLUMNS))
+
+
+def fingerprint(db):
+    """Nombre de lignes et plus grand id des tables data et features :
+    un snapshot dont l'empreinte diffère n'est pas utilisé."""
+    return [value or 0 for table in (models.Data, models.Feature)
+            for value in db.query(func.count(table.id),
+                                  func.max(table.id)).one()]
+
+
+def save(snapshot, path, fingerprint):
+    """Écrit `snapshot` dans `path` (.npz, écriture atomique). Retourne
+    False si une colonne contient des valeurs manquantes."""
+    columns = {**{f"data_{n}": c for n, c in snapshot.data.items()},
+               **{f"features_{n}": c for n, c in snapshot.features.items()}}
+    if any(column.dtype == object for column in columns.values()):
+        return False
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, fingerprint=np.array(fingerprint, dtype=np.int64),
+                 data_countries=np.array(list(snapshot.data_counts), dtype=str),
+                 data_counts=np.array(list(snapshot.data_counts.values()),
+                                      dtype=np.int64),
+                 feature_countries=np.array(list(snapshot.feature_counts),
+                                            dtype=str),
+                 feature_counts=np.array(
+                     list(snapshot.feature_counts.values()), dtype=np.int64),
+                 **columns)
+    os.replace(tmp, path)
+    return True
+
+
+def load(path):
+    """Relit un snapshot écrit par save() ; retourne (snapshot,
+    empreinte)."""
+    with np.load(path, allow_pickle=False) as f:
+        data_counts = dict(zip(f["data_countries"].tolist(),
+                               f["data_counts"].tolist()))
+        feature_counts = dict(zip(f["feature_countries"].tolist(),
+                                  f["feature_counts"].tolist()))
+        snapshot = Snapshot(
+            data_counts, {name: f[f"data_{name}"] for name in DATA_COLUMNS},
+            feature_counts, {name: f[f"features_{name}"]
+                             for name in FEATURE_COLUMNS})
+        return snapshot, f["fingerprint"].tolist()
+
+
+class TimeSeriesStore:
+    """Vue courante des séries, chargée à la demande et tenue à jour."""
+
+    def __init__(self, snapshot_path=""):
+        self.snapshot_path = snapshot_path
+        self.snapshot = None
+        self.source = None
+        self.loads = 0
+        self.refreshes = 0
+        self.failures = 0
+        self.last_load_seconds = None
+        self._lock = threading.Lock()
+
+    def load(self, db, force=True):
+        """(Re)charge toutes les séries : depuis le snapshot s'il
+        correspond à la base, sinon depuis la base."""
+        with self._lock:
+            if not force and self.snapshot is not None:
+                return self.snapshot
+            started = time.perf_counter()
+            current = fingerprint(db)
+            snapshot = self._read_snapshot(current)
+            self.source = "snapshot"
+            if snapshot is None:
+                snapshot = read(db)
+                self.source = "db"
+                self._save(snapshot, current)
+            self.snapshot = snapshot
+            self.loads += 1
+            self.last_load_seconds = round(time.perf_counter() - started, 3)
+            logger.info("Time series store loaded from %s: %d rows, "
+                        "version %s", self.source, len(snapshot),
+                        snapshot.version)
+            return snapshot
+
+    def get(self, db):
+        """Vue courante (chargée au premier appel), ou None si le store
+        est indisponible."""
+        snapshot = self.snapshot
+        if snapshot is not None:
+            return snapshot
+        try:
+            return self.load(db, force=False)
+        except Exception as e:
+            logger.warning("Time series store unavailable: %s", e)
+            self.failures += 1
+            return None
+
+    def refresh(self, db, countries):
+        """Relit les séries des pays `countries` après une écriture
+        (validée) sur leurs données."""
+        countries = sorted(set(countries))
+        with self._lock:
+            if self.snapshot is None:
+                return
+            try:
+                self.snapshot = self.snapshot.merge(read(db, countries),
+                                                    countries)
+                self.refreshes += 1
+                self._save(self.snapshot, fingerprint(db))
+            except Exception as e:
+                # Vue abandonnée : rechargée entièrement à la prochaine
+                # lecture.
+                logger.warning("Time series store refresh failed: %s", e)
+                self.failures += 1
+                self.snapshot = None
+
+    def invalidate(self):
+        with self._lock:
+            self.snapshot = None
+
+    def _read_snapshot(self, current):
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return None
+        try:
+            snapshot, saved = load(self.snapshot_path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Ignoring time series snapshot: %s", e)
+            return None
+        return snapshot if saved == current else None
+
+    def _save(self, snapshot, current):
+        if not self.snapshot_path:
+            return
+        try:
+            if not save(snapshot, self.snapshot_path, current):
+                logger.info("Time series snapshot not written: "
+                            "missing values")
+        except OSError as e:
+            logger.warning("Cannot write time series snapshot: %s", e)
+
+    def stats(self):
+        snapshot = self.snapshot
+        return {"loaded": snapshot is not None,
+                "version": snapshot.version if snapshot else None,
+                "rows": len(snapshot) if snapshot else 0,
+                "countries": len(snapshot.countries) if snapshot else 0,
+                "source": self.source, "loads": self.loads,
+                "refreshes": self.refreshes, "failures": self.failures,
+                "last_load_seconds": self.last_load_seconds}
+
+
+store = TimeSeriesStore(TIMESERIES_SNAPSHOT)
+metrics.register("timeseries_store", store.stats)
+
+
+def current(db):
+    """Vue courante, ou None : lecture en base."""
+    if not TIMESERIES_STORE_ENABLED:
+        return None
+    return store.get(db)
+
+
+def refresh(db, countries):
+    if TIMESERIES_STORE_ENABLED:
+        store.refresh(db, countries)
+
+
+def reload(db):
+    """Recharge tout le store (import des données)."""
+    if not TIMESERIES_STORE_ENABLED:
+        return
+    try:
+        store.load(db)
+    except Exception as e:
+        logger.warning("Time series store reload failed: %s", e)
+        store.failures += 1
+        store.invalidate()
+
+
+def headers(snapshot):
+    return {VERSION_HEADER: snapshot.version}
@@ -0,0 +1,226 @@
+# backend/training.py
+
+# Entraînement d'un modèle Prophet par pays à partir du store de
+# features (cible : taux de mortalité, régresseur : cases_log).
+# Les pays sont entraînés en parallèle dans un pool de processus et les
+# artefacts écrits dans une nouvelle version du registre de modèles.
+# L'entraînement est incrémental : l'empreinte des données de chaque pays
+# est comparée à celle de la dernière version entraînée, et seuls les
+# pays dont les données ont changé sont ré-entraînés.
+#
+# Usage (depuis backend/) : python training.py [--workers N] [--full]
+# puis activation via POST /api/reload?version=<version>.
+import argparse
+import hashlib
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+import model_artifact
+import model_registry
+import models
+
+logger = logging.getLogger(__name__)
+
+# Nombre de processus d'entraînement.
+TRAINING_WORKERS = int(os.getenv("TRAINING_WORKERS",
+                                 str(os.cpu_count() or 1)))
+# Nombre minimal de jours d'historique pour entraîner un pays ; les
+# autres pays utilisent le modèle global.
+MIN_TRAINING_DAYS = int(os.getenv("MIN_TRAINING_DAYS", "30"))
+KIND = "prophet-per-country"
+
+
+def load_training_data(db, countries=None):
+    """Historique de tous les pays (ou de `countries`) : colonnes
+    country, ds, cases_log, y (taux de mortalité)."""
+    query = db.query(models.Feature.country, models.Feature.date,
+                     models.Feature.cases_log, models.Feature.mortality_rate)
+    if countries:
+        query = query.filter(models.Feature.country.in_(countries))
+    rows = query.order_by(models.Feature.country, models.Feature.date).all()
+    country, dates, cases_log, y = list(zip(*rows)) or [(), (), (), ()]
+    return pd.DataFrame({
+        'country': country,
+        'ds': np.array(dates, dtype='datetime64[ns]'),
+        'cases_log': np.array(cases_log, dtype=float),
+        'y': np.array(y, dtype=float),
+    })
+
+
+def fingerprint(frame):
+    """Empreinte des données d'entraînement d'un pays."""
+    digest = hashlib.sha256()
+    for column in ('ds', 'cases_log', 'y'):
+        digest.update(np.ascontiguousarray(frame[column].to_numpy()).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def _file_name(country):
+    # Nom de fichier sûr et unique pour chaque pays.
+    slug = re.sub(r'[^A-Za-z0-9_-]+', '_', country).strip('_')
+    return f"{slug}-{hashlib.sha1(country.encode()).hexdigest()[:8]}"
+
+
+def fit_country(frame, path):
+    """Entraîne le modèle d'un pays et l'écrit dans `path` (artefact
+    model_artifact). Exécutée dans un processus du pool ; retourne la
+    durée d'entraînement."""
+    from prophet import Prophet
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+    started = time.perf_counter()
+    model = Prophet(yearly_seasonality=False, daily_seasonality=False)
+    model.add_regressor('cases_log')
+    model.fit(frame[['ds', 'y', 'cases_log']])
+    model_artifact.save_prophet(model, path)
+    return time.perf_counter() - started
+
+
+def _link_or_copy(source, target):
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+def _reuse(source, target):
+    # Artefact inchangé : liens physiques si possible, sinon copie.
+    shutil.rmtree(target, ignore_errors=True)  # reste d'un échec
+    shutil.copytree(source, target, copy_function=_link_or_copy)
+
+
+def previous_version(registry):
+    """Dernière version entraînée par pays, ou None."""
+    for version in reversed(registry.versions()):
+        if version.metadata.get("kind") == KIND:
+            return version
+    return None
+
+
+def train(db, registry=None, workers=None, countries=None, version=None,
+          full=False):
+    """Entraîne les modèles par pays et publie une nouvelle version du
+    registre (non activée). Seuls les pays dont les données ont changé
+    depuis la version précédente sont ré-entraînés, sauf si `full`."""
+    registry = registry or model_registry.registry
+    workers = workers or TRAINING_WORKERS
+    started = time.perf_counter()
+    data = load_training_data(db, countries)
+    previous = None if full else previous_version(registry)
+    version, tmp = registry.stage(version)
+    try:
+        return _train(registry, data, previous, version, tmp, workers,
+                      countries, started)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+def _train(registry, data, previous, version, tmp, workers, countries,
+           started):
+    previous_entries = previous.metadata["countries"] if previous else {}
+    os.makedirs(os.path.join(tmp, "countries"))
+    entries, pending, skipped = {}, {}, []
+    # Pays hors du périmètre demandé : repris tels quels.
+    if countries:
+        for country, entry in previous_entries.items():
+            if (country not in countries and model_artifact.is_artifact(
+                    previous.artifact(country))):
+                _reuse(previous.artifact(country),
+                       os.path.join(tmp, entry["artifact"]))
+                entries[country] = entry
+    for country, frame in data.groupby('country', sort=False):
+        if len(frame) < MIN_TRAINING_DAYS:
+            skipped.append(country)
+            continue
+        artifact = f"countries/{_file_name(country)}"
+        entry = {"artifact": artifact, "fingerprint": fingerprint(frame),
+                 "rows": len(frame),
+                 "last_date": frame['ds'].iloc[-1].date().isoformat()}
+        old = previous_entries.get(country)
+        if (old is not None and old["fingerprint"] == entry["fingerprint"]
+                and model_artifact.is_artifact(previous.artifact(country))):
+            _reuse(previous.artifact(country), os.path.join(tmp, artifact))
+            entries[country] = dict(old, artifact=artifact)
+        else:
+            pending[country] = (frame.reset_index(drop=True), entry)
+
+    failed = {}
+    if pending:
+        # "spawn" : processus propres, indépendants des threads de l'appelant.
+        with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = {
+                executor.submit(fit_country, frame,
+                                os.path.join(tmp, entry["artifact"])): country
+                for country, (frame, entry) in pending.items()}
+            for future in as_completed(futures):
+                country = futures[future]
+                entry = pending[country][1]
+                try:
+                    entry["fit_seconds"] = round(future.result(), 3)
+                    entries[country] = entry
+                except Exception as e:
+                    logger.warning("Training failed for %s: %s", country, e)
+                    failed[country] = str(e)
+                    # Ancien modèle conservé s'il existe.
+                    if country in previous_entries and (
+                            model_artifact.is_artifact(
+                                previous.artifact(country))):
+                        _reuse(previous.artifact(country),
+                               os.path.join(tmp, entry["artifact"]))
+                        entries[country] = dict(previous_entries[country],
+                                                artifact=entry["artifact"])
+
+    trained = sorted(set(pending) - set(failed))
+    published = registry.publish(version, tmp, {
+        "kind": KIND,
+        "target": "mortality_rate",
+        "regressors": ["cases_log"],
+        "base_version": previous.version if previous else None,
+        "countries": entries,
+        "trained": trained,
+        "reused": len(entries) - len(trained),
+        "skipped": skipped,
+        "failed": failed,
+        "workers": workers,
+        "training_seconds": round(time.perf_counter() - started, 3),
+    })
+    logger.info("Model %s: %d trained, %d reused, %d skipped, %d failed "
+                "in %.1fs", version, len(trained), len(entries) - len(trained),
+                len(skipped), len(failed), time.perf_counter() - started)
+    return published
+
+
+if __name__ == "__main__":
+    import database
+    import logging_config
+
+    parser = argparse.ArgumentParser(
+        description="Entraînement des modèles par pays")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--countries", nargs="*")
+    parser.add_argument("--version")
+    parser.add_argument("--full", action="store_true",
+                        help="ré-entraîne tous les pays")
+    args = parser.parse_args()
+    logging_config.setup_logging()
+    session = database.SessionLocal()
+    try:
+        result = train(session, workers=args.workers,
+                       countries=args.countries, version=args.version,
+                       full=args.full)
+    finally:
+        session.close()
+        logging_config.shutdown_logging()
+    print(result.version, result.metadata["training_seconds"], "s,",
+          len(result.metadata["trained"]), "trained,",
+          result.metadata["reused"], "reused")
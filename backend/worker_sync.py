@@ -0,0 +1,298 @@
+# backend/worker_sync.py
+
+# Synchronisation des workers d'un déploiement multi-processus
+# (gunicorn.conf.py). Chaque worker a ses propres vues en mémoire (store
+# de séries, cache des prévisions, modèle actif) : une écriture ou une
+# activation de modèle reçue par un worker est publiée dans un journal
+# partagé (fichier en ajout seul dans WORKER_SYNC_DIR), que les autres
+# workers relisent toutes les WORKER_SYNC_INTERVAL secondes pour appliquer
+# le même changement. Un verrou de fichier désigne aussi un worker
+# "leader" pour les tâches à ne lancer qu'une fois (suivi de la précision).
+#
+# Le journal est borné : au-delà de WORKER_SYNC_MAX_BYTES, le leader le
+# remplace par un journal vide (compaction). Un worker qui constate le
+# remplacement, ou dont le retard dépasse WORKER_SYNC_MAX_REPLAY octets
+# (worker redémarré longtemps après le préchargement du maître), ne
+# rejoue pas les changements : il recharge tout son état (on_resync)
+# depuis la base et le registre des modèles.
+#
+# Sans WORKER_SYNC_DIR (un seul processus), publish() ne fait rien et le
+# processus est leader.
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Dossier partagé par les workers (désactivé si vide).
+WORKER_SYNC_DIR = os.getenv("WORKER_SYNC_DIR", "")
+# Délai maximal avant qu'un changement publié soit appliqué (secondes).
+WORKER_SYNC_INTERVAL = float(os.getenv("WORKER_SYNC_INTERVAL", "0.5"))
+# Taille du journal déclenchant sa compaction (octets).
+WORKER_SYNC_MAX_BYTES = int(os.getenv("WORKER_SYNC_MAX_BYTES", "1048576"))
+# Retard au-delà duquel un worker recharge son état au lieu de rejouer
+# les changements (octets).
+WORKER_SYNC_MAX_REPLAY = int(os.getenv("WORKER_SYNC_MAX_REPLAY", "65536"))
+LOG_NAME = "changes.log"
+# Verrou partagé pendant les ajouts, exclusif pendant la compaction.
+LOG_LOCK_NAME = "changes.lock"
+LEADER_NAME = "leader.lock"
+
+
+class WorkerSync:
+    """Journal des changements partagé entre les workers."""
+
+    def __init__(self, directory="", interval=0.5, max_bytes=1048576,
+                 max_replay=65536):
+        self.directory = directory
+        self.interval = interval
+        self.max_bytes = max_bytes
+        self.max_replay = max_replay
+        self.published = 0
+        self.applied = 0
+        self.resyncs = 0
+        self.compactions = 0
+        self.failures = 0
+        # Position de lecture du journal et identité (périphérique, inode)
+        # du fichier lu : seuls les changements publiés après mark() (état
+        # chargé par le maître) ou après le démarrage du worker sont
+        # appliqués.
+        self._offset = None
+        self._identity = None
+        self._leader_file = None
+        self._handlers = {}
+        self._leader_callbacks = []
+        self._resync_callbacks = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def enabled(self):
+        return bool(self.directory)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def subscribe(self, kind, handler):
+        """`handler(**payload)` appliquera les changements `kind` publiés
+        par les autres workers."""
+        self._handlers[kind] = handler
+
+    def on_leader(self, callback):
+        """`callback()` sera appelé quand ce worker deviendra leader."""
+        self._leader_callbacks.append(callback)
+
+    def on_resync(self, callback):
+        """`callback()` rechargera tout l'état du worker quand les
+        changements manqués ne peuvent pas être rejoués."""
+        self._resync_callbacks.append(callback)
+
+    def mark(self):
+        """Retient la position courante du journal, avant que le maître
+        ne charge l'état hérité par les workers : un worker créé plus tard
+        (redémarrage) rejoue les changements publiés depuis."""
+        if self.enabled:
+            os.makedirs(self.directory, exist_ok=True)
+            # Journal créé s'il n'existe pas : son identité est connue.
+            os.close(os.open(self._path(LOG_NAME),
+                             os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644))
+            self._identity, self._offset = self._stat()
+
+    def start(self):
+        """Rattrape les changements manqués puis les suit dans un
+        thread."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            if self._offset is None:
+                self.mark()
+            self._thread = threading.Thread(
+                target=self._loop, daemon=True, name="worker-sync")
+        self.poll()
+        self._thread.start()
+
+    def _stat(self):
+        """(identité, taille) du journal ; (None, 0) s'il n'existe pas."""
+        try:
+            stat = os.stat(self._path(LOG_NAME))
+        except OSError:
+            return None, 0
+        return (stat.st_dev, stat.st_ino), stat.st_size
+
+    def _log_lock(self, operation):
+        lock = open(self._path(LOG_LOCK_NAME), "a")
+        fcntl.flock(lock, operation)
+        return lock
+
+    def publish(self, kind, **payload):
+        """Publie un changement déjà appliqué par ce worker."""
+        if not self.enabled:
+            return
+        line = json.dumps({"pid": os.getpid(), "kind": kind, **payload})
+        try:
+            # Pas d'ajout dans un journal en cours de remplacement.
+            with self._log_lock(fcntl.LOCK_SH):
+                # Ajout en une seule écriture (O_APPEND) : les lignes de
+                # plusieurs workers ne s'entremêlent pas.
+                fd = os.open(self._path(LOG_NAME),
+                             os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, (line + "\n").encode())
+                finally:
+                    os.close(fd)
+            self.published += 1
+        except OSError as e:
+            logger.warning("Cannot publish %s change: %s", kind, e)
+            self.failures += 1
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.poll()
+            except Exception as e:
+                logger.exception("Worker sync failed: %s", e)
+                self.failures += 1
+
+    def poll(self):
+        """Applique les changements publiés par les autres workers depuis
+        le dernier appel ; retourne leur nombre."""
+        self._elect()
+        if self._offset is None:
+            return 0
+        identity, size = self._stat()
+        if identity != self._identity:
+            # Journal compacté : les changements manqués sont perdus.
+            self._resync(identity, 0)
+            return 0
+        if size - self._offset > self.max_replay:
+            # Trop de retard : rechargement plutôt que rejeu.
+            self._read(size)
+            self._resync(identity, self._offset)
+            return 0
+        if size > self._offset:
+            applied = self._apply(self._read(size))
+        else:
+            applied = 0
+        if self.is_leader() and size > self.max_bytes:
+            self._compact()
+        return applied
+
+    def _read(self, size):
+        """Lignes complètes publiées depuis la position, jusqu'à `size`."""
+        with open(self._path(LOG_NAME), "rb") as f:
+            stat = os.fstat(f.fileno())
+            if (stat.st_dev, stat.st_ino) != self._identity:
+                # Remplacé depuis _stat() : constaté au prochain tour.
+                return b""
+            f.seek(self._offset)
+            data = f.read(size - self._offset)
+        # Dernière ligne éventuellement incomplète : relue au prochain tour.
+        complete = data[:data.rfind(b"\n") + 1]
+        self._offset += len(complete)
+        return complete
+
+    def _resync(self, identity, offset):
+        logger.info("Worker %d resynchronized (journal %s)", os.getpid(),
+                    "replaced" if identity != self._identity else "behind")
+        self._identity, self._offset = identity, offset
+        self.resyncs += 1
+        for callback in self._resync_callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning("Cannot resynchronize: %s", e)
+                self.failures += 1
+
+    def _compact(self):
+        # Journal remplacé par un fichier vide (nouvel inode) : chaque
+        # worker recharge son état en le constatant, y compris le leader.
+        with self._log_lock(fcntl.LOCK_EX):
+            if self._stat()[1] <= self.max_bytes:
+                return
+            tmp = self._path(f"{LOG_NAME}.tmp")
+            open(tmp, "wb").close()
+            os.replace(tmp, self._path(LOG_NAME))
+        self.compactions += 1
+        logger.info("Worker sync journal compacted")
+
+    def _apply(self, complete):
+        applied = 0
+        for line in complete.splitlines():
+            change = json.loads(line)
+            if change.pop("pid") == os.getpid():
+                continue
+            handler = self._handlers.get(change.pop("kind"))
+            if handler is None:
+                continue
+            try:
+                handler(**change)
+                applied += 1
+            except Exception as e:
+                logger.warning("Cannot apply change %s: %s", change, e)
+                self.failures += 1
+        self.applied += applied
+        return applied
+
+    def is_leader(self):
+        """Vrai si ce processus détient le verrou de leader (toujours
+        vrai sans synchronisation)."""
+        return not self.enabled or self._leader_file is not None
+
+    def _elect(self):
+        # Verrou non bloquant : un worker remplace le leader dès que
+        # celui-ci s'arrête (verrou libéré avec le processus).
+        if self.is_leader():
+            return
+        try:
+            leader = open(self._path(LEADER_NAME), "a")
+        except OSError:
+            return
+        try:
+            fcntl.flock(leader, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            leader.close()
+            return
+        self._leader_file = leader
+        logger.info("Worker %d is the leader", os.getpid())
+        for callback in self._leader_callbacks:
+            callback()
+
+    def stats(self):
+        return {"enabled": self.enabled, "pid": os.getpid(),
+                "leader": self.is_leader(),
+                "published": self.published, "applied": self.applied,
+                "resyncs": self.resyncs, "compactions": self.compactions,
+                "failures": self.failures}
+
+
+sync = WorkerSync(WORKER_SYNC_DIR, WORKER_SYNC_INTERVAL,
+                  WORKER_SYNC_MAX_BYTES, WORKER_SYNC_MAX_REPLAY)
+metrics.register("worker_sync", sync.stats)
+
+
+def publish(kind, **payload):
+    sync.publish(kind, **payload)
+
+
+def subscribe(kind, handler):
+    sync.subscribe(kind, handler)
+
+
+def on_leader(callback):
+    sync.on_leader(callback)
+
+
+def on_resync(callback):
+    sync.on_resync(callback)
+
+
+def is_leader():
+    return sync.is_leader()
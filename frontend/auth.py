@@ -110,7 +110,8 @@ def post_with_auth(path, payload):
     headers = {"Authorization": f"Bearer {token}"}
     try:
         response = requests.post(f"{API_URL}{path}", headers=headers, json=payload)
-        if response.status_code == 200:
+        # 202 : tâche acceptée (ex. /predict/jobs), le corps décrit la tâche.
+        if response.status_code in (200, 202):
             return response.json()
         else:
             try:
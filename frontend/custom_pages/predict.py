@@ -2,6 +2,11 @@ import streamlit as st
 import pandas as pd
 from datetime import date, datetime
 from components.footer import render_footer
+import time
+
+# Intervalle et durée maximale de suivi d'une prédiction (secondes).
+PREDICTION_POLL_INTERVAL = 0.5
+PREDICTION_POLL_TIMEOUT = 300
 
 
 def render_predict(t, get_token, get_with_auth, post_with_auth):
@@ -42,7 +47,7 @@ def render_predict(t, get_token, get_with_auth, post_with_auth):
                         value=7,
                         help="Nombre de jours à prédire à partir de la date de référence"
                     )
-                    model_choice = st.selectbox("Modèle IA", ["prophet"], key="model_select")
+                    model_choice = st.selectbox("Modèle IA", ["prophet", "holt", "damped", "loglinear"], key="model_select")
                     submitted = st.form_submit_button("🚀 Lancer la prédiction", use_container_width=True)
             if submitted:
                 with st.spinner("🔮 Prédiction en cours..."):
@@ -50,11 +55,24 @@ def render_predict(t, get_token, get_with_auth, post_with_auth):
                     prediction_payload = {
                         "country": country_predict,
                         "days": days_to_predict,
-                        "prediction_type": "cases",
+                        "prediction_type": "taux_mortalite",
                         "model": model_choice,
                         "reference_date": reference_date_str
                     }
-                    result = post_with_auth("/predict", prediction_payload)
+                    # Prédiction asynchrone : la tâche est soumise puis
+                    # son état consulté, sans connexion HTTP longue.
+                    result = None
+                    job = post_with_auth("/predict/jobs", prediction_payload)
+                    deadline = time.monotonic() + PREDICTION_POLL_TIMEOUT
+                    while job and time.monotonic() < deadline:
+                        if job["status"] == "done":
+                            result = job["result"]
+                            break
+                        if job["status"] == "failed":
+                            st.error(job.get("error") or t["data_error"])
+                            break
+                        time.sleep(PREDICTION_POLL_INTERVAL)
+                        job = get_with_auth(f"/predict/jobs/{job['job_id']}")
                 if result:
                     st.success("✅ Prédiction terminée !")
                     st.subheader("📊 Résultats de la prédiction")